@@ -14,6 +14,9 @@ def create_app():
     config = get_config()
     app.config.from_object(config)
     
+    # 位于可信反向代理之后时，从 X-Forwarded-* 还原客户端地址
+    _init_proxy_fix(app)
+    
     # 启用CORS
     CORS(app, origins=app.config.get('CORS_ORIGINS', ['*']))
     
@@ -28,6 +31,15 @@ def create_app():
         app.logger.warning(f"⚠️ 数据库初始化失败，启用降级模式: {e}")
         # 不抛出异常，让应用继续运行
     
+    # 预热进程内缓存
+    _init_caches(app)
+    
+    # 启动后台任务
+    _init_background_jobs(app)
+    
+    # 注册请求认证
+    _init_auth(app)
+    
     # 注册蓝图
     _register_blueprints(app)
     
@@ -40,6 +52,46 @@ def create_app():
     app.logger.info("✅ Flask应用创建成功")
     return app
 
+def _init_proxy_fix(app):
+    """按 TRUSTED_PROXY_COUNT 层可信代理还原 request.remote_addr 等请求信息"""
+    hops = app.config.get('TRUSTED_PROXY_COUNT', 0)
+    if hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+def _init_caches(app):
+    """初始化进程内缓存、学习路径数据和共享的推荐引擎"""
+    from app.utils.catalog_cache import init_question_catalog
+    from app.utils.token_cache import init_token_cache
+    from app.utils.user_cache import init_user_cache
+    from app.services.learning_paths import init_learning_paths
+    from app.services.recommendation_engine import init_recommendation_engine
+    from app.services.recommendation_cache import init_recommendation_cache
+    
+    init_question_catalog(app)
+    init_token_cache(app)
+    init_user_cache(app)
+    init_learning_paths(app)
+    init_recommendation_engine(app)
+    init_recommendation_cache(app)
+
+def _init_background_jobs(app):
+    """启动可选的后台任务"""
+    from app.utils.sweeper import start_attempt_sweeper, start_event_compactor
+    
+    start_attempt_sweeper(app)
+    start_event_compactor(app)
+
+def _init_auth(app):
+    """注册统一的请求认证，初始化密码哈希计算器和登录限流"""
+    from app.utils.auth import init_auth
+    from app.utils.password_hasher import init_password_hasher
+    from app.utils.rate_limit import init_rate_limit
+    
+    init_auth(app)
+    init_password_hasher(app)
+    init_rate_limit(app)
+
 def _register_blueprints(app):
     """注册所有蓝图"""
     try:
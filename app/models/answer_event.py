@@ -0,0 +1,323 @@
+# app/models/answer_event.py - 只追加的答案事件日志
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Set
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.utils.settings import get_setting
+
+# 本进程实例标识，与主机名、进程号一起作为压缩租约的持有者
+_INSTANCE_ID = uuid.uuid4().hex[:8]
+
+class AnswerEvent:
+    """答案事件日志
+
+    每次提交答案或重置问卷都追加一条事件，从不修改，保留完整的答题历史。
+    ANSWER_WRITE_MODE=event_log 时提交答案只写一条事件，由压缩任务按 _id 顺序
+    分批把事件折叠进 responses 集合（当前状态）；压缩进度保存在水位线文档中，
+    多个进程通过同一文档上的租约保证同一时间只有一个进程压缩。
+    """
+
+    COLLECTION = "answer_events"
+    STATE_COLLECTION = "compaction_state"
+    WATERMARK_KEY = "answer_events"
+
+    @staticmethod
+    def _get_mongo():
+        """获取mongo实例"""
+        from app.utils.database import mongo
+        if mongo is None:
+            raise RuntimeError("MongoDB connection not initialized")
+        return mongo
+
+    @staticmethod
+    def _check_db_available():
+        """检查数据库是否可用"""
+        from app.utils.database import is_db_available
+        return is_db_available()
+
+    @staticmethod
+    def _collection():
+        """事件集合（写入等待确认，提交接口返回成功时事件一定已保存）"""
+        return AnswerEvent._get_mongo().db[AnswerEvent.COLLECTION]
+
+    @staticmethod
+    def append_answers(user_id: str, answers: List[Dict]) -> bool:
+        """追加答案事件：一次插入，写入前不读取数据库
+
+        answers 中每项包含 question_id、answer_value 和可选的 answer_text，调用方负责校验。
+        """
+        try:
+            if not answers or not AnswerEvent._check_db_available():
+                return False
+
+            now = datetime.utcnow()
+            events = [{
+                "type": "answer",
+                "user_id": str(user_id),
+                "question_id": answer["question_id"],
+                "answer_value": answer["answer_value"],
+                "answer_text": answer.get("answer_text"),
+                "created_at": now
+            } for answer in answers]
+
+            collection = AnswerEvent._collection()
+            if len(events) == 1:
+                collection.insert_one(events[0])
+            else:
+                collection.insert_many(events, ordered=True)
+            return True
+        except Exception as e:
+            print(f"写入答案事件失败: {e}")
+            return False
+
+    @staticmethod
+    def append_reset(user_id: str) -> bool:
+        """追加重置问卷事件（用于回放历史）"""
+        try:
+            if not AnswerEvent._check_db_available():
+                return False
+
+            AnswerEvent._collection().insert_one({
+                "type": "reset",
+                "user_id": str(user_id),
+                "created_at": datetime.utcnow()
+            })
+            return True
+        except Exception as e:
+            print(f"写入重置事件失败: {e}")
+            return False
+
+    @staticmethod
+    def compact(batch_size: int = 1000, max_batches: int = None) -> Dict:
+        """把水位线之后的事件折叠进 responses 集合"""
+        stats = {"events": 0, "applied": 0, "dropped": 0}
+        if not AnswerEvent._check_db_available():
+            print("数据库服务暂不可用")
+            return stats
+
+        from app.models.response import Response
+        from app.models.user import User
+
+        mongo = AnswerEvent._get_mongo()
+        state = mongo.db[AnswerEvent.STATE_COLLECTION]
+        lag = get_setting('ANSWER_EVENT_COMPACTION_LAG_SECONDS', 5)
+        upper = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=lag))
+        owner = AnswerEvent._lease_owner()
+        batches = 0
+
+        try:
+            while max_batches is None or batches < max_batches:
+                watermark = AnswerEvent._acquire_lease(owner)
+                if watermark is None:
+                    break
+
+                id_range = {"$lt": upper}
+                if watermark.get("last_event_id"):
+                    id_range["$gt"] = watermark["last_event_id"]
+
+                events = list(mongo.db[AnswerEvent.COLLECTION].find({"_id": id_range}).sort("_id", 1).limit(batch_size))
+                if not events:
+                    break
+
+                # 按用户分组，保持事件顺序
+                by_user = {}
+                for event in events:
+                    if event.get("type") == "answer":
+                        by_user.setdefault(event["user_id"], []).append(event)
+
+                reset_times = {}
+                if by_user:
+                    for user in mongo.db.users.find(
+                        {"_id": {"$in": [ObjectId(user_id) for user_id in by_user if ObjectId.is_valid(user_id)]}},
+                        {"last_reset_at": 1}
+                    ):
+                        reset_times[str(user["_id"])] = user.get("last_reset_at")
+
+                for user_id, user_events in by_user.items():
+                    last_reset_at = reset_times.get(user_id)
+                    answers = []
+                    for event in user_events:
+                        if last_reset_at and event["created_at"] < last_reset_at:
+                            stats["dropped"] += 1
+                            continue
+                        answers.append({
+                            "question_id": event["question_id"],
+                            "answer_value": event["answer_value"],
+                            "answer_text": event.get("answer_text"),
+                            "answered_at": event["created_at"]
+                        })
+
+                    if answers:
+                        saved = Response.apply_answers_bulk(user_id, answers)
+                        stats["applied"] += sum(1 for success in saved if success)
+                        stats["dropped"] += sum(1 for success in saved if not success)
+
+                        if Response.get_user_progress(user_id)["is_completed"]:
+                            User.mark_questionnaire_completed(user_id)
+
+                # 租约已被其他进程接管时不再推进水位线，由新的持有者继续
+                result = state.update_one(
+                    {"_id": AnswerEvent.WATERMARK_KEY, "lease_owner": owner},
+                    {
+                        "$max": {"last_event_id": events[-1]["_id"]},
+                        "$set": {"updated_at": datetime.utcnow()}
+                    }
+                )
+                stats["events"] += len(events)
+                batches += 1
+                if result.matched_count == 0:
+                    print("压缩租约已失效，停止本轮压缩")
+                    break
+        finally:
+            AnswerEvent._release_lease(owner)
+
+        if stats["events"]:
+            print(f"答案事件压缩完成: {stats['events']} 个事件, {stats['applied']} 个答案, {stats['dropped']} 个丢弃")
+        return stats
+
+    @staticmethod
+    def _lease_owner() -> str:
+        """压缩租约持有者：主机名、进程号和实例标识（fork 出的工作进程各不相同）"""
+        return f"{socket.gethostname()}:{os.getpid()}:{_INSTANCE_ID}"
+
+    @staticmethod
+    def _acquire_lease(owner: str) -> Optional[Dict]:
+        """获取或续期压缩租约，成功时返回水位线文档，其他进程持有未过期的租约时返回 None"""
+        mongo = AnswerEvent._get_mongo()
+        now = datetime.utcnow()
+        lease_seconds = get_setting('ANSWER_EVENT_COMPACTION_LEASE_SECONDS', 60)
+        try:
+            return mongo.db[AnswerEvent.STATE_COLLECTION].find_one_and_update(
+                {
+                    "_id": AnswerEvent.WATERMARK_KEY,
+                    "$or": [
+                        {"lease_owner": owner},
+                        {"lease_expires_at": {"$lte": now}},
+                        {"lease_expires_at": {"$exists": False}}
+                    ]
+                },
+                {"$set": {"lease_owner": owner, "lease_expires_at": now + timedelta(seconds=lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # 水位线文档存在但租约由其他进程持有，upsert 插入同一 _id 失败
+            return None
+
+    @staticmethod
+    def _release_lease(owner: str):
+        """压缩结束后释放租约，其他进程无需等待过期"""
+        try:
+            mongo = AnswerEvent._get_mongo()
+            mongo.db[AnswerEvent.STATE_COLLECTION].update_one(
+                {"_id": AnswerEvent.WATERMARK_KEY, "lease_owner": owner},
+                {"$set": {"lease_expires_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            print(f"释放压缩租约失败: {e}")
+
+    @staticmethod
+    def pending_question_ids(user_id: str) -> Set[str]:
+        """用户尚未压缩（水位线之后）、且晚于最近一次重置的答案事件涉及的问题"""
+        mongo = AnswerEvent._get_mongo()
+        watermark = mongo.db[AnswerEvent.STATE_COLLECTION].find_one(
+            {"_id": AnswerEvent.WATERMARK_KEY}, {"last_event_id": 1}
+        ) or {}
+        query = {"user_id": str(user_id), "type": "answer"}
+        if watermark.get("last_event_id"):
+            query["_id"] = {"$gt": watermark["last_event_id"]}
+
+        user = mongo.db.users.find_one(
+            {"_id": ObjectId(user_id)}, {"last_reset_at": 1}
+        ) if ObjectId.is_valid(user_id) else None
+        if user and user.get("last_reset_at"):
+            query["created_at"] = {"$gte": user["last_reset_at"]}
+
+        return {event["question_id"] for event in mongo.db[AnswerEvent.COLLECTION].find(query, {"question_id": 1})}
+
+    @staticmethod
+    def get_history(user_id: str, until: datetime = None) -> List[Dict]:
+        """按时间顺序获取用户的全部事件（可截止到某一时间）"""
+        try:
+            if not AnswerEvent._check_db_available():
+                return []
+
+            query = {"user_id": str(user_id)}
+            if until is not None:
+                query["created_at"] = {"$lte": until}
+
+            mongo = AnswerEvent._get_mongo()
+            return list(mongo.db[AnswerEvent.COLLECTION].find(query).sort("_id", 1))
+        except Exception as e:
+            print(f"获取答案事件失败: {e}")
+            return []
+
+    @staticmethod
+    def fold(user_id: str, events: List[Dict], attempt: int = 0) -> List[Dict]:
+        """把事件依次折叠为答案记录（与 responses 文档结构相同，按答题顺序排列）
+
+        重置事件清空之前的答案；同一问题以最后一次回答为准。
+        """
+        from app.models.question import Question
+        from app.models.response import Response
+
+        records = {}
+        for event in events:
+            if event.get("type") == "reset":
+                records = {}
+                continue
+
+            answer_option = Question.get_answer_option(event.get("question_id"), event.get("answer_value"))
+            if answer_option is None:
+                continue
+            records[event["question_id"]] = Response._build_answer_record(
+                user_id, attempt, answer_option, event.get("answer_text"), event["created_at"]
+            )
+
+        return sorted(records.values(), key=lambda record: (record["answered_at"], record["question_id"]))
+
+    @staticmethod
+    def rebuild_profile(user_id: str) -> bool:
+        """根据事件日志重建用户当前轮次的推荐画像（不依赖压缩进度）"""
+        from app.models.profile import RecommendationProfile
+        try:
+            if not AnswerEvent._check_db_available():
+                return False
+
+            mongo = AnswerEvent._get_mongo()
+            user = mongo.db.users.find_one(
+                {"_id": ObjectId(user_id)},
+                {"questionnaire_attempt": 1, "answers_revision": 1, "last_reset_at": 1}
+            ) or {}
+
+            # 只折叠最近一次重置之后的事件
+            events = AnswerEvent.get_history(user_id)
+            if user.get("last_reset_at"):
+                events = [event for event in events if event["created_at"] >= user["last_reset_at"]]
+
+            attempt = user.get("questionnaire_attempt", 0)
+            return RecommendationProfile.rebuild(
+                user_id, attempt, AnswerEvent.fold(user_id, events, attempt),
+                user.get("answers_revision", 0)
+            )
+        except Exception as e:
+            print(f"根据事件重建推荐画像失败: {e}")
+            return False
+
+    @staticmethod
+    def replay(user_id: str, until: datetime = None) -> Optional[Dict]:
+        """回放用户截止到某一时间的答题历史，得到当时的推荐算法输入（用于离线评估）"""
+        from app.models.response import Response
+
+        events = AnswerEvent.get_history(user_id, until)
+        if not events:
+            return None
+
+        records = AnswerEvent.fold(user_id, events)
+        return Response._build_recommendation_data(
+            user_id, Response._group_by_category(records), len(records)
+        )
@@ -0,0 +1,143 @@
+# app/models/profile.py - 物化的推荐画像
+from datetime import datetime
+from typing import List, Dict, Optional
+from app.utils.catalog_cache import OPTION_MAPPING_FIELDS
+
+# 画像中为每个问题保留的字段（即推荐算法读取的全部字段）
+PROFILE_ENTRY_FIELDS = ("question_category", "catalog_revision", "answer_text", "answered_at") + OPTION_MAPPING_FIELDS
+
+class RecommendationProfile:
+    """每个用户一份的物化推荐输入画像"""
+
+    COLLECTION = "recommendation_profiles"
+
+    @staticmethod
+    def _get_mongo():
+        """获取mongo实例"""
+        from app.utils.database import mongo
+        if mongo is None:
+            raise RuntimeError("MongoDB connection not initialized")
+        return mongo
+
+    @staticmethod
+    def _check_db_available():
+        """检查数据库是否可用"""
+        from app.utils.database import is_db_available
+        return is_db_available()
+
+    @staticmethod
+    def get_entries(user_id: str, attempt: int = 0, revision: int = 0,
+                    question_revisions: Dict[str, str] = None) -> Optional[List[Dict]]:
+        """获取按答题顺序排列的画像条目
+
+        画像尚未建立、属于旧轮次、版本号不一致，或有条目补全时所用的问题修订标识（catalog_revision）
+        与 question_revisions 不同时返回 None。按整个题库版本记录的旧画像（catalog_version）同样返回 None，重建一次。
+        """
+        try:
+            if not RecommendationProfile._check_db_available():
+                return None
+
+            mongo = RecommendationProfile._get_mongo()
+            profile = mongo.db[RecommendationProfile.COLLECTION].find_one({"_id": str(user_id)})
+            if (profile is None or profile.get("attempt", 0) != attempt or profile.get("revision") != revision
+                    or "catalog_version" in profile):
+                return None
+
+            question_revisions = question_revisions or {}
+            entries = []
+            for question_id, entry in (profile.get("answers") or {}).items():
+                stored_revision = entry.get("catalog_revision")
+                if stored_revision is not None and stored_revision != question_revisions.get(question_id, stored_revision):
+                    return None
+                entry = dict(entry)
+                entry["question_id"] = question_id
+                entries.append(entry)
+
+            # 与 Response.get_user_responses 相同的排序规则
+            entries.sort(key=lambda entry: (entry["answered_at"], entry["question_id"]))
+            return entries
+        except Exception as e:
+            print(f"获取推荐画像失败: {e}")
+            return None
+
+    @staticmethod
+    def record_answers(user_id: str, attempt: int, answer_records: List[Dict], revision: Optional[int]) -> bool:
+        """答案新增或修改后更新画像中对应问题的贡献，并把画像版本号更新为 revision
+
+        revision 为这次写入后用户的答案版本号。只更新属于同一轮次、且恰好停在上一个
+        版本号的画像；其余情况（包括更早的写入未能更新画像）在下次读取时根据答案重建。
+        """
+        try:
+            if not answer_records or revision is None or not RecommendationProfile._check_db_available():
+                return False
+
+            updates = {
+                f"answers.{record['question_id']}": RecommendationProfile._entry(record)
+                for record in answer_records
+            }
+            updates["revision"] = revision
+            updates["updated_at"] = datetime.utcnow()
+
+            from app.models.user import User
+            mongo = RecommendationProfile._get_mongo()
+            result = mongo.db[RecommendationProfile.COLLECTION].update_one(
+                {"_id": str(user_id), "attempt": User.attempt_condition(attempt), "revision": revision - 1},
+                {"$set": updates}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"更新推荐画像失败: {e}")
+            return False
+
+    @staticmethod
+    def rebuild(user_id: str, attempt: int, responses: List[Dict], revision: int = 0) -> bool:
+        """根据用户当前轮次的全部答案重建画像
+
+        revision 为读取答案之前取得的用户答案版本号。
+        """
+        try:
+            if not RecommendationProfile._check_db_available():
+                return False
+
+            mongo = RecommendationProfile._get_mongo()
+            mongo.db[RecommendationProfile.COLLECTION].replace_one(
+                {"_id": str(user_id)},
+                {
+                    "attempt": attempt,
+                    "revision": revision,
+                    "answers": {
+                        response["question_id"]: RecommendationProfile._entry(response)
+                        for response in responses
+                    },
+                    "rebuilt_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                },
+                upsert=True
+            )
+            print(f"推荐画像已重建: {user_id} ({len(responses)} 个答案)")
+            return True
+        except Exception as e:
+            print(f"重建推荐画像失败: {e}")
+            return False
+
+    @staticmethod
+    def clear(user_id: str) -> bool:
+        """删除用户答案时清空画像"""
+        try:
+            if not RecommendationProfile._check_db_available():
+                return False
+
+            mongo = RecommendationProfile._get_mongo()
+            result = mongo.db[RecommendationProfile.COLLECTION].update_one(
+                {"_id": str(user_id)},
+                {"$set": {"answers": {}, "updated_at": datetime.utcnow()}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            print(f"清空推荐画像失败: {e}")
+            return False
+
+    @staticmethod
+    def _entry(record: Dict) -> Dict:
+        # 缺失的字段保持缺失，折叠时的 .get() 默认值才与读取答案文档时一致
+        return {field: record[field] for field in PROFILE_ENTRY_FIELDS if field in record}
@@ -2,6 +2,7 @@
 from bson import ObjectId
 from datetime import datetime
 from typing import List, Dict, Optional
+from app.utils.catalog_cache import question_catalog, compile_answer_option, question_revision
 
 class Question:
     """问卷题目模型 - 增强版"""
@@ -52,6 +53,7 @@ class Question:
             }
 
             result = mongo.db.questions.insert_one(question_data)
+            question_catalog.bump_version()
             print(f"问题创建成功: {question_id}")
             return str(result.inserted_id)
         except Exception as e:
@@ -65,15 +67,63 @@ class Question:
             if not Question._check_db_available():
                 return Question._get_sample_question_by_id(question_id)
                 
-            mongo = Question._get_mongo()
-            question = mongo.db.questions.find_one({"question_id": question_id})
-            if question:
-                question["_id"] = str(question["_id"])
-            return question
+            snapshot = question_catalog.get_snapshot()
+            question = snapshot.by_id.get(question_id)
+            return dict(question) if question else None
         except Exception as e:
             print(f"获取问题失败: {e}")
             return None
 
+    @staticmethod
+    def get_question_revisions() -> Dict[str, str]:
+        """全部问题（包括已停用的）的修订标识，question_id -> 修订标识
+
+        返回的字典在进程内共享，只读。
+        """
+        try:
+            if not Question._check_db_available():
+                return {q['question_id']: question_revision(q) for q in Question._get_sample_questions()}
+            return question_catalog.get_snapshot().revisions
+        except Exception as e:
+            print(f"获取问题修订标识失败: {e}")
+            return {}
+
+    @staticmethod
+    def get_question_ids_by_category(category: str) -> List[str]:
+        """获取某分类下全部问题的 ID（包括已停用的问题，用于查询历史答案）"""
+        try:
+            if not Question._check_db_available():
+                return [q['question_id'] for q in Question._get_sample_questions() if q.get('category') == category]
+            
+            snapshot = question_catalog.get_snapshot()
+            return [qid for qid, question in snapshot.by_id.items() if question.get('category') == category]
+        except Exception as e:
+            print(f"获取分类问题ID失败: {e}")
+            return []
+
+    @staticmethod
+    def get_answer_option(question_id: str, answer_value: str) -> Optional[Dict]:
+        """根据 (question_id, answer_value) 获取答案选项及其映射数据
+
+        返回的字典在进程内共享，只读。问题不存在或选项无效时返回 None。
+        """
+        try:
+            if not isinstance(answer_value, str):
+                return None
+            
+            if not Question._check_db_available():
+                question = Question._get_sample_question_by_id(question_id)
+                for option in (question or {}).get('options', []):
+                    if option['value'] == answer_value:
+                        return compile_answer_option(question, option)
+                return None
+            
+            snapshot = question_catalog.get_snapshot()
+            return snapshot.options.get((question_id, answer_value))
+        except Exception as e:
+            print(f"获取答案选项失败: {e}")
+            return None
+
     @staticmethod
     def get_all_active() -> List[Dict]:
         """获取所有启用的问题，按order排序"""
@@ -82,14 +132,8 @@ class Question:
                 print("数据库服务暂不可用，返回示例问题")
                 return Question._get_sample_questions()
                 
-            mongo = Question._get_mongo()
-            questions = list(mongo.db.questions.find(
-                {"is_active": True}
-            ).sort("order", 1))
-            
-            # 转换ObjectId为字符串
-            for question in questions:
-                question["_id"] = str(question["_id"])
+            snapshot = question_catalog.get_snapshot()
+            questions = [dict(question) for question in snapshot.active]
             
             print(f"获取到 {len(questions)} 个活跃问题")
             return questions
@@ -97,6 +141,18 @@ class Question:
             print(f"获取问题列表失败: {e}")
             return Question._get_sample_questions()
 
+    @staticmethod
+    def count_active() -> int:
+        """获取启用问题的数量"""
+        try:
+            if not Question._check_db_available():
+                return len(Question._get_sample_questions())
+                
+            return len(question_catalog.get_snapshot().active)
+        except Exception as e:
+            print(f"统计问题数量失败: {e}")
+            return len(Question.get_all_active())
+
     @staticmethod
     def get_by_category(category: str) -> List[Dict]:
         """根据分类获取问题"""
@@ -104,13 +160,8 @@ class Question:
             if not Question._check_db_available():
                 return Question._get_sample_questions_by_category(category)
                 
-            mongo = Question._get_mongo()
-            questions = list(mongo.db.questions.find(
-                {"category": category, "is_active": True}
-            ).sort("order", 1))
-            
-            for question in questions:
-                question["_id"] = str(question["_id"])
+            snapshot = question_catalog.get_snapshot()
+            questions = [dict(question) for question in snapshot.by_category.get(category, [])]
             
             print(f"分类 {category} 有 {len(questions)} 个问题")
             return questions
@@ -125,13 +176,45 @@ class Question:
             if not Question._check_db_available():
                 return ["skill_assessment", "interest_preference", "career_goal", "learning_style", "time_planning"]
                 
-            mongo = Question._get_mongo()
-            categories = mongo.db.questions.distinct("category", {"is_active": True})
-            return list(categories)
+            snapshot = question_catalog.get_snapshot()
+            return sorted(snapshot.by_category.keys())
         except Exception as e:
             print(f"获取问题分类失败: {e}")
             return ["skill_assessment", "interest_preference", "career_goal", "learning_style", "time_planning"]
 
+    @staticmethod
+    def get_category_summary() -> List[Dict]:
+        """获取所有分类及其启用问题数量
+
+        优先使用题库缓存；缓存不可用时用一次聚合查询统计。
+        """
+        try:
+            if not Question._check_db_available():
+                return [
+                    {"category": category, "question_count": len(Question._get_sample_questions_by_category(category))}
+                    for category in ["skill_assessment", "interest_preference", "career_goal", "learning_style", "time_planning"]
+                ]
+            
+            try:
+                snapshot = question_catalog.get_snapshot()
+                return [
+                    {"category": category, "question_count": len(snapshot.by_category[category])}
+                    for category in sorted(snapshot.by_category.keys())
+                ]
+            except Exception as e:
+                print(f"题库缓存不可用，使用聚合查询统计分类: {e}")
+            
+            mongo = Question._get_mongo()
+            summary = mongo.db.questions.aggregate([
+                {"$match": {"is_active": True}},
+                {"$group": {"_id": "$category", "question_count": {"$sum": 1}}},
+                {"$sort": {"_id": 1}}
+            ])
+            return [{"category": item["_id"], "question_count": item["question_count"]} for item in summary]
+        except Exception as e:
+            print(f"获取分类统计失败: {e}")
+            return []
+
     @staticmethod
     def deactivate(question_id: str) -> bool:
         """停用问题"""
@@ -147,6 +230,8 @@ class Question:
             )
             
             success = result.modified_count > 0
+            if success:
+                question_catalog.bump_version()
             print(f"问题停用: {'成功' if success else '失败'}")
             return success
         except Exception as e:
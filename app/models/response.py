@@ -1,11 +1,21 @@
 # app/models/response.py - 带降级模式
 from bson import ObjectId
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.models.answer_event import AnswerEvent
+from app.models.profile import RecommendationProfile
+from app.utils import request_cache
+from app.utils.catalog_cache import OPTION_MAPPING_FIELDS
+from app.utils.settings import get_setting
 
 class Response:
     """用户答案模型 - 增强版"""
 
+    # 可以根据 (question_id, answer_value) 从题库补全的字段，compact 存储格式不保存
+    CATALOG_FIELDS = ("question_category", "tags", "weight", "score") + OPTION_MAPPING_FIELDS
+
     @staticmethod
     def _get_mongo():
         """获取mongo实例"""
@@ -31,86 +41,313 @@ class Response:
                 
             mongo = Response._get_mongo()
             
-            # 获取问题信息用于解析答案
+            # 从题库索引获取选项数据，无需访问数据库
             from app.models.question import Question
-            question = Question.get_by_id(question_id)
-            if not question:
-                print(f"问题不存在: {question_id}")
+            answer_option = Question.get_answer_option(question_id, answer_value)
+            if not answer_option:
+                print(f"问题不存在或答案选项无效: {question_id}={answer_value}")
                 return False
             
-            # 找到对应的选项数据
-            option_data = None
-            for option in question.get('options', []):
-                if option['value'] == answer_value:
-                    option_data = option
-                    break
+            if Response._use_event_log():
+                # 只追加一条事件，由压缩任务写入当前状态
+                return AnswerEvent.append_answers(user_id, [{
+                    "question_id": question_id,
+                    "answer_value": answer_value,
+                    "answer_text": answer_text
+                }])
             
-            if not option_data:
-                print(f"无效的答案选项: {answer_value}")
-                return False
+            Response._warn_if_answer_index_missing()
             
-            answer_record = {
-                "user_id": str(user_id),
-                "question_id": question_id,
-                "question_category": question["category"],
-                "answer_value": answer_value,
-                "answer_text": answer_text or option_data["text"],
-                
-                # 根据问题类型存储不同的数据结构
-                "skill_mapping": option_data.get("skill_mapping"),
-                "path_weights": option_data.get("path_weights"), 
-                "goal_mapping": option_data.get("goal_mapping"),
-                "style_mapping": option_data.get("style_mapping"),
-                "time_mapping": option_data.get("time_mapping"),
-                
-                # 通用字段
-                "tags": option_data.get("tags", []),
-                "weight": question.get("weight", 1),
-                "score": option_data.get("score", 0),  # 保持向后兼容
-                "answered_at": datetime.utcnow()
-            }
+            attempt = Response._current_attempt(user_id)
+            answer_record = Response._build_answer_record(user_id, attempt, answer_option, answer_text)
+            answer_filter = dict(Response._attempt_filter(user_id, attempt), question_id=question_id)
+            answer_update = Response._storage_update(answer_record, answer_option)
+            
+            # 依赖 (user_id, attempt, question_id) 唯一索引，一次 upsert 完成新增或修改
+            try:
+                result = mongo.db.responses.update_one(answer_filter, answer_update, upsert=True)
+            except DuplicateKeyError:
+                # 并发首次提交同一问题时，另一请求已插入，改为更新
+                result = mongo.db.responses.update_one(answer_filter, answer_update)
             
-            # 检查是否已有答案（支持修改）
-            existing = mongo.db.responses.find_one({
-                "user_id": str(user_id),
-                "question_id": question_id
-            })
-            
-            if existing:
-                # 更新已有答案
-                result = mongo.db.responses.update_one(
-                    {"user_id": str(user_id), "question_id": question_id},
-                    {"$set": answer_record}
+            request_cache.invalidate_user(user_id)
+            inserted = result.upserted_id is not None
+            success = inserted or result.matched_count > 0
+            if success:
+                from app.models.user import User
+                revision = User.record_answer_write(
+                    user_id, attempt, {answer_record["question_category"]: 1} if inserted else None
                 )
-                success = result.modified_count > 0
-                print(f"答案更新: {'成功' if success else '失败'}")
-            else:
-                # 新增答案
-                result = mongo.db.responses.insert_one(answer_record)
-                success = bool(result.inserted_id)
-                print(f"答案保存: {'成功' if success else '失败'}")
+                if Response._use_materialized_profile():
+                    RecommendationProfile.record_answers(
+                        user_id, attempt, Response._profile_records([answer_record]), revision
+                    )
+            print(f"答案{'保存' if inserted else '更新'}: {'成功' if success else '失败'}")
             
             return success
         except Exception as e:
             print(f"保存答案失败: {e}")
             return False
 
+    @staticmethod
+    def save_answers_bulk(user_id: str, answers: List[Dict]) -> List[bool]:
+        """批量保存答案
+
+        answers 中每项包含 question_id、answer_value 和可选的 answer_text，
+        返回与输入一一对应的成功标记。事件日志模式下有效答案以一次插入写入事件日志。
+        """
+        if not Response._use_event_log():
+            return Response.apply_answers_bulk(user_id, answers)
+        
+        from app.models.question import Question
+        valid = [bool(Question.get_answer_option(answer.get('question_id'), answer.get('answer_value')))
+                 for answer in answers]
+        appended = AnswerEvent.append_answers(user_id, [answer for answer, ok in zip(answers, valid) if ok])
+        return [ok and appended for ok in valid]
+
+    @staticmethod
+    def apply_answers_bulk(user_id: str, answers: List[Dict]) -> List[bool]:
+        """把答案写入当前状态 - 所有 upsert 通过一次无序 bulk_write 完成
+
+        answers 中每项可带 answered_at（压缩事件时使用事件时间）。同一问题出现多次时以最后一次为准。
+        """
+        results = [False] * len(answers)
+        try:
+            if not Response._check_db_available():
+                print("数据库服务暂不可用")
+                return results
+            
+            Response._warn_if_answer_index_missing()
+                
+            mongo = Response._get_mongo()
+            from app.models.question import Question
+            
+            # 在内存中校验并去重：question_id -> 最后一次出现的位置
+            latest = {}
+            options = {}
+            for index, answer in enumerate(answers):
+                answer_option = Question.get_answer_option(answer.get('question_id'), answer.get('answer_value'))
+                if answer_option:
+                    latest[answer_option["question_id"]] = index
+                    options[index] = answer_option
+            
+            if not latest:
+                return results
+            
+            attempt = Response._current_attempt(user_id)
+            records = []
+            updates = []
+            for question_id, index in latest.items():
+                record = Response._build_answer_record(
+                    user_id, attempt, options[index], answers[index].get('answer_text'), answers[index].get('answered_at')
+                )
+                records.append(record)
+                updates.append(Response._storage_update(record, options[index]))
+            
+            def _update(op_index):
+                record = records[op_index]
+                answer_filter = dict(Response._attempt_filter(user_id, attempt), question_id=record["question_id"])
+                return answer_filter, updates[op_index]
+            
+            try:
+                result = mongo.db.responses.bulk_write(
+                    [UpdateOne(*_update(op_index), upsert=True) for op_index in range(len(records))],
+                    ordered=False
+                )
+                write_errors = []
+                upserted_ops = set(result.upserted_ids.keys())
+            except BulkWriteError as e:
+                write_errors = e.details.get('writeErrors', [])
+                upserted_ops = {item['index'] for item in e.details.get('upserted', [])}
+            
+            request_cache.invalidate_user(user_id)
+            failed_ops = {error['index'] for error in write_errors}
+            
+            # 并发首次提交导致的唯一索引冲突：记录已存在，改为普通更新重试
+            retry_ops = [error['index'] for error in write_errors if error.get('code') == 11000]
+            if retry_ops:
+                try:
+                    mongo.db.responses.bulk_write(
+                        [UpdateOne(*_update(op_index)) for op_index in retry_ops],
+                        ordered=False
+                    )
+                    failed_ops.difference_update(retry_ops)
+                except BulkWriteError as e:
+                    still_failed = {error['index'] for error in e.details.get('writeErrors', [])}
+                    failed_ops.difference_update(
+                        op_index for i, op_index in enumerate(retry_ops) if i not in still_failed
+                    )
+            
+            saved = {}
+            category_counts = {}
+            for op_index, record in enumerate(records):
+                saved[record["question_id"]] = op_index not in failed_ops
+                if op_index in upserted_ops:
+                    category = record["question_category"]
+                    category_counts[category] = category_counts.get(category, 0) + 1
+            
+            for index, answer_option in options.items():
+                results[index] = saved[answer_option["question_id"]]
+            
+            saved_records = [record for op_index, record in enumerate(records) if op_index not in failed_ops]
+            if saved_records:
+                from app.models.user import User
+                revision = User.record_answer_write(user_id, attempt, category_counts)
+                if Response._use_materialized_profile():
+                    RecommendationProfile.record_answers(
+                        user_id, attempt, Response._profile_records(saved_records), revision
+                    )
+            
+            print(f"批量保存答案: {len(records)} 个写入, {len(upserted_ops)} 个新增, {len(failed_ops)} 个失败")
+            return results
+        except Exception as e:
+            print(f"批量保存答案失败: {e}")
+            return results
+
+    # 缺少答案唯一索引的警告每个进程只记录一次
+    _answer_index_warned = False
+
+    @staticmethod
+    def _warn_if_answer_index_missing():
+        """(user_id, attempt, question_id) 唯一索引缺失时记录警告，写入照常进行"""
+        from app.utils.database import has_unique_index
+        if Response._answer_index_warned or has_unique_index('responses', 'user_id_1_attempt_1_question_id_1'):
+            return
+        Response._answer_index_warned = True
+        print("⚠️ 缺少答案唯一索引 user_id_1_attempt_1_question_id_1，并发提交可能产生重复答案，"
+              "请运行 python scripts/db_manager.py dedupe-responses")
+
+    @staticmethod
+    def _build_answer_record(user_id: str, attempt: int, answer_option: Dict, answer_text: str = None,
+                             answered_at: datetime = None) -> Dict:
+        """根据编译好的答案选项构造答案文档"""
+        return {
+            "user_id": str(user_id),
+            "attempt": attempt,
+            "question_id": answer_option["question_id"],
+            "question_category": answer_option["question_category"],
+            "question_revision": answer_option["question_revision"],
+            "answer_value": answer_option["answer_value"],
+            "answer_text": answer_text or answer_option["answer_text"],
+            
+            # 根据问题类型存储不同的数据结构
+            "skill_mapping": answer_option["skill_mapping"],
+            "path_weights": answer_option["path_weights"], 
+            "goal_mapping": answer_option["goal_mapping"],
+            "style_mapping": answer_option["style_mapping"],
+            "time_mapping": answer_option["time_mapping"],
+            
+            # 通用字段
+            "tags": answer_option["tags"],
+            "weight": answer_option["weight"],
+            "score": answer_option["score"],  # 保持向后兼容
+            "answered_at": answered_at or datetime.utcnow()
+        }
+
+    @staticmethod
+    def _use_event_log() -> bool:
+        """提交答案是否只写事件日志（ANSWER_WRITE_MODE）"""
+        return get_setting('ANSWER_WRITE_MODE', 'direct') == 'event_log'
+
+    @staticmethod
+    def _answer_state(user_id: str) -> Dict:
+        """用户当前的答题轮次和答案版本号（同一请求内只查询一次）"""
+        from app.models.user import User
+        return request_cache.memoize(
+            ('attempt', str(user_id)), lambda: User.get_answer_state(user_id)
+        )
+
+    @staticmethod
+    def _current_attempt(user_id: str) -> int:
+        """用户当前的答题轮次"""
+        return Response._answer_state(user_id)["attempt"]
+
+    @staticmethod
+    def _attempt_filter(user_id: str, attempt: int = None) -> Dict:
+        """匹配用户某一轮次（默认当前轮次）答案的查询条件"""
+        from app.models.user import User
+        if attempt is None:
+            attempt = Response._current_attempt(user_id)
+        return {"user_id": str(user_id), "attempt": User.attempt_condition(attempt)}
+
+    @staticmethod
+    def _use_compact_storage() -> bool:
+        """答案是否以 compact 格式存储（RESPONSE_STORAGE_MODE）"""
+        return get_setting('RESPONSE_STORAGE_MODE', 'full') == 'compact'
+
+    @staticmethod
+    def _storage_update(answer_record: Dict, answer_option: Dict) -> Dict:
+        """按存储格式生成写入答案文档的更新操作"""
+        if not Response._use_compact_storage():
+            return {"$set": answer_record}
+        
+        stored = {
+            "user_id": answer_record["user_id"],
+            "attempt": answer_record["attempt"],
+            "question_id": answer_record["question_id"],
+            "answer_value": answer_record["answer_value"],
+            "question_revision": answer_record["question_revision"],
+            "answered_at": answer_record["answered_at"]
+        }
+        # 覆盖以前以 full 格式保存的同一答案时，去掉冗余字段
+        unset = {field: "" for field in Response.CATALOG_FIELDS}
+        if answer_record["answer_text"] != answer_option["answer_text"]:
+            stored["answer_text"] = answer_record["answer_text"]
+        else:
+            unset["answer_text"] = ""
+        return {"$set": stored, "$unset": unset}
+
+    @staticmethod
+    def _profile_records(answer_records: List[Dict]) -> List[Dict]:
+        """写入画像的答案记录：compact 格式的答案读取时从题库补全，记录补全所用的问题修订标识"""
+        if not Response._use_compact_storage():
+            return answer_records
+        return [dict(record, catalog_revision=record["question_revision"]) for record in answer_records]
+
+    @staticmethod
+    def _resolve_catalog_fields(response: Dict) -> Dict:
+        """为 compact 格式的答案从题库补全类别、映射等字段（full 格式原样返回）"""
+        from app.models.question import Question
+        if "question_category" in response:
+            return response
+        
+        answer_option = Question.get_answer_option(response.get("question_id"), response.get("answer_value"))
+        if answer_option is None:
+            # 问题或选项已从题库删除，无法补全，不参与按类别的统计
+            response["question_category"] = None
+            return response
+        
+        for field in Response.CATALOG_FIELDS:
+            response[field] = answer_option[field]
+        response.setdefault("answer_text", answer_option["answer_text"])
+        # question_revision 为作答时的问题修订标识，与 catalog_revision 不同说明问题在作答后被修改过
+        response["catalog_revision"] = answer_option["question_revision"]
+        return response
+
     @staticmethod
     def get_user_responses(user_id: str) -> List[Dict]:
-        """获取用户的所有答案"""
+        """获取用户的所有答案（同一请求内只查询一次，返回的列表只读）"""
+        return request_cache.memoize(
+            ('responses', str(user_id)), lambda: Response._load_user_responses(user_id)
+        )
+
+    @staticmethod
+    def _load_user_responses(user_id: str) -> List[Dict]:
         try:
             if not Response._check_db_available():
                 print("数据库服务暂不可用，返回空答案列表")
                 return []
                 
             mongo = Response._get_mongo()
+            # 同一时间戳内按 question_id 排序，保证顺序确定（推荐画像依赖同样的顺序）
             responses = list(mongo.db.responses.find(
-                {"user_id": str(user_id)}
-            ).sort("answered_at", 1))
+                Response._attempt_filter(user_id)
+            ).sort([("answered_at", 1), ("question_id", 1)]))
             
             # 转换ObjectId为字符串
             for response in responses:
                 response["_id"] = str(response["_id"])
+                Response._resolve_catalog_fields(response)
             
             print(f"用户 {user_id} 有 {len(responses)} 个答案")
             return responses
@@ -125,14 +362,17 @@ class Response:
             if not Response._check_db_available():
                 return []
                 
+            # compact 格式不保存类别，按该类别的问题 ID 查询，两种存储格式的答案都能匹配
+            from app.models.question import Question
             mongo = Response._get_mongo()
-            responses = list(mongo.db.responses.find({
-                "user_id": str(user_id),
-                "question_category": category
-            }).sort("answered_at", 1))
+            category_filter = {"question_id": {"$in": Question.get_question_ids_by_category(category)}}
+            responses = list(mongo.db.responses.find(
+                dict(category_filter, **Response._attempt_filter(user_id))
+            ).sort("answered_at", 1))
             
             for response in responses:
                 response["_id"] = str(response["_id"])
+                Response._resolve_catalog_fields(response)
             
             print(f"用户 {user_id} 在 {category} 类别有 {len(responses)} 个答案")
             return responses
@@ -148,13 +388,13 @@ class Response:
                 return None
                 
             mongo = Response._get_mongo()
-            response = mongo.db.responses.find_one({
-                "user_id": str(user_id),
-                "question_id": question_id
-            })
+            response = mongo.db.responses.find_one(
+                dict(Response._attempt_filter(user_id), question_id=question_id)
+            )
             
             if response:
                 response["_id"] = str(response["_id"])
+                Response._resolve_catalog_fields(response)
             
             return response
         except Exception as e:
@@ -169,7 +409,7 @@ class Response:
                 return 0
                 
             mongo = Response._get_mongo()
-            count = mongo.db.responses.count_documents({"user_id": str(user_id)})
+            count = mongo.db.responses.count_documents(Response._attempt_filter(user_id))
             print(f"用户 {user_id} 已回答 {count} 个问题")
             return count
         except Exception as e:
@@ -177,16 +417,141 @@ class Response:
             return 0
 
     @staticmethod
-    def get_user_progress(user_id: str) -> Dict:
+    def get_answer_counts(user_id: str) -> Dict:
+        """获取用户答题计数（总数和各分类数量）
+
+        计数维护在用户文档上，一次主键查询即可得到；老用户没有计数时按答案统计一次并回写。
+        同一请求内只查询一次。
+        """
+        return request_cache.memoize(
+            ('answer_counts', str(user_id)), lambda: Response._load_answer_counts(user_id)
+        )
+
+    @staticmethod
+    def _load_answer_counts(user_id: str) -> Dict:
+        empty = {"answered_count": 0, "by_category": {}}
+        try:
+            if not Response._check_db_available():
+                return empty
+            
+            from app.models.user import User
+            counts = User.get_answer_counts(user_id)
+            if counts is not None:
+                return counts
+            
+            counts = Response._count_answers(user_id, Response._current_attempt(user_id))
+            User.init_answer_counts(user_id, counts["answered_count"], counts["by_category"])
+            # 统计之后、写入之前新增的答案不在统计结果中，也不会递增（计数尚未建立），写入后重新统计一次
+            Response.recount_answer_counts(user_id)
+            return User.get_answer_counts(user_id) or counts
+        except Exception as e:
+            print(f"获取答题计数失败: {e}")
+            return empty
+
+    @staticmethod
+    def _count_answers(user_id: str, attempt: int) -> Dict:
+        """按某一轮次的答案统计答题计数（总数和各分类数量）"""
+        from app.models.user import User
+        mongo = Response._get_mongo()
+        by_category = {}
+        for response in mongo.db.responses.find(
+            {"user_id": str(user_id), "attempt": User.attempt_condition(attempt)},
+            {"_id": 0, "question_id": 1, "answer_value": 1, "question_category": 1}
+        ):
+            category = Response._resolve_catalog_fields(response)["question_category"]
+            if category:
+                by_category[category] = by_category.get(category, 0) + 1
+        return {"answered_count": sum(by_category.values()), "by_category": by_category}
+
+    @staticmethod
+    def recount_answer_counts(user_id: str) -> Optional[bool]:
+        """按当前轮次的答案重新统计答题计数，与用户文档上的计数不一致时修正
+
+        答案写入后的计数递增是单独的一次写入，失败时计数会偏差，可以用它修复。
+        只有统计期间计数和轮次都没有变化时才写入，不会覆盖并发的递增。
+        返回是否修正了计数；用户不存在或统计期间计数发生变化时返回 None。
+        """
+        try:
+            if not Response._check_db_available():
+                return None
+            
+            from app.models.user import User
+            stored = User.get_answer_count_state(user_id)
+            if stored is None:
+                return None
+            
+            counts = Response._count_answers(user_id, stored.get("questionnaire_attempt", 0))
+            stored_by_category = {category: count for category, count
+                                  in (stored.get("answered_by_category") or {}).items() if count}
+            if stored.get("answered_count") == counts["answered_count"] and stored_by_category == counts["by_category"]:
+                return False
+            
+            if not User.replace_answer_counts(user_id, stored, counts["answered_count"], counts["by_category"]):
+                print(f"用户 {user_id} 的答题计数在统计期间发生变化，跳过修正")
+                return None
+            request_cache.invalidate(('answer_counts', str(user_id)))
+            print(f"修正用户 {user_id} 的答题计数: {stored.get('answered_count')} -> {counts['answered_count']}")
+            return True
+        except Exception as e:
+            print(f"重新统计答题计数失败: {e}")
+            return None
+
+    @staticmethod
+    def recount_all_answer_counts(batch_size: int = 500, only_missing: bool = False) -> Dict:
+        """分批为所有用户重新统计答题计数
+
+        only_missing 为 True 时只为尚未建立计数的老用户建立计数（开启计数读取前的一次性迁移）。
+        返回检查的用户数和修正（或新建立计数）的用户数。
+        """
+        stats = {"users": 0, "fixed": 0}
+        if not Response._check_db_available():
+            print("数据库服务暂不可用")
+            return stats
+        
+        from app.models.user import User
+        mongo = Response._get_mongo()
+        query = {"answered_count": {"$exists": False}} if only_missing else {}
+        last_id = None
+        
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query["_id"] = {"$gt": last_id}
+            user_ids = [user["_id"] for user in mongo.db.users.find(batch_query, {"_id": 1}).sort("_id", 1).limit(batch_size)]
+            if not user_ids:
+                break
+            
+            for user_id in user_ids:
+                user_id = str(user_id)
+                if only_missing:
+                    user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"questionnaire_attempt": 1}) or {}
+                    counts = Response._count_answers(user_id, user.get("questionnaire_attempt", 0))
+                    if User.init_answer_counts(user_id, counts["answered_count"], counts["by_category"]):
+                        stats["fixed"] += 1
+                    # 与读取时的补建相同，写入后重新统计一次
+                    Response.recount_answer_counts(user_id)
+                elif Response.recount_answer_counts(user_id):
+                    stats["fixed"] += 1
+                stats["users"] += 1
+            
+            last_id = user_ids[-1]
+            print(f"已检查 {stats['users']} 个用户")
+        
+        return stats
+
+    @staticmethod
+    def get_user_progress(user_id: str, answer_counts: Dict = None) -> Dict:
         """获取用户答题进度"""
         try:
             from app.models.question import Question
             
             # 获取总问题数
-            total_questions = len(Question.get_all_active())
+            total_questions = Question.count_active()
             
             # 获取已回答数
-            answered_count = Response.count_user_responses(user_id)
+            if answer_counts is None:
+                answer_counts = Response.get_answer_counts(user_id)
+            answered_count = answer_counts["answered_count"]
             
             # 计算进度
             progress_percentage = (answered_count / total_questions * 100) if total_questions > 0 else 0
@@ -211,6 +576,57 @@ class Response:
                 "is_demo_mode": True
             }
 
+    @staticmethod
+    def get_progress_after_submit(user_id: str, question_ids: List[str]) -> Dict:
+        """提交答案后返回的进度
+
+        事件日志模式下答案由压缩任务异步写入，答题计数尚未包含本次提交。为了不在提交时
+        额外读取答案和事件，按计数加上本次提交的问题数估算已回答数（修改已有答案时偏高），
+        并标记 is_estimated；准确的进度由 /status 计算，问卷完成状态由压缩任务更新。
+        """
+        if not Response._use_event_log():
+            return Response.get_user_progress(user_id)
+        
+        from app.models.question import Question
+        counts = Response.get_answer_counts(user_id)
+        answered_count = min(counts["answered_count"] + len(set(question_ids)), Question.count_active())
+        progress = Response.get_user_progress(user_id, {"answered_count": answered_count, "by_category": {}})
+        progress["is_estimated"] = True
+        return progress
+
+    @staticmethod
+    def get_status_counts(user_id: str) -> Dict:
+        """/status 使用的答题计数
+
+        事件日志模式下在计数之上加入该用户尚未压缩的答案事件中、当前轮次还没有答案的问题。
+        """
+        counts = Response.get_answer_counts(user_id)
+        if not Response._use_event_log():
+            return counts
+        
+        try:
+            from app.models.question import Question
+            pending = AnswerEvent.pending_question_ids(user_id)
+            if not pending:
+                return counts
+            
+            mongo = Response._get_mongo()
+            query = dict(Response._attempt_filter(user_id), question_id={"$in": sorted(pending)})
+            answered = {response["question_id"] for response in mongo.db.responses.find(query, {"question_id": 1})}
+            
+            answered_count = counts["answered_count"]
+            by_category = dict(counts["by_category"])
+            for question_id in pending - answered:
+                question = Question.get_by_id(question_id)
+                if question is None:
+                    continue
+                answered_count += 1
+                by_category[question["category"]] = by_category.get(question["category"], 0) + 1
+            return {"answered_count": answered_count, "by_category": by_category}
+        except Exception as e:
+            print(f"统计待压缩答案失败: {e}")
+            return counts
+
     @staticmethod
     def get_user_profile_data(user_id: str) -> Dict:
         """获取用户完整画像数据"""
@@ -233,18 +649,7 @@ class Response:
             all_responses = Response.get_user_responses(user_id)
             
             # 按类别分组答案
-            profile_data = {
-                "skill_assessment": [],
-                "interest_preference": [],
-                "career_goal": [],
-                "learning_style": [],
-                "time_planning": []
-            }
-            
-            for response in all_responses:
-                category = response.get("question_category")
-                if category in profile_data:
-                    profile_data[category].append(response)
+            profile_data = Response._group_by_category(all_responses)
             
             return {
                 "user_id": user_id,
@@ -269,9 +674,33 @@ class Response:
                 "is_demo_mode": True
             }
 
+    @staticmethod
+    def reset_questionnaire(user_id: str) -> bool:
+        """重新开始问卷：只递增用户的答题轮次，耗时与答案数量无关
+
+        旧轮次的答案保留到被 sweep_superseded_attempts 清理为止，可用于分析。
+        当前轮次没有答案时返回 False（事件日志模式下总是重置）。
+        """
+        try:
+            if not Response._check_db_available():
+                print("数据库服务暂不可用")
+                return False
+            
+            from app.models.user import User
+            # 事件日志模式下答题计数在压缩后才更新，不能据此判断是否有答案
+            success = User.reset_questionnaire(user_id, only_if_answered=not Response._use_event_log())
+            request_cache.invalidate_user(user_id)
+            if success and Response._use_event_log():
+                AnswerEvent.append_reset(user_id)
+            print(f"重置问卷: {'成功' if success else '无数据'}")
+            return success
+        except Exception as e:
+            print(f"重置问卷失败: {e}")
+            return False
+
     @staticmethod
     def delete_user_responses(user_id: str) -> bool:
-        """删除用户的所有答案（重新开始问卷时使用）"""
+        """删除用户所有轮次的答案"""
         try:
             if not Response._check_db_available():
                 print("数据库服务暂不可用")
@@ -279,14 +708,159 @@ class Response:
                 
             mongo = Response._get_mongo()
             result = mongo.db.responses.delete_many({"user_id": str(user_id)})
+            mongo.db[AnswerEvent.COLLECTION].delete_many({"user_id": str(user_id)})
+            request_cache.invalidate_user(user_id)
             
             success = result.deleted_count > 0
+            if success:
+                # 同时清零答题计数、重置问卷状态并清空推荐画像
+                from app.models.user import User
+                User.reset_questionnaire(user_id)
+                RecommendationProfile.clear(user_id)
             print(f"删除用户答案: {'成功' if success else '无数据'} ({result.deleted_count} 条)")
             return success
         except Exception as e:
             print(f"删除用户答案失败: {e}")
             return False
 
+    @staticmethod
+    def sweep_superseded_attempts(batch_size: int = 500, retention_days: int = None) -> Dict:
+        """分批删除用户旧轮次的答案
+
+        每个被取代的轮次按自己的重置时间判断，重置早于保留期（ATTEMPT_RETENTION_DAYS）
+        的轮次被清理，频繁重置的用户也不会一直保留旧答案。返回处理的轮次数和删除的答案数。
+        """
+        stats = {"attempts": 0, "deleted": 0}
+        if not Response._check_db_available():
+            print("数据库服务暂不可用")
+            return stats
+        
+        from datetime import timedelta
+        from app.models.user import User
+        if retention_days is None:
+            retention_days = get_setting('ATTEMPT_RETENTION_DAYS', 30)
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        
+        mongo = Response._get_mongo()
+        last_id = None
+        
+        # 按 _id 分批读取待清理的用户，不一次性载入全部用户
+        while True:
+            query = {"superseded.reset_at": {"$lte": cutoff}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            users = list(mongo.db.users.find(query, {"superseded": 1}).sort("_id", 1).limit(batch_size))
+            if not users:
+                break
+            
+            for user in users:
+                user_id = str(user["_id"])
+                for entry in user.get("superseded") or []:
+                    if entry["reset_at"] > cutoff:
+                        continue
+                    
+                    # 没有 attempt 字段的旧答案属于第 0 轮
+                    stale_filter = {"user_id": user_id, "attempt": User.attempt_condition(entry["attempt"])}
+                    while True:
+                        stale_ids = [doc["_id"] for doc in mongo.db.responses.find(stale_filter, {"_id": 1}).limit(batch_size)]
+                        if not stale_ids:
+                            break
+                        stats["deleted"] += mongo.db.responses.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+                    
+                    User.clear_superseded_attempt(user_id, entry["attempt"])
+                    stats["attempts"] += 1
+            last_id = users[-1]["_id"]
+        
+        print(f"旧轮次答案清理完成: {stats['attempts']} 个轮次, {stats['deleted']} 个答案")
+        return stats
+
+    @staticmethod
+    def compact_stored_responses(batch_size: int = 500) -> Dict:
+        """把 full 格式的答案文档分批转换为 compact 格式
+
+        映射字段改为读取时从当前题库补全；选项已不在题库中、或问题在作答后被修改过的答案保持原样。
+        返回扫描、转换和跳过的文档数量。
+        """
+        stats = {"scanned": 0, "compacted": 0, "skipped": 0}
+        if not Response._check_db_available():
+            print("数据库服务暂不可用")
+            return stats
+        
+        from app.models.question import Question
+        mongo = Response._get_mongo()
+        last_id = None
+        
+        while True:
+            query = {"question_category": {"$exists": True}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = list(mongo.db.responses.find(
+                query, {"question_id": 1, "answer_value": 1, "answer_text": 1, "question_revision": 1}
+            ).sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+            
+            operations = []
+            for response in batch:
+                answer_option = Question.get_answer_option(response.get("question_id"), response.get("answer_value"))
+                if answer_option is None:
+                    stats["skipped"] += 1
+                    continue
+                # 问题在作答后被修改过的答案从题库补全会改变结果，保留 full 格式
+                revision = response.get("question_revision", answer_option["question_revision"])
+                if revision != answer_option["question_revision"]:
+                    stats["skipped"] += 1
+                    continue
+                
+                unset = {field: "" for field in Response.CATALOG_FIELDS}
+                if response.get("answer_text") == answer_option["answer_text"]:
+                    unset["answer_text"] = ""
+                operations.append(UpdateOne(
+                    {"_id": response["_id"]}, {"$set": {"question_revision": revision}, "$unset": unset}
+                ))
+            
+            if operations:
+                result = mongo.db.responses.bulk_write(operations, ordered=False)
+                stats["compacted"] += result.modified_count
+            stats["scanned"] += len(batch)
+            last_id = batch[-1]["_id"]
+            print(f"已处理 {stats['scanned']} 个答案文档")
+        
+        return stats
+
+    @staticmethod
+    def dedupe_responses(batch_size: int = 500) -> Dict:
+        """删除同一 (user_id, 轮次, question_id) 的重复答案，只保留最新的一条"""
+        stats = {"groups": 0, "deleted": 0}
+        if not Response._check_db_available():
+            print("数据库服务暂不可用")
+            return stats
+        
+        mongo = Response._get_mongo()
+        # 没有 attempt 字段的旧答案属于第 0 轮
+        duplicates = mongo.db.responses.aggregate([
+            {"$sort": {"answered_at": -1, "_id": -1}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "attempt": {"$ifNull": ["$attempt", 0]}, "question_id": "$question_id"},
+                "ids": {"$push": "$_id"},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ], allowDiskUse=True)
+        
+        stale_ids = []
+        for group in duplicates:
+            stats["groups"] += 1
+            stale_ids.extend(group["ids"][1:])
+            if len(stale_ids) >= batch_size:
+                stats["deleted"] += mongo.db.responses.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+                stale_ids = []
+        if stale_ids:
+            stats["deleted"] += mongo.db.responses.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+        
+        print(f"重复答案清理完成: {stats['groups']} 组, 删除 {stats['deleted']} 个答案")
+        return stats
+
     @staticmethod
     def get_responses_for_recommendation(user_id: str) -> Dict:
         """获取用于推荐算法的答案数据"""
@@ -303,25 +877,37 @@ class Response:
                     "is_demo_mode": True
                 }
             
-            profile_data = Response.get_user_profile_data(user_id)
+            if Response._recommendation_input_mode() == 'aggregate' and not Response._use_compact_storage():
+                # 服务端聚合：只传输聚合后的数值和必要的映射；
+                # 有需要从题库补全的 compact 答案时改为逐条读取答案
+                result = Response._aggregate_recommendation_data(user_id)
+                if result is not None:
+                    print(f"推荐数据聚合完成，总回答数: {result['response_count']}")
+                    return result
             
-            # 处理各类别数据
-            skill_profile = Response._process_skill_assessment(profile_data["profile_data"].get("skill_assessment", []))
-            interest_profile = Response._process_interest_preference(profile_data["profile_data"].get("interest_preference", []))
-            goal_profile = Response._process_career_goal(profile_data["profile_data"].get("career_goal", []))
-            style_profile = Response._process_learning_style(profile_data["profile_data"].get("learning_style", []))
-            time_profile = Response._process_time_planning(profile_data["profile_data"].get("time_planning", []))
+            if Response._use_materialized_profile():
+                # 物化画像：一次主键查询；尚未建立、答案版本号不一致或补全 compact 答案的问题已被修改时根据答案重建
+                # （版本号须在读取答案之前取得，重建的画像才不会比记录的版本号旧）
+                from app.models.question import Question
+                state = Response._answer_state(user_id)
+                entries = RecommendationProfile.get_entries(
+                    user_id, state["attempt"], state["revision"], Question.get_question_revisions()
+                )
+                if entries is None:
+                    entries = Response.get_user_responses(user_id)
+                    RecommendationProfile.rebuild(user_id, state["attempt"], entries, state["revision"])
+                profile_data = {
+                    "profile_data": Response._group_by_category(entries),
+                    "total_responses": len(entries),
+                    "is_demo_mode": False
+                }
+            else:
+                profile_data = Response.get_user_profile_data(user_id)
             
-            result = {
-                "user_id": user_id,
-                "skill_assessment": skill_profile,
-                "interest_preference": interest_profile,
-                "career_goal": goal_profile,
-                "learning_style": style_profile,
-                "time_planning": time_profile,
-                "response_count": profile_data["total_responses"],
-                "is_demo_mode": profile_data.get("is_demo_mode", False)
-            }
+            result = Response._build_recommendation_data(
+                user_id, profile_data["profile_data"], profile_data["total_responses"]
+            )
+            result["is_demo_mode"] = profile_data.get("is_demo_mode", False)
             
             print(f"推荐数据准备完成，总回答数: {profile_data['total_responses']}")
             return result
@@ -329,15 +915,151 @@ class Response:
             print(f"获取推荐数据失败: {e}")
             return {"user_id": user_id, "response_count": 0, "is_demo_mode": True}
 
+    @staticmethod
+    def _recommendation_input_mode() -> str:
+        """推荐输入来源：materialized / aggregate / documents（RECOMMENDATION_INPUT_MODE）"""
+        return get_setting('RECOMMENDATION_INPUT_MODE', 'materialized')
+
+    @staticmethod
+    def _use_materialized_profile() -> bool:
+        """推荐输入是否来自物化画像"""
+        return Response._recommendation_input_mode() == 'materialized'
+
+    @staticmethod
+    def _path_names() -> Tuple[str, ...]:
+        """参与评分的学习路径（与推荐引擎一致，来自学习路径数据文件）"""
+        from app.services.learning_paths import learning_path_store
+        return learning_path_store.get_snapshot().path_names
+
+    @staticmethod
+    def _aggregate_recommendation_data(user_id: str) -> Optional[Dict]:
+        """用一次聚合查询在服务端计算推荐输入
+
+        技能的 level/foundation（含 all_paths × 0.5 展开）和兴趣权重在服务端求和，
+        只有求和结果、技能证据文本和目标/学习方式/时间映射会传回应用。
+        服务端求和的浮点累加方式与 Python 不同，结果在末位上可能有微小差异。
+        聚合只能使用文档中保存的字段：当前轮次有 compact 文档时返回 None。
+        """
+        paths = list(Response._path_names())
+        
+        def mapping_branch(category: str, field: str) -> List[Dict]:
+            return [
+                {"$match": {"question_category": category, field: {"$nin": [None, {}]}}},
+                {"$project": {"_id": 0, "mapping": f"${field}"}}
+            ]
+        
+        pipeline = [
+            {"$match": Response._attempt_filter(user_id)},
+            {"$sort": {"answered_at": 1, "question_id": 1}},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "unresolved": [
+                    {"$match": {"question_category": {"$exists": False}}},
+                    {"$limit": 1},
+                    {"$project": {"_id": 1}}
+                ],
+                "skills": [
+                    {"$match": {"question_category": "skill_assessment"}},
+                    {"$project": {
+                        "_id": 0,
+                        "answer_text": 1,
+                        "mapping": {"$objectToArray": {"$ifNull": ["$skill_mapping", {}]}}
+                    }},
+                    {"$unwind": "$mapping"},
+                    {"$project": {
+                        "answer_text": 1,
+                        "level": {"$ifNull": ["$mapping.v.level", 0]},
+                        "foundation": {"$ifNull": ["$mapping.v.foundation", 0]},
+                        # all_paths 展开到所有路径，权重减半（$unwind 把单个路径视为单元素数组）
+                        "factor": {"$cond": [{"$eq": ["$mapping.k", "all_paths"]}, 0.5, 1]},
+                        "path": {"$cond": [{"$eq": ["$mapping.k", "all_paths"]}, paths, "$mapping.k"]}
+                    }},
+                    {"$unwind": "$path"},
+                    {"$match": {"path": {"$in": paths}}},
+                    {"$group": {
+                        "_id": "$path",
+                        "level": {"$sum": {"$multiply": ["$level", "$factor"]}},
+                        "foundation": {"$sum": {"$multiply": ["$foundation", "$factor"]}},
+                        "evidence": {"$push": "$answer_text"}
+                    }}
+                ],
+                "interests": [
+                    {"$match": {"question_category": "interest_preference"}},
+                    {"$project": {"_id": 0, "weights": {"$objectToArray": {"$ifNull": ["$path_weights", {}]}}}},
+                    {"$unwind": "$weights"},
+                    {"$match": {"weights.k": {"$in": paths}}},
+                    {"$group": {"_id": "$weights.k", "score": {"$sum": "$weights.v"}}}
+                ],
+                "goals": mapping_branch("career_goal", "goal_mapping"),
+                "styles": mapping_branch("learning_style", "style_mapping"),
+                "plans": mapping_branch("time_planning", "time_mapping")
+            }}
+        ]
+        
+        mongo = Response._get_mongo()
+        facets = next(mongo.db.responses.aggregate(pipeline), {})
+        if facets.get("unresolved"):
+            return None
+        
+        skill_profile = {path: {"level": 0, "foundation": 0, "evidence": []} for path in paths}
+        for item in facets.get("skills", []):
+            skill_profile[item["_id"]] = {
+                "level": min(1.0, item["level"]),
+                "foundation": min(1.0, item["foundation"]),
+                "evidence": item["evidence"]
+            }
+        
+        interest_scores = {path: 0 for path in paths}
+        for item in facets.get("interests", []):
+            interest_scores[item["_id"]] = item["score"]
+        
+        total = facets.get("total") or [{"count": 0}]
+        return {
+            "user_id": user_id,
+            "skill_assessment": skill_profile,
+            "interest_preference": interest_scores,
+            "career_goal": {"goals": [item["mapping"] for item in facets.get("goals", [])]},
+            "learning_style": {"styles": [item["mapping"] for item in facets.get("styles", [])]},
+            "time_planning": {"plans": [item["mapping"] for item in facets.get("plans", [])]},
+            "response_count": total[0]["count"],
+            "is_demo_mode": False
+        }
+
+    @staticmethod
+    def _group_by_category(responses: List[Dict]) -> Dict[str, List[Dict]]:
+        """按问题类别分组答案（保持原有顺序）"""
+        profile_data = {
+            "skill_assessment": [],
+            "interest_preference": [],
+            "career_goal": [],
+            "learning_style": [],
+            "time_planning": []
+        }
+        
+        for response in responses:
+            category = response.get("question_category")
+            if category in profile_data:
+                profile_data[category].append(response)
+        
+        return profile_data
+
+    @staticmethod
+    def _build_recommendation_data(user_id: str, profile_data: Dict[str, List[Dict]], total_responses: int) -> Dict:
+        """把分组后的答案处理为推荐算法的输入"""
+        return {
+            "user_id": user_id,
+            "skill_assessment": Response._process_skill_assessment(profile_data.get("skill_assessment", [])),
+            "interest_preference": Response._process_interest_preference(profile_data.get("interest_preference", [])),
+            "career_goal": Response._process_career_goal(profile_data.get("career_goal", [])),
+            "learning_style": Response._process_learning_style(profile_data.get("learning_style", [])),
+            "time_planning": Response._process_time_planning(profile_data.get("time_planning", [])),
+            "response_count": total_responses
+        }
+
     @staticmethod
     def _process_skill_assessment(responses: List[Dict]) -> Dict:
         """处理技能评估数据"""
-        skill_profile = {
-            "frontend": {"level": 0, "foundation": 0, "evidence": []},
-            "backend": {"level": 0, "foundation": 0, "evidence": []},
-            "mobile": {"level": 0, "foundation": 0, "evidence": []},
-            "data_science": {"level": 0, "foundation": 0, "evidence": []}
-        }
+        skill_profile = {path: {"level": 0, "foundation": 0, "evidence": []} for path in Response._path_names()}
         
         for response in responses:
             skill_mapping = response.get("skill_mapping", {})
@@ -362,7 +1084,7 @@ class Response:
     @staticmethod
     def _process_interest_preference(responses: List[Dict]) -> Dict:
         """处理兴趣偏好数据"""
-        interest_scores = {"frontend": 0, "backend": 0, "mobile": 0, "data_science": 0}
+        interest_scores = {path: 0 for path in Response._path_names()}
         
         for response in responses:
             path_weights = response.get("path_weights", {})
@@ -1,10 +1,15 @@
 # app/models/user.py - 带降级模式
-from werkzeug.security import generate_password_hash, check_password_hash
 from bson import ObjectId
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 import jwt
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import re
+from app.utils import request_cache
+from app.utils.token_cache import verified_tokens
+from app.utils.user_cache import user_cache
+from app.utils.password_hasher import password_hasher, PasswordHasherBusy
 
 class User:
     """用户模型 - 专为ProgrammerRoadmap设计"""
@@ -23,88 +28,194 @@ class User:
         from app.utils.database import is_db_available
         return is_db_available()
 
+    @staticmethod
+    def _invalidate_cache(user_id: str):
+        """用户文档修改后使缓存的资料失效"""
+        user_cache.invalidate(user_id)
+        request_cache.invalidate(('user', str(user_id)))
+
     @staticmethod
     def create(username: str, email: str, password: str) -> Optional[str]:
         """创建新用户"""
+        return User.register(username, email, password)[0]
+
+    @staticmethod
+    def register(username: str, email: str, password: str) -> Tuple[Optional[str], Optional[str]]:
+        """注册新用户，返回 (user_id, 冲突字段)
+
+        用户名和邮箱的唯一索引存在时不预先查询，直接插入，由唯一索引判定重复；
+        启动时未确认唯一索引（如已有重复数据导致索引无法建立）时先查询再插入。
+        重复时冲突字段为 "username" 或 "email"。密码哈希在所有校验通过之后才计算，
+        无效的注册请求不会占用密码哈希进程池。其他失败返回 (None, None)。
+        """
         try:
             # 检查数据库可用性
             if not User._check_db_available():
                 print("数据库服务暂不可用")
-                return None
+                return None, None
                 
             mongo = User._get_mongo()
             
             # 验证邮箱格式
             if not User._is_valid_email(email):
                 print("邮箱格式不正确")
-                return None
-                
-            # 检查用户名和邮箱是否已存在
-            if mongo.db.users.find_one({"$or": [{"username": username}, {"email": email}]}):
-                print("用户名或邮箱已存在")
-                return None
+                return None, None
+
+            conflict_field = User._find_conflict_without_index(username, email)
+            if conflict_field:
+                print(f"用户名或邮箱已存在: {conflict_field}")
+                return None, conflict_field
 
-            user_id = mongo.db.users.insert_one({
+            now = datetime.utcnow()
+            user = {
                 "username": username,
                 "email": email,
-                "password_hash": generate_password_hash(password),
+                "password_hash": password_hasher.hash(password),
                 "is_active": True,
                 
                 # 问卷状态
                 "questionnaire_completed": False,
                 "questionnaire_completed_at": None,
+                # 当前答题轮次，重置问卷时递增
+                "questionnaire_attempt": 0,
                 
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }).inserted_id
+                # 答题计数（随答案写入维护）
+                "answered_count": 0,
+                "answered_by_category": {},
+                
+                "created_at": now,
+                "updated_at": now
+            }
+
+            user_id = mongo.db.users.insert_one(user).inserted_id
             
             print(f"用户创建成功: {user_id}")
-            return str(user_id)
+            return str(user_id), None
+        except DuplicateKeyError as e:
+            conflict_field = User._duplicate_key_field(e)
+            print(f"用户名或邮箱已存在: {conflict_field}")
+            return None, conflict_field
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             print(f"创建用户失败: {e}")
+            return None, None
+
+    @staticmethod
+    def _find_conflict_without_index(username: str, email: str) -> Optional[str]:
+        """唯一索引缺失时按查询判断用户名或邮箱是否已被使用；索引存在时直接返回 None"""
+        from app.utils.database import has_unique_index
+        if has_unique_index('users', 'username_1') and has_unique_index('users', 'email_1'):
             return None
+        
+        mongo = User._get_mongo()
+        existing = mongo.db.users.find_one(
+            {"$or": [{"username": username}, {"email": email}]},
+            {"username": 1}
+        )
+        if existing is None:
+            return None
+        return "username" if existing.get("username") == username else "email"
+
+    @staticmethod
+    def _duplicate_key_field(error: DuplicateKeyError) -> str:
+        """从唯一索引冲突中取出重复的字段（username 或 email）"""
+        details = error.details or {}
+        for key in ("keyPattern", "keyValue"):
+            fields = details.get(key) or {}
+            for field in ("username", "email"):
+                if field in fields:
+                    return field
+        # 旧版本服务器没有 keyPattern，从错误信息中的索引名判断
+        if "index: email_1" in str(error):
+            return "email"
+        return "username"
+
+    # 登录时读取的字段：密码哈希和登录响应需要的资料
+    LOGIN_PROJECTION = {
+        "password_hash": 1,
+        "username": 1,
+        "email": 1,
+        "questionnaire_completed": 1,
+        "is_demo": 1
+    }
+
+    @staticmethod
+    def authenticate(login_field: str, password: str) -> Optional[Dict]:
+        """用户名或邮箱登录
+
+        按邮箱格式选择字段，一次按唯一索引查询取出密码哈希和登录所需的资料。
+        成功返回 user_id、username、email、questionnaire_completed、is_demo；失败返回 None。
+        """
+        field = "email" if User._is_valid_email(login_field) else "username"
+        return User._authenticate_by(field, login_field, password)
 
     @staticmethod
     def verify_login(username: str, password: str) -> Optional[str]:
         """通过用户名验证登录"""
-        try:
-            if not User._check_db_available():
-                print("数据库服务暂不可用")
-                return None
-                
-            mongo = User._get_mongo()
-            user = mongo.db.users.find_one({"username": username, "is_active": True})
-            if user and check_password_hash(user["password_hash"], password):
-                print(f"用户名登录成功: {username}")
-                return str(user["_id"])
-            print(f"用户名登录失败: {username}")
-            return None
-        except Exception as e:
-            print(f"用户名登录验证失败: {e}")
-            return None
+        user = User._authenticate_by("username", username, password)
+        return user["user_id"] if user else None
 
     @staticmethod
     def verify_email_login(email: str, password: str) -> Optional[str]:
         """通过邮箱验证登录"""
+        user = User._authenticate_by("email", email, password)
+        return user["user_id"] if user else None
+
+    @staticmethod
+    def _authenticate_by(field: str, value: str, password: str) -> Optional[Dict]:
+        label = "邮箱" if field == "email" else "用户名"
         try:
             if not User._check_db_available():
                 print("数据库服务暂不可用")
                 return None
                 
             mongo = User._get_mongo()
-            user = mongo.db.users.find_one({"email": email, "is_active": True})
-            if user and check_password_hash(user["password_hash"], password):
-                print(f"邮箱登录成功: {email}")
-                return str(user["_id"])
-            print(f"邮箱登录失败: {email}")
+            user = mongo.db.users.find_one({field: value, "is_active": True}, User.LOGIN_PROJECTION)
+            if user and password_hasher.verify(user["password_hash"], password):
+                User._upgrade_password_hash(user, password)
+                print(f"{label}登录成功: {value}")
+                return {
+                    "user_id": str(user["_id"]),
+                    "username": user["username"],
+                    "email": user["email"],
+                    "questionnaire_completed": user.get("questionnaire_completed", False),
+                    "is_demo": user.get("is_demo", False)
+                }
+            print(f"{label}登录失败: {value}")
             return None
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
-            print(f"邮箱登录验证失败: {e}")
+            print(f"{label}登录验证失败: {e}")
             return None
 
+    @staticmethod
+    def _upgrade_password_hash(user: Dict, password: str):
+        """登录成功后，若密码哈希的算法或参数与当前配置不同，用当前配置重新哈希"""
+        try:
+            if not password_hasher.needs_rehash(user["password_hash"]):
+                return
+            # 以旧哈希为条件，避免覆盖并发修改的密码
+            result = User._get_mongo().db.users.update_one(
+                {"_id": user["_id"], "password_hash": user["password_hash"]},
+                {"$set": {"password_hash": password_hasher.hash(password)}}
+            )
+            if result.modified_count:
+                User._invalidate_cache(str(user["_id"]))
+        except PasswordHasherBusy:
+            # 繁忙时跳过升级，下次登录再处理
+            pass
+        except Exception as e:
+            print(f"升级密码哈希失败: {e}")
+
     @staticmethod
     def get_profile(user_id: str) -> Optional[Dict]:
-        """获取用户资料"""
+        """获取用户资料（同一请求内只加载一次，进程内短期缓存）"""
+        return request_cache.memoize(('user', str(user_id)), lambda: User._load_profile(user_id))
+
+    @staticmethod
+    def _load_profile(user_id: str) -> Optional[Dict]:
         try:
             if not User._check_db_available():
                 # 返回降级模式的用户信息
@@ -117,6 +228,10 @@ class User:
                     "is_demo": True
                 }
                 
+            user = user_cache.get(user_id)
+            if user is not None:
+                return user
+                
             mongo = User._get_mongo()
             user = mongo.db.users.find_one(
                 {"_id": ObjectId(user_id), "is_active": True},
@@ -126,6 +241,7 @@ class User:
                 return None
             
             user["_id"] = str(user["_id"])  # 转换ObjectId为字符串
+            user_cache.put(user_id, user)
             return user
         except Exception as e:
             print(f"获取用户资料失败: {e}")
@@ -148,6 +264,7 @@ class User:
                     "updated_at": datetime.utcnow()
                 }}
             )
+            User._invalidate_cache(user_id)
             success = result.modified_count > 0
             print(f"标记问卷完成: {'成功' if success else '失败'}")
             return success
@@ -161,28 +278,254 @@ class User:
         try:
             if not User._check_db_available():
                 return False
+            
+            user = User.get_profile(user_id)
+            completed = user.get("questionnaire_completed", False) if user else False
+            print(f"问卷完成状态: {completed}")
+            return completed
+        except Exception as e:
+            print(f"检查问卷状态失败: {e}")
+            return False
+
+    @staticmethod
+    def get_answer_counts(user_id: str) -> Optional[Dict]:
+        """读取用户文档上维护的答题计数
+
+        返回 {"answered_count": int, "by_category": {category: int}}；
+        老用户尚未建立计数时返回 None。
+        """
+        try:
+            if not User._check_db_available():
+                return None
                 
             mongo = User._get_mongo()
             user = mongo.db.users.find_one(
                 {"_id": ObjectId(user_id)},
-                {"questionnaire_completed": 1}
+                {"answered_count": 1, "answered_by_category": 1}
             )
-            completed = user.get("questionnaire_completed", False) if user else False
-            print(f"问卷完成状态: {completed}")
-            return completed
+            if not user or "answered_count" not in user:
+                return None
+            
+            return {
+                "answered_count": user["answered_count"],
+                "by_category": user.get("answered_by_category") or {}
+            }
         except Exception as e:
-            print(f"检查问卷状态失败: {e}")
+            print(f"获取答题计数失败: {e}")
+            return None
+
+    @staticmethod
+    def record_answer_write(user_id: str, attempt: int, category_counts: Dict[str, int] = None) -> Optional[int]:
+        """答案写入后递增用户的答案版本号和答题计数，返回新版本号"""
+        try:
+            if not User._check_db_available():
+                return None
+            
+            increments = {f"answered_by_category.{category}": count
+                          for category, count in (category_counts or {}).items() if count}
+            total = sum((category_counts or {}).values())
+            
+            mongo = User._get_mongo()
+            user = None
+            if total:
+                increments["answered_count"] = total
+                increments["answers_revision"] = 1
+                user = mongo.db.users.find_one_and_update(
+                    {
+                        "_id": ObjectId(user_id),
+                        "questionnaire_attempt": User.attempt_condition(attempt),
+                        "answered_count": {"$exists": True}
+                    },
+                    {"$inc": increments},
+                    projection={"answers_revision": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+            if user is None:
+                user = mongo.db.users.find_one_and_update(
+                    {"_id": ObjectId(user_id), "questionnaire_attempt": User.attempt_condition(attempt)},
+                    {"$inc": {"answers_revision": 1}},
+                    projection={"answers_revision": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+            User._invalidate_cache(user_id)
+            return user["answers_revision"] if user else None
+        except Exception as e:
+            print(f"更新答题计数失败: {e}")
+            return None
+
+    @staticmethod
+    def init_answer_counts(user_id: str, answered_count: int, by_category: Dict[str, int]) -> bool:
+        """为尚未建立计数的老用户写入答题计数"""
+        try:
+            if not User._check_db_available():
+                return False
+                
+            mongo = User._get_mongo()
+            result = mongo.db.users.update_one(
+                {"_id": ObjectId(user_id), "answered_count": {"$exists": False}},
+                {"$set": {
+                    "answered_count": answered_count,
+                    "answered_by_category": by_category
+                }}
+            )
+            User._invalidate_cache(user_id)
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"初始化答题计数失败: {e}")
+            return False
+
+    @staticmethod
+    def get_answer_count_state(user_id: str) -> Optional[Dict]:
+        """读取答题轮次和计数字段的原始值（用于重新统计），用户不存在时返回 None"""
+        mongo = User._get_mongo()
+        return mongo.db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            {"questionnaire_attempt": 1, "answered_count": 1, "answered_by_category": 1}
+        )
+
+    @staticmethod
+    def replace_answer_counts(user_id: str, expected: Dict, answered_count: int, by_category: Dict[str, int]) -> bool:
+        """仅当轮次和计数仍与 expected（get_answer_count_state 的结果）相同时写入新的计数"""
+        try:
+            mongo = User._get_mongo()
+            result = mongo.db.users.update_one(
+                {
+                    "_id": ObjectId(user_id),
+                    # 缺失的字段按 None 匹配
+                    "questionnaire_attempt": expected.get("questionnaire_attempt"),
+                    "answered_count": expected.get("answered_count"),
+                    "answered_by_category": expected.get("answered_by_category")
+                },
+                # 同时递增答案版本号，使可能同样过期的推荐画像在下次读取时重建
+                {
+                    "$set": {"answered_count": answered_count, "answered_by_category": by_category},
+                    "$inc": {"answers_revision": 1}
+                }
+            )
+            User._invalidate_cache(user_id)
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"修正答题计数失败: {e}")
+            return False
+
+    @staticmethod
+    def get_answer_state(user_id: str) -> Dict:
+        """一次查询获取当前答题轮次和答案版本号（老用户没有这两个字段，均视为 0）"""
+        try:
+            if not User._check_db_available():
+                return {"attempt": 0, "revision": 0}
+                
+            mongo = User._get_mongo()
+            user = mongo.db.users.find_one(
+                {"_id": ObjectId(user_id)}, {"questionnaire_attempt": 1, "answers_revision": 1}
+            ) or {}
+            return {"attempt": user.get("questionnaire_attempt", 0), "revision": user.get("answers_revision", 0)}
+        except Exception as e:
+            print(f"获取答题轮次失败: {e}")
+            return {"attempt": 0, "revision": 0}
+
+    @staticmethod
+    def attempt_condition(attempt: int):
+        """匹配某一轮次的查询条件；第 0 轮包括没有 attempt 字段的旧数据"""
+        return attempt if attempt else {"$in": [0, None]}
+
+    @staticmethod
+    def reset_questionnaire(user_id: str, only_if_answered: bool = False) -> bool:
+        """开始新一轮答题：递增轮次，重置问卷状态和答题计数
+
+        被取代的轮次连同重置时间记录在 superseded 数组中，旧轮次的答案不再被读取，
+        由 Response.sweep_superseded_attempts 按各轮次自己的重置时间清理。
+        only_if_answered 为 True 时，当前轮次没有答案的用户不做任何修改。
+        """
+        try:
+            if not User._check_db_available():
+                print("数据库服务暂不可用")
+                return False
+            
+            user_filter = {"_id": ObjectId(user_id)}
+            if only_if_answered:
+                # 没有计数的老用户无法判断，按有答案处理
+                user_filter["$or"] = [
+                    {"answered_count": {"$gt": 0}},
+                    {"answered_count": {"$exists": False}}
+                ]
+                
+            mongo = User._get_mongo()
+            # 以读到的轮次作为写入条件，并发重置时重新读取
+            for _ in range(3):
+                user = mongo.db.users.find_one(user_filter, {"questionnaire_attempt": 1})
+                if user is None:
+                    return False
+                
+                attempt = user.get("questionnaire_attempt", 0)
+                now = datetime.utcnow()
+                result = mongo.db.users.update_one(
+                    dict(user_filter, questionnaire_attempt=User.attempt_condition(attempt)),
+                    {
+                        "$set": {
+                            "questionnaire_attempt": attempt + 1,
+                            "questionnaire_completed": False,
+                            "questionnaire_completed_at": None,
+                            "answered_count": 0,
+                            "answered_by_category": {},
+                            "last_reset_at": now,
+                            "updated_at": now
+                        },
+                        "$push": {"superseded": {"attempt": attempt, "reset_at": now}}
+                    }
+                )
+                if result.matched_count > 0:
+                    User._invalidate_cache(user_id)
+                    return True
+            
+            print("重置问卷状态失败: 并发重置")
+            return False
+        except Exception as e:
+            print(f"重置问卷状态失败: {e}")
+            return False
+
+    @staticmethod
+    def clear_superseded_attempt(user_id: str, attempt: int) -> bool:
+        """某个旧轮次的答案清理完成后移除其记录"""
+        try:
+            if not User._check_db_available():
+                return False
+                
+            mongo = User._get_mongo()
+            result = mongo.db.users.update_one(
+                {"_id": ObjectId(user_id)},
+                {"$pull": {"superseded": {"attempt": attempt}}}
+            )
+            User._invalidate_cache(user_id)
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"清除轮次记录失败: {e}")
             return False
 
     # JWT Token 功能
+    @staticmethod
+    def _token_state(user_id: str) -> Optional[Dict]:
+        """校验令牌需要的用户状态（is_active、token_version）；数据库不可用或用户不存在时返回 None"""
+        try:
+            if not User._check_db_available() or not ObjectId.is_valid(user_id):
+                return None
+            mongo = User._get_mongo()
+            return mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"is_active": 1, "token_version": 1})
+        except Exception as e:
+            print(f"获取令牌状态失败: {e}")
+            return None
+
     @staticmethod
     def generate_token(user_id: str, secret_key: str) -> str:
-        """生成JWT令牌"""
+        """生成JWT令牌（ver 为用户当前的令牌版本，修改密码后旧令牌失效）"""
         try:
             payload = {
                 'user_id': str(user_id),
                 'exp': datetime.utcnow() + timedelta(days=7)  # 7天过期
             }
+            state = User._token_state(user_id)
+            if state is not None:
+                payload['ver'] = state.get('token_version', 0)
             token = jwt.encode(payload, secret_key, algorithm='HS256')
             print(f"Token生成成功")
             return token
@@ -192,11 +535,24 @@ class User:
 
     @staticmethod
     def verify_token(token: str, secret_key: str) -> Optional[str]:
-        """验证JWT令牌"""
+        """验证JWT令牌
+
+        最近验证通过的令牌直接从缓存返回；未命中时校验签名，并拒绝已停用用户的令牌
+        和令牌版本与用户当前版本不同（签发后修改过密码）的令牌。
+        """
+        user_id = verified_tokens.get(token, secret_key)
+        if user_id is not None:
+            return user_id
+        
         try:
             payload = jwt.decode(token, secret_key, algorithms=['HS256'])
             user_id = payload['user_id']
-            print(f"Token验证成功: {user_id}")
+            state = User._token_state(user_id)
+            if state is not None and (not state.get('is_active', True)
+                                      or payload.get('ver', 0) != state.get('token_version', 0)):
+                print("Token已吊销")
+                return None
+            verified_tokens.put(token, secret_key, user_id, payload.get('exp'))
             return user_id
         except jwt.ExpiredSignatureError:
             print("Token已过期")
@@ -215,19 +571,27 @@ class User:
                 
             mongo = User._get_mongo()
             user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-            if not user or not check_password_hash(user["password_hash"], old_password):
+            if not user or not password_hasher.verify(user["password_hash"], old_password):
                 print("原密码错误")
                 return False
             
             mongo.db.users.update_one(
                 {"_id": ObjectId(user_id)},
-                {"$set": {
-                    "password_hash": generate_password_hash(new_password),
-                    "updated_at": datetime.utcnow()
-                }}
+                {
+                    "$set": {
+                        "password_hash": password_hasher.hash(new_password),
+                        "updated_at": datetime.utcnow()
+                    },
+                    # 修改密码前签发的令牌全部失效
+                    "$inc": {"token_version": 1}
+                }
             )
+            User._invalidate_cache(user_id)
+            verified_tokens.revoke_user(user_id)
             print("密码修改成功")
             return True
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             print(f"修改密码失败: {e}")
             return False
@@ -252,6 +616,8 @@ class User:
                 {"_id": ObjectId(user_id)},
                 {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
             )
+            User._invalidate_cache(user_id)
+            verified_tokens.revoke_user(user_id)
             success = result.modified_count > 0
             print(f"账户停用: {'成功' if success else '失败'}")
             return success
@@ -1,7 +1,9 @@
 # app/routes/auth.py - 带降级模式
 from flask import Blueprint, request, jsonify, current_app
 from app.models.user import User
-import re
+from app.utils.auth import verify_token_and_get_user
+from app.utils.password_hasher import PasswordHasherBusy
+from app.utils.rate_limit import login_limiter, client_ip
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -10,6 +12,14 @@ def _check_db_available():
     from app.utils.database import is_db_available
     return is_db_available()
 
+def _hasher_busy_response():
+    """密码哈希排队已满时的响应"""
+    return jsonify({
+        'success': False,
+        'message': '服务繁忙，请稍后重试',
+        'error_code': 'SERVICE_BUSY'
+    }), 503, {'Retry-After': '1'}
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """用户注册"""
@@ -50,8 +60,8 @@ def register():
                 'message': '密码长度不能少于6个字符'
             }), 400
         
-        # 创建用户
-        user_id = User.create(username, email, password)
+        # 创建用户（重复的用户名或邮箱由唯一索引判定）
+        user_id, conflict_field = User.register(username, email, password)
         
         if user_id:
             # 生成JWT Token
@@ -67,12 +77,26 @@ def register():
                     'token': token
                 }
             }), 201
+        elif conflict_field == 'username':
+            return jsonify({
+                'success': False,
+                'message': '用户名已存在',
+                'error_code': 'USERNAME_EXISTS'
+            }), 400
+        elif conflict_field == 'email':
+            return jsonify({
+                'success': False,
+                'message': '邮箱已被注册',
+                'error_code': 'EMAIL_EXISTS'
+            }), 400
         else:
             return jsonify({
                 'success': False,
-                'message': '用户名或邮箱已存在，或注册服务暂时不可用'
+                'message': '邮箱格式不正确，或注册服务暂时不可用'
             }), 400
             
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({
             'success': False,
@@ -103,38 +127,34 @@ def login():
                 'message': '用户名/邮箱和密码不能为空'
             }), 400
         
-        # 判断是邮箱还是用户名
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        is_email = re.match(email_pattern, login_field)
+        # 限流在查询数据库和校验密码之前进行
+        allowed, retry_after = login_limiter.check(login_field, client_ip())
+        if not allowed:
+            return jsonify({
+                'success': False,
+                'message': '登录尝试过于频繁，请稍后重试',
+                'error_code': 'TOO_MANY_ATTEMPTS'
+            }), 429, {'Retry-After': str(retry_after)}
         
-        # 验证登录
-        if is_email:
-            user_id = User.verify_email_login(login_field, password)
-        else:
-            user_id = User.verify_login(login_field, password)
+        # 验证登录（一次查询取出密码哈希和登录响应需要的资料）
+        user = User.authenticate(login_field, password)
         
-        if user_id:
-            # 获取用户信息
-            user_profile = User.get_profile(user_id)
-            if not user_profile:
-                return jsonify({
-                    'success': False,
-                    'message': '用户信息获取失败'
-                }), 500
+        if user:
+            login_limiter.record_success(login_field)
             
             # 生成JWT Token
-            token = User.generate_token(user_id, current_app.config['SECRET_KEY'])
+            token = User.generate_token(user['user_id'], current_app.config['SECRET_KEY'])
             
             return jsonify({
                 'success': True,
                 'message': '登录成功',
                 'data': {
-                    'user_id': user_id,
-                    'username': user_profile['username'],
-                    'email': user_profile['email'],
-                    'questionnaire_completed': user_profile.get('questionnaire_completed', False),
+                    'user_id': user['user_id'],
+                    'username': user['username'],
+                    'email': user['email'],
+                    'questionnaire_completed': user['questionnaire_completed'],
                     'token': token,
-                    'is_demo': user_profile.get('is_demo', False)
+                    'is_demo': user['is_demo']
                 }
             }), 200
         else:
@@ -143,6 +163,8 @@ def login():
                 'message': '用户名/邮箱或密码错误'
             }), 401
             
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({
             'success': False,
@@ -153,23 +175,10 @@ def login():
 def get_profile():
     """获取用户资料"""
     try:
-        # 从请求头获取Token
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({
-                'success': False,
-                'message': '缺少认证令牌'
-            }), 401
-        
-        token = auth_header.split(' ')[1]
-        
-        # 验证Token
-        user_id = User.verify_token(token, current_app.config['SECRET_KEY'])
-        if not user_id:
-            return jsonify({
-                'success': False,
-                'message': '令牌无效或已过期'
-            }), 401
+        # 验证用户身份
+        user_id, error_response, status_code = verify_token_and_get_user()
+        if error_response:
+            return jsonify(error_response), status_code
         
         # 检查数据库可用性
         if not _check_db_available():
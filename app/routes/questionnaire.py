@@ -1,24 +1,15 @@
 # app/routes/questionnaire.py - 带降级模式
-from flask import Blueprint, request, jsonify, current_app
-from app.models.user import User
+from flask import Blueprint, request, jsonify
 from app.models.question import Question
 from app.models.response import Response
+from app.utils.auth import verify_token_and_get_user, current_user_id
+from app.utils.http_cache import (
+    catalog_etag, is_not_modified, not_modified_response, apply_cache_headers,
+    public_payloads, payload_response, payload_etag
+)
 
 questionnaire_bp = Blueprint('questionnaire', __name__)
 
-def verify_token_and_get_user():
-    """验证Token并获取用户ID的辅助函数"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return None, {'success': False, 'message': '缺少认证令牌'}, 401
-    
-    token = auth_header.split(' ')[1]
-    user_id = User.verify_token(token, current_app.config['SECRET_KEY'])
-    if not user_id:
-        return None, {'success': False, 'message': '令牌无效或已过期'}, 401
-    
-    return user_id, None, None
-
 def _check_db_available():
     """检查数据库是否可用"""
     from app.utils.database import is_db_available
@@ -29,16 +20,23 @@ def get_questions():
     """获取问卷题目（公开接口，支持可选认证）"""
     try:
         # 尝试获取用户身份，但不强制要求
-        user_id = None
-        auth_header = request.headers.get('Authorization')
-        
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            user_id = User.verify_token(token, current_app.config['SECRET_KEY'])
+        user_id = current_user_id()
         
         # 获取查询参数
         category = request.args.get('category')  # 可选：按分类筛选问题
         
+        # 匿名请求的结果只取决于题库版本，未变化时直接返回 304
+        etag = None
+        if not user_id:
+            etag = catalog_etag('questions', category)
+            if is_not_modified(payload_etag(etag)):
+                return not_modified_response(payload_etag(etag))
+            
+            # 直接返回预序列化的响应体
+            payload = public_payloads.get(('questions', category), etag)
+            if payload:
+                return payload_response(payload, etag)
+        
         # 获取问题
         if category:
             questions = Question.get_by_category(category)
@@ -74,7 +72,7 @@ def get_questions():
             for question in questions:
                 question['user_answer'] = None
         
-        return jsonify({
+        result = {
             'success': True,
             'message': '获取成功',
             'data': {
@@ -85,7 +83,13 @@ def get_questions():
                 'category': category,
                 'is_demo_mode': not _check_db_available()
             }
-        }), 200
+        }
+        
+        if etag:
+            payload = public_payloads.put(('questions', category), etag, result)
+            return payload_response(payload, etag)
+        
+        return jsonify(result), 200
         
     except Exception as e:
         return jsonify({
@@ -97,7 +101,11 @@ def get_questions():
 def get_categories():
     """获取问卷分类列表"""
     try:
-        categories = Question.get_categories()
+        etag = catalog_etag('categories')
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        
+        category_summary = Question.get_category_summary()
         
         # 分类信息
         category_info = {
@@ -109,14 +117,15 @@ def get_categories():
         }
         
         result = []
-        for category in categories:
+        for item in category_summary:
+            category = item["category"]
             result.append({
                 "category": category,
                 "name": category_info.get(category, category),
-                "question_count": len(Question.get_by_category(category))
+                "question_count": item["question_count"]
             })
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'message': '获取分类成功',
             'data': {
@@ -124,7 +133,8 @@ def get_categories():
                 'total_categories': len(result),
                 'is_demo_mode': not _check_db_available()
             }
-        }), 200
+        })
+        return apply_cache_headers(response, etag), 200
         
     except Exception as e:
         return jsonify({
@@ -163,21 +173,21 @@ def get_questionnaire_status():
                 }
             }), 200
         
-        # 获取进度
-        progress = Response.get_user_progress(user_id)
+        # 获取进度（答题计数维护在用户文档上，只需一次查询；事件日志模式下加上尚未压缩的答案）
+        answer_counts = Response.get_status_counts(user_id)
+        progress = Response.get_user_progress(user_id, answer_counts)
         
         # 获取各分类的完成情况
-        categories = Question.get_categories()
         category_progress = {}
         
-        for category in categories:
-            category_questions = Question.get_by_category(category)
-            category_responses = Response.get_responses_by_category(user_id, category)
+        for item in Question.get_category_summary():
+            category = item["category"]
+            answered_questions = answer_counts["by_category"].get(category, 0)
             
             category_progress[category] = {
-                "total_questions": len(category_questions),
-                "answered_questions": len(category_responses),
-                "is_completed": len(category_responses) >= len(category_questions)
+                "total_questions": item["question_count"],
+                "answered_questions": answered_questions,
+                "is_completed": answered_questions >= item["question_count"]
             }
         
         return jsonify({
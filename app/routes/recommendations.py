@@ -1,26 +1,19 @@
 # app/routes/recommendations.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify
 from app.models.user import User
 from app.models.response import Response
-from app.services.recommendation_engine import RecommendationEngine
+from app.utils.auth import verify_token_and_get_user
+from app.services.learning_paths import learning_path_store
+from app.services.recommendation_cache import recommendation_cache
+from app.utils.http_cache import (
+    learning_paths_etag, is_not_modified, not_modified_response, apply_cache_headers,
+    public_payloads, payload_response, payload_etag
+)
 from datetime import datetime
 import logging
 
 recommendations_bp = Blueprint('recommendations', __name__)
 
-def verify_token_and_get_user():
-    """验证Token并获取用户ID的辅助函数"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return None, {'success': False, 'message': '缺少认证令牌'}, 401
-    
-    token = auth_header.split(' ')[1]
-    user_id = User.verify_token(token, current_app.config['SECRET_KEY'])
-    if not user_id:
-        return None, {'success': False, 'message': '令牌无效或已过期'}, 401
-    
-    return user_id, None, None
-
 @recommendations_bp.route('/generate', methods=['POST'])
 def generate_recommendation():
     """生成个性化推荐"""
@@ -51,9 +44,8 @@ def generate_recommendation():
                 'message': '未找到用户答卷数据'
             }), 404
         
-        # 初始化推荐引擎并生成推荐
-        engine = RecommendationEngine()
-        recommendation = engine.generate_recommendation(user_data)
+        # 生成推荐（答案相同的用户共用缓存的结果）
+        recommendation = recommendation_cache.generate(user_data)
         
         if not recommendation:
             return jsonify({
@@ -136,8 +128,16 @@ def get_my_recommendation():
 def get_available_paths():
     """获取所有可用的学习路径（公开接口）"""
     try:
-        engine = RecommendationEngine()
-        paths = engine.learning_paths
+        etag = learning_paths_etag('learning_paths')
+        if is_not_modified(payload_etag(etag)):
+            return not_modified_response(payload_etag(etag))
+        
+        # 学习路径定义未变化时直接返回预序列化的响应体
+        payload = public_payloads.get('learning_paths', etag)
+        if payload:
+            return payload_response(payload, etag)
+        
+        paths = learning_path_store.get_snapshot().paths
         
         # 简化路径信息用于展示
         simplified_paths = {}
@@ -151,14 +151,20 @@ def get_available_paths():
                 'stages_count': len(path_info['stages'])
             }
         
-        return jsonify({
+        result = {
             'success': True,
             'message': '获取学习路径成功',
             'data': {
                 'paths': simplified_paths,
                 'total_paths': len(simplified_paths)
             }
-        }), 200
+        }
+        
+        if etag:
+            payload = public_payloads.put('learning_paths', etag, result)
+            return payload_response(payload, etag)
+        
+        return jsonify(result), 200
         
     except Exception as e:
         return jsonify({
@@ -170,24 +176,27 @@ def get_available_paths():
 def get_path_details(path_name):
     """获取特定学习路径的详细信息"""
     try:
-        engine = RecommendationEngine()
+        etag = learning_paths_etag('path_details', path_name)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        
+        path_details = learning_path_store.get_snapshot().get_path(path_name)
         
-        if path_name not in engine.learning_paths:
+        if path_details is None:
             return jsonify({
                 'success': False,
                 'message': f'学习路径 {path_name} 不存在'
             }), 404
         
-        path_details = engine.learning_paths[path_name]
-        
-        return jsonify({
+        response = jsonify({
             'success': True,
             'message': '获取路径详细信息成功',
             'data': {
                 'path': path_details,
                 'path_name': path_name
             }
-        }), 200
+        })
+        return apply_cache_headers(response, etag), 200
         
     except Exception as e:
         return jsonify({
@@ -216,9 +225,8 @@ def regenerate_recommendation():
         # 删除旧的推荐结果
         _delete_old_recommendations(user_id)
         
-        # 生成新推荐
-        engine = RecommendationEngine()
-        recommendation = engine.generate_recommendation(user_data)
+        # 生成新推荐（答案相同的用户共用缓存的结果）
+        recommendation = recommendation_cache.generate(user_data)
         
         # 保存新推荐结果
         _save_recommendation_result(user_id, recommendation)
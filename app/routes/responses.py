@@ -1,24 +1,12 @@
 # app/routes/responses.py - 带降级模式
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify
 from app.models.user import User
 from app.models.question import Question
 from app.models.response import Response
+from app.utils.auth import verify_token_and_get_user
 
 responses_bp = Blueprint('responses', __name__)
 
-def verify_token_and_get_user():
-    """验证Token并获取用户ID的辅助函数"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return None, {'success': False, 'message': '缺少认证令牌'}, 401
-    
-    token = auth_header.split(' ')[1]
-    user_id = User.verify_token(token, current_app.config['SECRET_KEY'])
-    if not user_id:
-        return None, {'success': False, 'message': '令牌无效或已过期'}, 401
-    
-    return user_id, None, None
-
 def _check_db_available():
     """检查数据库是否可用"""
     from app.utils.database import is_db_available
@@ -54,22 +42,14 @@ def submit_answer():
                 'message': '问题ID和答案不能为空'
             }), 400
         
-        # 验证问题是否存在
-        question = Question.get_by_id(question_id)
-        if not question:
-            return jsonify({
-                'success': False,
-                'message': '问题不存在'
-            }), 404
-        
-        # 验证答案是否有效
-        valid_option = None
-        for option in question.get('options', []):
-            if option['value'] == answer_value:
-                valid_option = option
-                break
-        
+        # 通过题库索引一次性验证问题和答案选项
+        valid_option = Question.get_answer_option(question_id, answer_value)
         if not valid_option:
+            if not Question.get_by_id(question_id):
+                return jsonify({
+                    'success': False,
+                    'message': '问题不存在'
+                }), 404
             return jsonify({
                 'success': False,
                 'message': '无效的答案选项'
@@ -85,10 +65,10 @@ def submit_answer():
         
         if success:
             # 获取更新后的进度
-            progress = Response.get_user_progress(user_id)
+            progress = Response.get_progress_after_submit(user_id, [question_id])
             
-            # 如果完成所有问题，更新用户状态
-            if progress['is_completed']:
+            # 如果完成所有问题，更新用户状态（估算的进度不作准，由压缩任务更新）
+            if progress['is_completed'] and not progress.get('is_estimated'):
                 User.mark_questionnaire_completed(user_id)
             
             return jsonify({
@@ -97,7 +77,7 @@ def submit_answer():
                 'data': {
                     'question_id': question_id,
                     'answer_value': answer_value,
-                    'answer_text': answer_text or valid_option['text'],
+                    'answer_text': answer_text or valid_option['answer_text'],
                     'progress': progress
                 }
             }), 200
@@ -139,58 +119,49 @@ def submit_batch_answers():
                 'message': '答案列表不能为空'
             }), 400
         
-        success_count = 0
-        failed_count = 0
-        errors = []
+        # 先在内存中对照题库校验整批答案，记录每项的错误信息
+        item_errors = [None] * len(answers)
+        valid_answers = []
+        valid_positions = []
         
-        for answer in answers:
+        for position, answer in enumerate(answers):
             question_id = answer.get('question_id')
             answer_value = answer.get('answer_value')
-            answer_text = answer.get('answer_text')
             
             if not question_id or not answer_value:
-                failed_count += 1
-                errors.append(f"问题 {question_id}: 参数不完整")
+                item_errors[position] = f"问题 {question_id}: 参数不完整"
                 continue
             
-            # 验证问题
-            question = Question.get_by_id(question_id)
-            if not question:
-                failed_count += 1
-                errors.append(f"问题 {question_id}: 问题不存在")
+            # 通过题库索引验证问题和答案选项
+            if not Question.get_answer_option(question_id, answer_value):
+                if not Question.get_by_id(question_id):
+                    item_errors[position] = f"问题 {question_id}: 问题不存在"
+                else:
+                    item_errors[position] = f"问题 {question_id}: 无效的答案选项"
                 continue
             
-            # 验证答案选项
-            valid_option = None
-            for option in question.get('options', []):
-                if option['value'] == answer_value:
-                    valid_option = option
-                    break
-            
-            if not valid_option:
-                failed_count += 1
-                errors.append(f"问题 {question_id}: 无效的答案选项")
-                continue
-            
-            # 保存答案
-            success = Response.save_answer(
-                user_id=user_id,
-                question_id=question_id,
-                answer_value=answer_value,
-                answer_text=answer_text
-            )
-            
-            if success:
-                success_count += 1
-            else:
-                failed_count += 1
-                errors.append(f"问题 {question_id}: 保存失败")
+            valid_answers.append(answer)
+            valid_positions.append(position)
+        
+        # 一次 bulk_write 保存所有有效答案，并把写入失败映射回对应位置
+        saved_question_ids = []
+        if valid_answers:
+            saved = Response.save_answers_bulk(user_id, valid_answers)
+            for position, answer, success in zip(valid_positions, valid_answers, saved):
+                if success:
+                    saved_question_ids.append(answer['question_id'])
+                else:
+                    item_errors[position] = f"问题 {answer.get('question_id')}: 保存失败"
+        
+        errors = [error for error in item_errors if error]
+        failed_count = len(errors)
+        success_count = len(answers) - failed_count
         
         # 获取更新后的进度
-        progress = Response.get_user_progress(user_id)
+        progress = Response.get_progress_after_submit(user_id, saved_question_ids)
         
-        # 如果完成所有问题，更新用户状态
-        if progress['is_completed']:
+        # 如果完成所有问题，更新用户状态（估算的进度不作准，由压缩任务更新）
+        if progress['is_completed'] and not progress.get('is_estimated'):
             User.mark_questionnaire_completed(user_id)
         
         return jsonify({
@@ -304,22 +275,10 @@ def reset_answers():
                 'error_code': 'SERVICE_UNAVAILABLE'
             }), 503
         
-        # 删除用户答案
-        success = Response.delete_user_responses(user_id)
+        # 开始新一轮答题（同时重置问卷状态和答题计数），旧答案由后台清理
+        success = Response.reset_questionnaire(user_id)
         
         if success:
-            # 重置用户问卷状态
-            from app.models.user import User
-            from bson import ObjectId
-            mongo = Response._get_mongo()
-            mongo.db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {"$set": {
-                    "questionnaire_completed": False,
-                    "questionnaire_completed_at": None
-                }}
-            )
-            
             return jsonify({
                 'success': True,
                 'message': '答案重置成功'
@@ -327,7 +286,7 @@ def reset_answers():
         else:
             return jsonify({
                 'success': False,
-                'message': '没有找到需要删除的答案'
+                'message': '没有找到需要重置的答案'
             }), 404
             
     except Exception as e:
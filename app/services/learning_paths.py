@@ -0,0 +1,209 @@
+# app/services/learning_paths.py - 学习路径数据文件的加载、索引和热更新
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from app.utils import request_cache
+from app.utils.frozen import FrozenDict, freeze
+
+# 默认的学习路径数据文件
+DEFAULT_LEARNING_PATHS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'learning_paths.json'
+)
+
+PATH_FIELDS = ('name', 'description', 'duration_weeks', 'difficulty', 'core_technologies',
+               'learning_preferences', 'supplementary_skills', 'stages')
+STAGE_FIELDS = ('name', 'duration_weeks', 'skills')
+SKILL_FIELDS = ('name', 'level', 'priority')
+SUPPLEMENT_FIELDS = ('name', 'priority', 'reason')
+PRIORITIES = ('high', 'medium', 'low')
+
+# 学习方式偏好的各项（learning_preferences 的键，与推荐引擎的 _process_learning_styles 一致）
+LEARNING_STYLES = ('hands_on', 'theoretical', 'video', 'reading', 'interactive')
+
+
+def _is_weight(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 1
+
+
+def validate_learning_paths(data: Dict):
+    """检查数据文件结构，不合法时抛出 ValueError"""
+    if not isinstance(data, dict) or not isinstance(data.get('paths'), dict):
+        raise ValueError("学习路径数据必须包含 paths 对象")
+
+    paths = data['paths']
+    if not paths:
+        raise ValueError("学习路径数据至少需要一条路径")
+
+    skill_names = set()
+    for path_name, path_info in paths.items():
+        for field in PATH_FIELDS:
+            if field not in path_info:
+                raise ValueError(f"学习路径 {path_name} 缺少字段 {field}")
+        for stage in path_info['stages']:
+            for field in STAGE_FIELDS:
+                if field not in stage:
+                    raise ValueError(f"学习路径 {path_name} 的阶段缺少字段 {field}")
+            for skill in stage['skills']:
+                for field in SKILL_FIELDS:
+                    if field not in skill:
+                        raise ValueError(f"学习路径 {path_name} 的技能缺少字段 {field}")
+                skill_names.add(skill['name'])
+
+        # 学习方式偏好：学习方式 -> 0~1 的权重，参与路径评分
+        preferences = path_info['learning_preferences']
+        if not isinstance(preferences, dict) or not preferences:
+            raise ValueError(f"学习路径 {path_name} 的 learning_preferences 必须是非空对象")
+        for style, weight in preferences.items():
+            if style not in LEARNING_STYLES:
+                raise ValueError(f"学习路径 {path_name} 的学习方式 {style} 未知")
+            if not _is_weight(weight):
+                raise ValueError(f"学习路径 {path_name} 的学习方式 {style} 权重必须是 0~1 的数值")
+
+    # 补充技能的 skill 引用某条路径中的技能，推荐时附上该技能所在的路径和阶段
+    for path_name, path_info in paths.items():
+        for supplement in path_info['supplementary_skills']:
+            for field in SUPPLEMENT_FIELDS:
+                if field not in supplement:
+                    raise ValueError(f"学习路径 {path_name} 的补充技能缺少字段 {field}")
+            if supplement['priority'] not in PRIORITIES:
+                raise ValueError(f"学习路径 {path_name} 的补充技能 {supplement['name']} 优先级未知")
+            if 'skill' in supplement and supplement['skill'] not in skill_names:
+                raise ValueError(f"学习路径 {path_name} 的补充技能引用了不存在的技能 {supplement['skill']}")
+
+
+class LearningPathSnapshot:
+    """某一版本学习路径数据的只读快照
+
+    路径数据冻结为 FrozenDict / tuple，在进程内共享。path_names 为数据文件中的路径顺序
+    （推荐引擎按此顺序评分）；除按路径名查找外还编译了按技能名的索引，查找都是常数时间。
+    """
+
+    def __init__(self, data: Dict, file_stamp: Tuple = None):
+        validate_learning_paths(data)
+
+        # 数据文件声明的格式版本
+        self.version = data.get('version', 1)
+        # 加载时数据文件的 (修改时间, 大小, inode)，用于判断文件是否变化
+        self.file_stamp = file_stamp
+        self.loaded_at = datetime.utcnow()
+        self.paths = freeze(data['paths'])
+        self.path_names = tuple(self.paths)
+
+        # 技能名 -> 出现位置（路径、阶段、等级、优先级）
+        by_skill = {}
+        for path_name, path_info in self.paths.items():
+            for stage in path_info['stages']:
+                for skill in stage['skills']:
+                    by_skill.setdefault(skill['name'], []).append({
+                        'path_name': path_name,
+                        'stage': stage['name'],
+                        'level': skill['level'],
+                        'priority': skill['priority']
+                    })
+        self.by_skill = freeze(by_skill)
+
+        # 路径内容摘要，用于 ETag、推荐结果缓存等缓存键
+        content = json.dumps(self.paths, sort_keys=True, ensure_ascii=False)
+        self.digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def get_path(self, path_name: str) -> Optional[FrozenDict]:
+        return self.paths.get(path_name)
+
+    def find_skill(self, skill_name: str) -> Tuple[FrozenDict, ...]:
+        """某个技能在各路径中出现的位置"""
+        return self.by_skill.get(skill_name, ())
+
+
+def _file_stamp(file_path: str) -> Tuple:
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def load_learning_paths(file_path: str) -> LearningPathSnapshot:
+    """从数据文件加载学习路径快照"""
+    file_stamp = _file_stamp(file_path)
+    with open(file_path, encoding='utf-8') as f:
+        data = json.load(f)
+    return LearningPathSnapshot(data, file_stamp)
+
+
+class LearningPathStore:
+    """进程级学习路径数据
+
+    启动时从数据文件加载；之后最多每 check_interval 秒检查一次文件是否变化，
+    文件变化时加载新快照并整体替换（读取方拿到的始终是完整的某一版本）。
+    新文件无法解析或不合法时继续使用旧快照。
+    """
+
+    def __init__(self, file_path: str = DEFAULT_LEARNING_PATHS_FILE, check_interval: float = 5):
+        self.file_path = file_path
+        self.check_interval = check_interval
+        self._snapshot: Optional[LearningPathSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, file_path: str, check_interval: float):
+        """设置数据文件和修改检查间隔（秒，0 表示每次读取都检查）"""
+        with self._lock:
+            if file_path != self.file_path:
+                self._snapshot = None
+            self.file_path = file_path
+            self.check_interval = check_interval
+            self._checked_at = 0.0
+
+    def get_snapshot(self) -> LearningPathSnapshot:
+        """获取当前快照，必要时重新加载；同一请求内始终使用同一份快照"""
+        return request_cache.memoize(('learning_paths',), self._current_snapshot)
+
+    def _current_snapshot(self) -> LearningPathSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        return self._refresh()
+
+    def _refresh(self) -> LearningPathSnapshot:
+        with self._lock:
+            # 其他线程可能已经完成刷新
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+
+            try:
+                if snapshot is None or snapshot.file_stamp != _file_stamp(self.file_path):
+                    snapshot = load_learning_paths(self.file_path)
+                    self._snapshot = snapshot
+                    print(f"学习路径已加载: 版本 {snapshot.version}, {len(snapshot.paths)} 条路径 ({snapshot.digest[:8]})")
+            except Exception as e:
+                if snapshot is None:
+                    raise
+                print(f"重新加载学习路径失败，继续使用 {snapshot.digest[:8]}: {e}")
+
+            self._checked_at = time.monotonic()
+            return snapshot
+
+
+# 全局学习路径数据
+learning_path_store = LearningPathStore()
+
+
+def init_learning_paths(app):
+    """根据配置加载学习路径数据
+
+    数据文件缺失或不合法时只记录警告，应用照常启动；依赖学习路径的接口在文件修复
+    （下次读取时重新尝试加载）之前返回错误。
+    """
+    learning_path_store.configure(
+        app.config.get('LEARNING_PATHS_FILE') or DEFAULT_LEARNING_PATHS_FILE,
+        app.config.get('LEARNING_PATHS_CHECK_SECONDS', 5)
+    )
+    try:
+        snapshot = learning_path_store.get_snapshot()
+        app.logger.info(f"✅ 学习路径加载完成 (版本 {snapshot.version}, {len(snapshot.paths)} 条路径)")
+    except Exception as e:
+        app.logger.warning(f"⚠️ 学习路径加载失败，学习路径和推荐接口暂不可用: {e}")
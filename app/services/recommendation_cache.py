@@ -0,0 +1,166 @@
+# app/services/recommendation_cache.py - 按推荐输入内容寻址的推荐结果缓存
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.utils.frozen import freeze
+from app.services.recommendation_engine import (
+    RecommendationEngine, get_recommendation_engine, get_learning_paths_version
+)
+
+
+class RecommendationCache:
+    """推荐结果缓存
+
+    除 user_id 和 generated_at 外，推荐结果只取决于推荐输入和引擎版本，答案相同的用户
+    结果相同。以输入字段的 JSON 加引擎版本、学习路径版本的 SHA-256 为键，缓存
+    不含用户字段的结果；命中时补上当前用户的 user_id 和 generated_at。
+
+    进程内按 LRU 淘汰、ttl 秒后失效；shared 为 mongo 时还会读写 recommendation_cache
+    集合，供多个进程共享（由 expires_at 上的 TTL 索引清理）。
+    """
+
+    # 推荐引擎读取的输入字段
+    INPUT_FIELDS = (
+        'skill_assessment', 'interest_preference', 'career_goal',
+        'learning_style', 'time_planning', 'response_count'
+    )
+    # 每个用户不同、命中时重新填写的字段
+    USER_FIELDS = ('user_id', 'generated_at')
+    COLLECTION = 'recommendation_cache'
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 3600, shared: str = 'none'):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(max_entries, ttl, shared)
+
+    def configure(self, max_entries: int, ttl: float, shared: str = 'none'):
+        """设置进程内容量（0 表示不缓存）、有效期（秒）和共享层（none 或 mongo）"""
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl
+            self.shared = shared
+            self._entries.clear()
+
+    def key_for(self, user_data: Dict, learning_paths_version: str = None) -> str:
+        """推荐输入的内容摘要"""
+        # 保留字段内的键顺序：引擎按输入顺序累加浮点数，顺序不同结果可能有细微差别
+        content = json.dumps(
+            [user_data.get(field) for field in self.INPUT_FIELDS],
+            ensure_ascii=False, separators=(',', ':'), default=str
+        )
+        if learning_paths_version is None:
+            learning_paths_version = get_learning_paths_version()
+        raw = f"{RecommendationEngine.VERSION}|{learning_paths_version}|{content}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def generate(self, user_data: Dict) -> Dict:
+        """返回用户的推荐结果：命中缓存时补上用户字段，否则生成并写入缓存"""
+        engine = get_recommendation_engine()
+        if not self.ttl:
+            return engine.generate_recommendation(user_data)
+
+        # 键使用生成结果的引擎所对应的学习路径版本，热更新时不会错配
+        key = self.key_for(user_data, engine.learning_paths_version)
+        body = self.get(key)
+        if body is not None:
+            return self._stamp(body, user_data)
+
+        recommendation = engine.generate_recommendation(user_data)
+        # 生成失败时的默认推荐不缓存
+        if not recommendation.get('is_default'):
+            self.put(key, {k: v for k, v in recommendation.items() if k not in self.USER_FIELDS})
+        return recommendation
+
+    def get(self, key: str) -> Optional[Dict]:
+        """返回缓存的结果（只读）；未命中或已过期时返回 None"""
+        body = self._get_local(key)
+        if body is None and self.shared == 'mongo':
+            body = self._get_shared(key)
+            if body is not None:
+                self._put_local(key, body)
+        return body
+
+    def put(self, key: str, body: Dict):
+        body = freeze(body)
+        self._put_local(key, body)
+        if self.shared == 'mongo':
+            self._put_shared(key, body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _stamp(body: Dict, user_data: Dict) -> Dict:
+        return {
+            'user_id': user_data.get('user_id'),
+            'generated_at': datetime.utcnow().isoformat(),
+            **body
+        }
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        if not self.max_entries:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def _put_local(self, key: str, body: Dict):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (body, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, key: str) -> Optional[Dict]:
+        try:
+            from app.utils.database import mongo, is_db_available
+            if not is_db_available():
+                return None
+            document = mongo.db[self.COLLECTION].find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"body": 1}
+            )
+            return freeze(document["body"]) if document else None
+        except Exception as e:
+            print(f"读取共享推荐缓存失败: {e}")
+            return None
+
+    def _put_shared(self, key: str, body: Dict):
+        try:
+            from app.utils.database import mongo, is_db_available
+            if not is_db_available():
+                return
+            mongo.db[self.COLLECTION].update_one(
+                {"_id": key},
+                {"$set": {"body": body, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"写入共享推荐缓存失败: {e}")
+
+
+# 全局推荐结果缓存
+recommendation_cache = RecommendationCache()
+
+
+def init_recommendation_cache(app):
+    """根据配置初始化推荐结果缓存"""
+    recommendation_cache.configure(
+        app.config.get('RECOMMENDATION_CACHE_SIZE', 5000),
+        app.config.get('RECOMMENDATION_CACHE_TTL_SECONDS', 3600),
+        app.config.get('RECOMMENDATION_CACHE_SHARED', 'none')
+    )
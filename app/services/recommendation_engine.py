@@ -2,19 +2,62 @@
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import logging
+import math
+import threading
+from app.utils.frozen import freeze
+from app.services.learning_paths import learning_path_store, LEARNING_STYLES
+
+try:
+    import numpy as np  # 见 requirements.txt；未安装时 generate_batch 逐个计算
+except ImportError:
+    np = None
 
 class RecommendationEngine:
-    """程序员学习路径推荐引擎"""
+    """程序员学习路径推荐引擎
     
-    def __init__(self):
-        """初始化推荐引擎"""
-        self.learning_paths = self._init_learning_paths()
-        self.skill_weights = {
-            'frontend': 1.0,
-            'backend': 1.0,
-            'mobile': 1.0,
-            'data_science': 1.0
-        }
+    学习路径来自数据文件 data/learning_paths.json 的只读快照：参与评分的路径及其顺序、
+    各路径的学习方式偏好和补充技能都由数据文件定义，在构造时冻结为只读结构（FrozenDict / tuple）。生成推荐时只读取、不修改实例状态，因此每个进程共享一个实例
+    （get_recommendation_engine），多线程下安全；学习路径文件变化后重新构建实例。
+    """
+    
+    # 推荐算法版本，修改评分或结果结构时递增（推荐结果缓存的键包含该版本）
+    VERSION = 1
+    
+    # _determine_experience_level 和 _get_timeline_multiplier 的全部取值
+    EXPERIENCE_LEVELS = ('beginner', 'intermediate', 'advanced')
+    TIMELINE_MULTIPLIERS = (0.8, 1.0, 1.3, 1.6)
+    
+    # 学习方式偏好的各项（与 _process_learning_styles 一致）
+    LEARNING_STYLES = LEARNING_STYLES
+    
+    def __init__(self, snapshot=None):
+        """初始化推荐引擎（snapshot 为学习路径快照，默认使用当前快照）"""
+        if snapshot is None:
+            snapshot = learning_path_store.get_snapshot()
+        self.learning_paths = snapshot.paths
+        self.learning_paths_version = snapshot.digest
+        # 参与评分的路径（数据文件中的顺序决定同分时选择哪条主路径）
+        self.path_names = snapshot.path_names
+        # 各路径的补充技能；引用了路径技能的附上该技能在其他路径中的位置
+        self.supplementary_skills = freeze({
+            path_name: [
+                dict(supplement, learn_in=[
+                    location for location in snapshot.find_skill(supplement.get('skill', ''))
+                    if location['path_name'] != path_name
+                ])
+                for supplement in path_info['supplementary_skills']
+            ]
+            for path_name, path_info in self.learning_paths.items()
+        })
+        # 学习计划只取决于 (路径, 经验水平, 时间线倍数)，构造时全部预先生成
+        self.learning_plans = freeze({
+            (path_name, experience_level, timeline_multiplier): self._build_learning_plan(
+                path_name, path_info, experience_level, timeline_multiplier
+            )
+            for path_name, path_info in self.learning_paths.items()
+            for experience_level in self.EXPERIENCE_LEVELS
+            for timeline_multiplier in self.TIMELINE_MULTIPLIERS
+        })
     
     def generate_recommendation(self, user_data: Dict) -> Dict:
         """
@@ -43,16 +86,10 @@ class RecommendationEngine:
             supplementary_skills = self._recommend_supplementary_skills(primary_path, user_profile)
             
             # 6. 生成完整推荐结果
-            recommendation = {
-                'user_id': user_data.get('user_id'),
-                'generated_at': datetime.utcnow().isoformat(),
-                'user_profile': user_profile,
-                'primary_path': primary_path,
-                'path_scores': path_scores,
-                'learning_plan': learning_plan,
-                'supplementary_skills': supplementary_skills,
-                'confidence_score': self._calculate_confidence_score(user_data, path_scores)
-            }
+            recommendation = self._build_recommendation(
+                user_data, user_profile, primary_path, path_scores, learning_plan,
+                supplementary_skills, self._calculate_confidence_score(user_data, path_scores)
+            )
             
             print(f"✅ 为用户 {user_data.get('user_id')} 生成推荐成功")
             return recommendation
@@ -61,6 +98,125 @@ class RecommendationEngine:
             print(f"❌ 推荐生成失败: {e}")
             return self._get_default_recommendation(user_data.get('user_id'))
     
+    def generate_batch(self, user_data_list: List[Dict]) -> List[Dict]:
+        """
+        批量生成推荐（供离线任务和测试使用）
+        
+        路径匹配度、主路径、时间线倍数和置信度按 用户×路径 的数组一次计算，运算顺序与
+        generate_recommendation 相同，结果逐位一致（generated_at 除外）。
+        未安装 numpy，或某个用户的画像含非数值时，该用户退回逐个计算。
+        
+        Args:
+            user_data_list: Response.get_responses_for_recommendation() 返回的数据列表
+            
+        Returns:
+            与输入顺序对应的推荐结果列表
+        """
+        if np is None:
+            return [self.generate_recommendation(user_data) for user_data in user_data_list]
+        
+        results = [None] * len(user_data_list)
+        rows = []
+        features = []
+        
+        # 1. 逐个分析用户画像，并取出评分需要的数值
+        for index, user_data in enumerate(user_data_list):
+            try:
+                user_profile = self._analyze_user_profile(user_data)
+                vector = self._profile_vector(user_data, user_profile)
+            except Exception:
+                vector = None
+            
+            if vector is None:
+                results[index] = self.generate_recommendation(user_data)
+                continue
+            rows.append((index, user_data, user_profile))
+            features.append(vector)
+        
+        if not rows:
+            return results
+        
+        # 2. 按列计算：skill(路径数) | interest(路径数) | 学习方式(5) | goal | hours | response_count
+        packed = np.array(features, dtype=np.float64)
+        path_count = len(self.path_names)
+        skill = packed[:, 0:path_count]
+        interest = packed[:, path_count:2 * path_count]
+        styles = packed[:, 2 * path_count:2 * path_count + len(self.LEARNING_STYLES)]
+        goal = packed[:, -3]
+        hours = packed[:, -2]
+        response_count = packed[:, -1]
+        
+        # 学习方式匹配度（每条路径按偏好项的顺序依次累加）
+        learning = np.empty_like(skill)
+        for column, path in enumerate(self.path_names):
+            path_pref = self.learning_paths[path]['learning_preferences']
+            match_score = np.zeros(len(rows))
+            for style, weight in path_pref.items():
+                match_score += styles[:, self.LEARNING_STYLES.index(style)] * weight
+            learning[:, column] = np.minimum(1.0, match_score / len(path_pref))
+        
+        # 路径匹配度：与 _calculate_path_scores 相同的累加顺序
+        scores = np.zeros_like(skill)
+        scores += skill * 0.3
+        scores += interest * 0.4
+        scores += goal[:, None] * 0.2
+        scores += learning * 0.1
+        scores = np.minimum(1.0, scores)
+        
+        # 主路径（同分取靠前的路径，与 max() 一致）、时间线倍数、置信度
+        best = np.argmax(scores, axis=1)
+        best_scores = scores[np.arange(len(rows)), best]
+        multipliers = np.select([hours >= 20, hours >= 15, hours >= 10], [0.8, 1.0, 1.3], 1.6)
+        confidence = np.minimum(1.0, response_count / 20) * 0.6 + best_scores * 0.4
+        
+        # 3. 逐个组装推荐结果（tolist 转为 Python float，数值不变）
+        columns = zip(scores.tolist(), best.tolist(), multipliers.tolist(), confidence.tolist())
+        for (index, user_data, user_profile), (row_scores, best_column, multiplier, confidence_score) in zip(rows, columns):
+            try:
+                path_scores = dict(zip(self.path_names, row_scores))
+                primary_path = self._select_primary_path(path_scores, user_profile, self.path_names[best_column])
+                learning_plan = self._create_learning_plan(primary_path, user_profile, multiplier)
+                supplementary_skills = self._recommend_supplementary_skills(primary_path, user_profile)
+                results[index] = self._build_recommendation(
+                    user_data, user_profile, primary_path, path_scores, learning_plan,
+                    supplementary_skills, round(confidence_score, 2)
+                )
+            except Exception as e:
+                print(f"❌ 推荐生成失败: {e}")
+                results[index] = self._get_default_recommendation(user_data.get('user_id'))
+        
+        print(f"✅ 批量生成推荐完成: {len(user_data_list)} 个用户")
+        return results
+    
+    def _profile_vector(self, user_data: Dict, user_profile: Dict) -> Optional[List[float]]:
+        """取出批量评分需要的数值；含非数值（或非有限值）时返回 None"""
+        vector = [user_profile['skill_levels'].get(path, {}).get('combined_score', 0) for path in self.path_names]
+        vector += [user_profile['interests'].get(path, 0) for path in self.path_names]
+        vector += [user_profile['learning_preferences'].get(style, 0) for style in self.LEARNING_STYLES]
+        vector.append(self._calculate_goal_match(None, user_profile['goals']))
+        vector.append(user_profile['time_availability'].get('hours_per_week', 10))
+        vector.append(user_data.get('response_count', 0))
+        
+        for value in vector:
+            if not isinstance(value, (int, float)) or not math.isfinite(value):
+                return None
+        return vector
+    
+    def _build_recommendation(self, user_data: Dict, user_profile: Dict, primary_path: Dict,
+                              path_scores: Dict, learning_plan: Dict, supplementary_skills: List[Dict],
+                              confidence_score: float) -> Dict:
+        """组装推荐结果"""
+        return {
+            'user_id': user_data.get('user_id'),
+            'generated_at': datetime.utcnow().isoformat(),
+            'user_profile': user_profile,
+            'primary_path': primary_path,
+            'path_scores': path_scores,
+            'learning_plan': learning_plan,
+            'supplementary_skills': supplementary_skills,
+            'confidence_score': confidence_score
+        }
+    
     def _analyze_user_profile(self, user_data: Dict) -> Dict:
         """分析用户画像"""
         profile = {
@@ -110,7 +266,7 @@ class RecommendationEngine:
         """计算各路径的匹配度分数"""
         path_scores = {}
         
-        for path in ['frontend', 'backend', 'mobile', 'data_science']:
+        for path in self.path_names:
             score = 0.0
             
             # 1. 技能基础分数 (30%)
@@ -134,40 +290,52 @@ class RecommendationEngine:
         
         return path_scores
     
-    def _select_primary_path(self, path_scores: Dict, user_profile: Dict) -> Dict:
-        """选择主要学习路径"""
+    def _select_primary_path(self, path_scores: Dict, user_profile: Dict, best_path: str = None) -> Dict:
+        """选择主要学习路径（批量计算时由调用方传入得分最高的路径）"""
         # 找到得分最高的路径
-        best_path = max(path_scores, key=path_scores.get)
+        if best_path is None:
+            best_path = max(path_scores, key=path_scores.get)
         best_score = path_scores[best_path]
         
-        # 获取路径详细信息
-        path_info = self.learning_paths[best_path].copy()
+        # 获取路径详细信息（路径模板只读，结果另建 dict）
+        path_info = dict(self.learning_paths[best_path])
         path_info['score'] = best_score
         path_info['path_name'] = best_path
         
         return path_info
     
-    def _create_learning_plan(self, primary_path: Dict, user_profile: Dict) -> Dict:
-        """创建学习计划"""
+    def _create_learning_plan(self, primary_path: Dict, user_profile: Dict,
+                              timeline_multiplier: float = None) -> Dict:
+        """创建学习计划：从预先生成的计划表中取出（只读，批量计算时由调用方传入时间线倍数）"""
         experience_level = user_profile['experience_level']
-        time_availability = user_profile['time_availability']
-        
-        # 根据经验水平调整学习阶段
-        stages = primary_path['stages'].copy()
         
         # 根据时间可用性调整时间线
-        timeline_multiplier = self._get_timeline_multiplier(time_availability)
+        if timeline_multiplier is None:
+            timeline_multiplier = self._get_timeline_multiplier(user_profile['time_availability'])
+        
+        learning_plan = self.learning_plans.get((primary_path['path_name'], experience_level, timeline_multiplier))
+        if learning_plan is None:
+            learning_plan = self._build_learning_plan(
+                primary_path['path_name'], primary_path, experience_level, timeline_multiplier
+            )
+        return learning_plan
+    
+    def _build_learning_plan(self, path_name: str, path_info: Dict, experience_level: str,
+                             timeline_multiplier: float) -> Dict:
+        """按经验水平和时间线倍数生成学习计划"""
+        # 根据经验水平调整学习阶段
+        stages = path_info['stages']
         
         learning_plan = {
-            'path_name': primary_path['path_name'],
-            'total_duration_weeks': int(primary_path['duration_weeks'] * timeline_multiplier),
-            'difficulty_level': primary_path['difficulty'],
+            'path_name': path_name,
+            'total_duration_weeks': int(path_info['duration_weeks'] * timeline_multiplier),
+            'difficulty_level': path_info['difficulty'],
             'stages': []
         }
         
         # 处理每个学习阶段
         for stage in stages:
-            adjusted_stage = stage.copy()
+            adjusted_stage = dict(stage)
             adjusted_stage['duration_weeks'] = int(stage['duration_weeks'] * timeline_multiplier)
             
             # 根据用户基础调整技能点
@@ -181,160 +349,6 @@ class RecommendationEngine:
         
         return learning_plan
     
-    def _init_learning_paths(self) -> Dict:
-        """初始化学习路径模板"""
-        return {
-            'frontend': {
-                'name': '前端开发',
-                'description': '专注于用户界面和用户体验的Web开发',
-                'duration_weeks': 24,
-                'difficulty': 'beginner',
-                'core_technologies': ['HTML', 'CSS', 'JavaScript', 'React', 'Vue'],
-                'stages': [
-                    {
-                        'name': '基础阶段',
-                        'duration_weeks': 8,
-                        'skills': [
-                            {'name': 'HTML5', 'level': 1, 'priority': 'high'},
-                            {'name': 'CSS3', 'level': 1, 'priority': 'high'},
-                            {'name': 'JavaScript基础', 'level': 1, 'priority': 'high'},
-                            {'name': 'DOM操作', 'level': 1, 'priority': 'medium'}
-                        ]
-                    },
-                    {
-                        'name': '进阶阶段',
-                        'duration_weeks': 10,
-                        'skills': [
-                            {'name': 'React/Vue框架', 'level': 2, 'priority': 'high'},
-                            {'name': '状态管理', 'level': 2, 'priority': 'medium'},
-                            {'name': '前端工程化', 'level': 2, 'priority': 'medium'},
-                            {'name': 'API调用', 'level': 2, 'priority': 'high'}
-                        ]
-                    },
-                    {
-                        'name': '高级阶段',
-                        'duration_weeks': 6,
-                        'skills': [
-                            {'name': '性能优化', 'level': 3, 'priority': 'medium'},
-                            {'name': '测试框架', 'level': 3, 'priority': 'low'},
-                            {'name': '微前端', 'level': 3, 'priority': 'low'}
-                        ]
-                    }
-                ]
-            },
-            'backend': {
-                'name': '后端开发',
-                'description': '专注于服务器端逻辑、数据库和API开发',
-                'duration_weeks': 26,
-                'difficulty': 'intermediate',
-                'core_technologies': ['Python', 'Node.js', 'Database', 'API', 'Cloud'],
-                'stages': [
-                    {
-                        'name': '基础阶段',
-                        'duration_weeks': 10,
-                        'skills': [
-                            {'name': 'Python/Java/Node.js', 'level': 1, 'priority': 'high'},
-                            {'name': '数据库基础', 'level': 1, 'priority': 'high'},
-                            {'name': 'HTTP协议', 'level': 1, 'priority': 'medium'},
-                            {'name': 'RESTful API', 'level': 1, 'priority': 'high'}
-                        ]
-                    },
-                    {
-                        'name': '进阶阶段',
-                        'duration_weeks': 12,
-                        'skills': [
-                            {'name': '框架开发', 'level': 2, 'priority': 'high'},
-                            {'name': '数据库设计', 'level': 2, 'priority': 'high'},
-                            {'name': '缓存技术', 'level': 2, 'priority': 'medium'},
-                            {'name': '消息队列', 'level': 2, 'priority': 'medium'}
-                        ]
-                    },
-                    {
-                        'name': '高级阶段',
-                        'duration_weeks': 4,
-                        'skills': [
-                            {'name': '微服务架构', 'level': 3, 'priority': 'medium'},
-                            {'name': '容器化部署', 'level': 3, 'priority': 'medium'},
-                            {'name': '性能优化', 'level': 3, 'priority': 'low'}
-                        ]
-                    }
-                ]
-            },
-            'mobile': {
-                'name': '移动开发',
-                'description': '专注于iOS和Android移动应用开发',
-                'duration_weeks': 28,
-                'difficulty': 'intermediate',
-                'core_technologies': ['React Native', 'Flutter', 'Swift', 'Kotlin'],
-                'stages': [
-                    {
-                        'name': '基础阶段',
-                        'duration_weeks': 12,
-                        'skills': [
-                            {'name': '移动开发基础', 'level': 1, 'priority': 'high'},
-                            {'name': 'React Native/Flutter', 'level': 1, 'priority': 'high'},
-                            {'name': '移动UI设计', 'level': 1, 'priority': 'medium'}
-                        ]
-                    },
-                    {
-                        'name': '进阶阶段',
-                        'duration_weeks': 12,
-                        'skills': [
-                            {'name': '原生功能集成', 'level': 2, 'priority': 'high'},
-                            {'name': '状态管理', 'level': 2, 'priority': 'medium'},
-                            {'name': '数据持久化', 'level': 2, 'priority': 'high'}
-                        ]
-                    },
-                    {
-                        'name': '高级阶段',
-                        'duration_weeks': 4,
-                        'skills': [
-                            {'name': '性能优化', 'level': 3, 'priority': 'medium'},
-                            {'name': '应用发布', 'level': 3, 'priority': 'high'}
-                        ]
-                    }
-                ]
-            },
-            'data_science': {
-                'name': '数据科学',
-                'description': '专注于数据分析、机器学习和AI应用',
-                'duration_weeks': 30,
-                'difficulty': 'advanced',
-                'core_technologies': ['Python', 'SQL', 'Machine Learning', 'Statistics'],
-                'stages': [
-                    {
-                        'name': '基础阶段',
-                        'duration_weeks': 12,
-                        'skills': [
-                            {'name': 'Python数据处理', 'level': 1, 'priority': 'high'},
-                            {'name': 'SQL数据库', 'level': 1, 'priority': 'high'},
-                            {'name': '统计学基础', 'level': 1, 'priority': 'high'},
-                            {'name': '数据可视化', 'level': 1, 'priority': 'medium'}
-                        ]
-                    },
-                    {
-                        'name': '进阶阶段',
-                        'duration_weeks': 14,
-                        'skills': [
-                            {'name': '机器学习算法', 'level': 2, 'priority': 'high'},
-                            {'name': '特征工程', 'level': 2, 'priority': 'high'},
-                            {'name': '模型评估', 'level': 2, 'priority': 'high'},
-                            {'name': '深度学习基础', 'level': 2, 'priority': 'medium'}
-                        ]
-                    },
-                    {
-                        'name': '高级阶段',
-                        'duration_weeks': 4,
-                        'skills': [
-                            {'name': '深度学习应用', 'level': 3, 'priority': 'medium'},
-                            {'name': '模型部署', 'level': 3, 'priority': 'high'},
-                            {'name': 'MLOps', 'level': 3, 'priority': 'low'}
-                        ]
-                    }
-                ]
-            }
-        }
-    
     # 辅助方法
     def _process_learning_styles(self, styles: List[Dict]) -> Dict:
         """处理学习方式偏好"""
@@ -398,15 +412,8 @@ class RecommendationEngine:
     
     def _calculate_learning_match(self, path: str, preferences: Dict) -> float:
         """计算学习方式匹配度"""
-        # 不同路径对学习方式的偏好
-        path_preferences = {
-            'frontend': {'hands_on': 0.8, 'interactive': 0.7, 'video': 0.6},
-            'backend': {'theoretical': 0.6, 'hands_on': 0.8, 'reading': 0.7},
-            'mobile': {'hands_on': 0.9, 'interactive': 0.6, 'video': 0.5},
-            'data_science': {'theoretical': 0.8, 'reading': 0.7, 'hands_on': 0.6}
-        }
-        
-        path_pref = path_preferences.get(path, {})
+        path_info = self.learning_paths.get(path)
+        path_pref = path_info['learning_preferences'] if path_info else {}
         if not path_pref or not preferences:
             return 0.5
         
@@ -431,34 +438,8 @@ class RecommendationEngine:
             return 1.6  # 较慢
     
     def _recommend_supplementary_skills(self, primary_path: Dict, user_profile: Dict) -> List[Dict]:
-        """推荐补充技能"""
-        supplements = []
-        
-        # 根据主路径推荐相关技能
-        path_name = primary_path['path_name']
-        
-        if path_name == 'frontend':
-            supplements = [
-                {'name': '基础设计知识', 'priority': 'medium', 'reason': '提升UI/UX能力'},
-                {'name': '后端基础', 'priority': 'low', 'reason': '成为全栈开发者'}
-            ]
-        elif path_name == 'backend':
-            supplements = [
-                {'name': '前端基础', 'priority': 'medium', 'reason': '理解全栈开发'},
-                {'name': 'DevOps基础', 'priority': 'medium', 'reason': '部署和运维能力'}
-            ]
-        elif path_name == 'mobile':
-            supplements = [
-                {'name': '后端API设计', 'priority': 'medium', 'reason': '更好的前后端协作'},
-                {'name': 'UI/UX设计', 'priority': 'high', 'reason': '移动端用户体验'}
-            ]
-        elif path_name == 'data_science':
-            supplements = [
-                {'name': '云计算平台', 'priority': 'medium', 'reason': '大规模数据处理'},
-                {'name': 'Web开发基础', 'priority': 'low', 'reason': '数据产品开发'}
-            ]
-        
-        return supplements
+        """推荐补充技能（数据文件中主路径的补充技能，构造时已生成）"""
+        return list(self.supplementary_skills.get(primary_path['path_name'], ()))
     
     def _calculate_confidence_score(self, user_data: Dict, path_scores: Dict) -> float:
         """计算推荐置信度"""
@@ -477,9 +458,40 @@ class RecommendationEngine:
         return {
             'user_id': user_id,
             'generated_at': datetime.utcnow().isoformat(),
-            'primary_path': self.learning_paths['frontend'],
+            'primary_path': self.learning_paths[self.path_names[0]],
             'learning_plan': {},
             'confidence_score': 0.3,
             'is_default': True,
             'message': '推荐基于默认配置，建议完成更多问卷获得个性化推荐'
-        }
\ No newline at end of file
+        }
+
+# 进程内共享的推荐引擎
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_recommendation_engine() -> RecommendationEngine:
+    """获取进程内共享的推荐引擎
+
+    应用创建时构建；学习路径快照变化后构建新实例并整体替换，正在使用旧实例的请求不受影响。
+    """
+    global _engine
+    snapshot = learning_path_store.get_snapshot()
+    engine = _engine
+    if engine is None or engine.learning_paths_version != snapshot.digest:
+        with _engine_lock:
+            engine = _engine
+            if engine is None or engine.learning_paths_version != snapshot.digest:
+                engine = RecommendationEngine(snapshot)
+                _engine = engine
+    return engine
+
+def init_recommendation_engine(app):
+    """应用创建时构建推荐引擎，避免首个请求承担构建开销；学习路径不可用时推迟到首次使用"""
+    try:
+        get_recommendation_engine()
+    except Exception as e:
+        app.logger.warning(f"⚠️ 推荐引擎预热失败: {e}")
+
+def get_learning_paths_version() -> str:
+    """学习路径数据的内容摘要，用于 ETag、推荐结果缓存等缓存键"""
+    return learning_path_store.get_snapshot().digest
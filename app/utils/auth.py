@@ -0,0 +1,52 @@
+# app/utils/auth.py - 统一的请求认证
+from typing import Optional
+
+from flask import current_app, g, request
+
+from app.models.user import User
+
+
+def authenticate_request():
+    """before_request：每个请求只验证一次令牌，结果保存在 g 上
+
+    g.user_id 为通过验证的用户 ID（未携带或令牌无效时为 None），
+    g.auth_error 为需要认证的接口应返回的错误。公开接口不受影响。
+    """
+    g.user_id = None
+    g.auth_error = ({'success': False, 'message': '缺少认证令牌'}, 401)
+
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+
+    token = auth_header.split(' ')[1]
+    user_id = User.verify_token(token, current_app.config['SECRET_KEY'])
+    if not user_id:
+        g.auth_error = ({'success': False, 'message': '令牌无效或已过期'}, 401)
+        return None
+
+    g.user_id = user_id
+    g.auth_error = None
+    return None
+
+
+def verify_token_and_get_user():
+    """需要认证的接口使用：返回 (user_id, error_response, status_code)"""
+    if 'auth_error' not in g:
+        authenticate_request()
+    if g.auth_error:
+        error_response, status_code = g.auth_error
+        return None, error_response, status_code
+    return g.user_id, None, None
+
+
+def current_user_id() -> Optional[str]:
+    """可选认证的接口使用：当前用户 ID，未登录时为 None"""
+    if 'auth_error' not in g:
+        authenticate_request()
+    return g.user_id
+
+
+def init_auth(app):
+    """注册请求认证"""
+    app.before_request(authenticate_request)
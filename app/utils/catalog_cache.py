@@ -0,0 +1,196 @@
+# app/utils/catalog_cache.py - 进程内题库缓存
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from app.utils import request_cache
+
+# 题库版本戳存放位置
+CATALOG_META_COLLECTION = 'catalog_meta'
+QUESTION_CATALOG_KEY = 'questions'
+
+# 答案记录需要冗余保存的选项映射字段
+OPTION_MAPPING_FIELDS = ('skill_mapping', 'path_weights', 'goal_mapping', 'style_mapping', 'time_mapping')
+
+
+def question_revision(question: Dict) -> str:
+    """问题的修订标识：答案从该问题补全的字段（类别、权重和选项）的内容摘要
+
+    只有这些字段变化时修订标识才会变化，停用问题或修改题目文本不影响已保存的答案。
+    """
+    content = json.dumps(
+        [question.get("category"), question.get("weight", 1), question.get("options", [])],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+def compile_answer_option(question: Dict, option: Dict, revision: str = None) -> Dict:
+    """把问题选项编译为答案校验和写入所需的全部数据"""
+    answer_option = {
+        "question_id": question["question_id"],
+        "question_revision": revision or question_revision(question),
+        "question_category": question.get("category"),
+        "answer_value": option["value"],
+        "answer_text": option.get("text"),
+        "tags": option.get("tags", []),
+        "weight": question.get("weight", 1),
+        "score": option.get("score", 0),
+    }
+    for field in OPTION_MAPPING_FIELDS:
+        answer_option[field] = option.get(field)
+    return answer_option
+
+
+class CatalogSnapshot:
+    """某一版本题库的只读快照
+
+    快照内的问题字典在进程内共享，调用方只能读取；
+    需要添加字段时请先复制（Question 模型返回的已经是浅拷贝）。
+    """
+
+    def __init__(self, version: int, questions: List[Dict]):
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+
+        # 按 question_id 索引全部问题（包括已停用的，与 get_by_id 语义一致）
+        self.by_id: Dict[str, Dict] = {}
+        # 启用的问题，按 order 排序
+        self.active: List[Dict] = []
+        # 按分类索引启用的问题
+        self.by_category: Dict[str, List[Dict]] = {}
+        # question_id -> 问题修订标识（包括已停用的问题）
+        self.revisions: Dict[str, str] = {}
+        # (question_id, answer_value) -> 编译后的答案选项
+        self.options: Dict[Tuple[str, str], Dict] = {}
+
+        for question in questions:
+            revision = question_revision(question)
+            self.by_id[question['question_id']] = question
+            self.revisions[question['question_id']] = revision
+            for option in question.get('options', []):
+                key = (question['question_id'], option['value'])
+                # 与线性查找保持一致：重复的 value 以第一个选项为准
+                self.options.setdefault(key, compile_answer_option(question, option, revision))
+            if question.get('is_active'):
+                self.active.append(question)
+                self.by_category.setdefault(question.get('category'), []).append(question)
+
+        # 启用问题的内容摘要，用于 ETag 等缓存键
+        content = json.dumps(self.active, sort_keys=True, ensure_ascii=False, default=str)
+        self.digest = hashlib.sha1(f"{version}:{content}".encode('utf-8')).hexdigest()
+
+
+class QuestionCatalog:
+    """进程级题库缓存
+
+    题库几乎不变，因此整份加载到内存，按版本戳判断是否需要重新加载。
+    版本戳由 Question.create / Question.deactivate 递增；为避免每次读取都访问数据库，
+    版本戳最多每 refresh_interval 秒检查一次。本进程内的写操作会立即使缓存失效。
+    """
+
+    def __init__(self, refresh_interval: int = 30):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, refresh_interval: int):
+        """设置版本戳检查间隔（秒）"""
+        self.refresh_interval = refresh_interval
+
+    def get_snapshot(self) -> CatalogSnapshot:
+        """获取当前题库快照，必要时重新加载；同一请求内始终使用同一份快照"""
+        return request_cache.memoize(('question_catalog',), self._current_snapshot)
+
+    def _current_snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+            return snapshot
+        return self._refresh()
+
+    def invalidate(self):
+        """丢弃当前快照，下次访问时重新加载"""
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = 0.0
+        request_cache.invalidate(('question_catalog',))
+
+    def bump_version(self) -> Optional[int]:
+        """递增题库版本戳并使本进程缓存失效"""
+        try:
+            mongo = _get_mongo()
+            meta = mongo.db[CATALOG_META_COLLECTION].find_one_and_update(
+                {"_id": QUESTION_CATALOG_KEY},
+                {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return meta.get("version")
+        except Exception as e:
+            print(f"更新题库版本失败: {e}")
+            return None
+        finally:
+            self.invalidate()
+
+    def _refresh(self) -> CatalogSnapshot:
+        with self._lock:
+            # 其他线程可能已经完成刷新
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+                return snapshot
+
+            try:
+                mongo = _get_mongo()
+                version = _read_version(mongo)
+                if snapshot is None or snapshot.version != version:
+                    questions = list(mongo.db.questions.find({}).sort("order", 1))
+                    for question in questions:
+                        question["_id"] = str(question["_id"])
+                    snapshot = CatalogSnapshot(version, questions)
+                    self._snapshot = snapshot
+                    print(f"题库缓存已加载: 版本 {version}, {len(snapshot.active)} 个活跃问题")
+            except Exception as e:
+                if snapshot is None:
+                    raise
+                # 数据库暂时不可用时继续使用旧快照
+                print(f"刷新题库缓存失败，继续使用版本 {snapshot.version}: {e}")
+
+            self._checked_at = time.monotonic()
+            return snapshot
+
+
+def _get_mongo():
+    from app.utils.database import mongo
+    if mongo is None or mongo.db is None:
+        raise RuntimeError("MongoDB connection not initialized")
+    return mongo
+
+
+def _read_version(mongo) -> int:
+    meta = mongo.db[CATALOG_META_COLLECTION].find_one({"_id": QUESTION_CATALOG_KEY}, {"version": 1})
+    return meta.get("version", 0) if meta else 0
+
+
+# 全局题库缓存
+question_catalog = QuestionCatalog()
+
+
+def init_question_catalog(app):
+    """根据配置初始化题库缓存并预热"""
+    from app.utils.database import is_db_available
+
+    question_catalog.configure(app.config.get('QUESTION_CATALOG_REFRESH_SECONDS', 30))
+    if not is_db_available():
+        return
+
+    try:
+        snapshot = question_catalog.get_snapshot()
+        app.logger.info(f"✅ 题库缓存预热完成 (版本 {snapshot.version})")
+    except Exception as e:
+        app.logger.warning(f"⚠️ 题库缓存预热失败: {e}")
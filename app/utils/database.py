@@ -200,32 +200,103 @@ def _test_database_connection(app, client, db):
     
     return False
 
+# 写入路径依赖的唯一索引：(集合, 索引名, 字段)
+# 缺失时注册改为先查询再插入，答案写入直接拒绝，避免产生重复数据
+REQUIRED_UNIQUE_INDEXES = (
+    ('users', 'username_1', ('username',)),
+    ('users', 'email_1', ('email',)),
+    ('responses', 'user_id_1_attempt_1_question_id_1', ('user_id', 'attempt', 'question_id')),
+)
+
+# 启动时确认存在的唯一索引
+_unique_indexes_ready = set()
+
 def _create_indexes(app):
-    """创建必要的数据库索引"""
-    try:
-        if not _db_available or not mongo.db:
-            return
-            
+    """创建必要的数据库索引
+
+    每个索引单独创建，一个失败（如已有重复数据导致唯一索引无法建立）不影响其余索引。
+    创建完成后检查写入路径依赖的唯一索引，缺失时记录错误日志。
+    """
+    if not _db_available or mongo.db is None:
+        return
+    
+    index_specs = [
         # 用户集合索引
-        mongo.db.users.create_index([("username", 1)], unique=True, background=True)
-        mongo.db.users.create_index([("email", 1)], unique=True, background=True)
+        ('users', [("username", 1)], {"unique": True}),
+        ('users', [("email", 1)], {"unique": True}),
+        # 待清理的旧轮次（按重置时间）
+        ('users', [("superseded.reset_at", 1)], {"sparse": True}),
         
         # 问题集合索引
-        mongo.db.questions.create_index([("question_id", 1)], unique=True, background=True)
-        mongo.db.questions.create_index([("category", 1), ("order", 1)], background=True)
+        ('questions', [("question_id", 1)], {"unique": True}),
+        ('questions', [("category", 1), ("order", 1)], {}),
         
-        # 答案集合索引
-        mongo.db.responses.create_index([("user_id", 1), ("question_id", 1)], unique=True, background=True)
-        mongo.db.responses.create_index([("user_id", 1)], background=True)
+        # 答案集合索引（按答题轮次区分，每轮每题一个答案）
+        ('responses', [("user_id", 1), ("attempt", 1), ("question_id", 1)], {"unique": True}),
+        ('responses', [("user_id", 1)], {}),
         
-        # 推荐集合索引
-        mongo.db.recommendations.create_index([("user_id", 1)], background=True)
-        mongo.db.recommendations.create_index([("created_at", 1)], background=True)
+        # 答案事件日志索引（按用户回放历史）
+        ('answer_events', [("user_id", 1), ("_id", 1)], {}),
         
-        app.logger.info("✅ 数据库索引创建完成")
+        # 推荐集合索引
+        ('recommendations', [("user_id", 1)], {}),
+        ('recommendations', [("created_at", 1)], {}),
         
+        # 共享推荐结果缓存，过期后自动删除
+        ('recommendation_cache', [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ]
+    
+    failed = 0
+    for collection, keys, options in index_specs:
+        try:
+            mongo.db[collection].create_index(keys, background=True, **options)
+        except Exception as e:
+            failed += 1
+            app.logger.warning(f"⚠️ 索引创建失败 {collection} {keys}: {e}")
+    
+    # 旧的 (user_id, question_id) 唯一索引会阻止新一轮答题，需要删除
+    try:
+        if "user_id_1_question_id_1" in mongo.db.responses.index_information():
+            mongo.db.responses.drop_index("user_id_1_question_id_1")
     except Exception as e:
-        app.logger.warning(f"⚠️ 索引创建失败: {e}")
+        failed += 1
+        app.logger.warning(f"⚠️ 删除旧索引 user_id_1_question_id_1 失败: {e}")
+    
+    check_unique_indexes(app)
+    
+    if failed:
+        app.logger.warning(f"⚠️ 数据库索引创建完成，{failed} 项失败")
+    else:
+        app.logger.info("✅ 数据库索引创建完成")
+
+def check_unique_indexes(app=None):
+    """通过 index_information() 确认写入路径依赖的唯一索引，返回缺失的 (集合, 索引名) 列表"""
+    missing = []
+    ready = set()
+    for collection, name, _ in REQUIRED_UNIQUE_INDEXES:
+        try:
+            index = mongo.db[collection].index_information().get(name)
+        except Exception:
+            index = None
+        if index and index.get('unique'):
+            ready.add((collection, name))
+        else:
+            missing.append((collection, name))
+    
+    _unique_indexes_ready.clear()
+    _unique_indexes_ready.update(ready)
+    
+    for collection, name in missing:
+        message = f"❌ 缺少唯一索引 {collection}.{name}，请清理重复数据后运行 python scripts/db_manager.py check-indexes"
+        if app is not None:
+            app.logger.error(message)
+        else:
+            print(message)
+    return missing
+
+def has_unique_index(collection, name):
+    """启动时是否确认了某个唯一索引"""
+    return (collection, name) in _unique_indexes_ready
 
 def _mask_uri(uri):
     """隐藏URI中的敏感信息"""
@@ -313,6 +384,28 @@ def cleanup_expired_data():
     except Exception:
         return {'recommendations_cleaned': 0, 'feedback_cleaned': 0}
 
+def backup_collection(collection_name, path=None):
+    """把集合导出为 JSON 文件，返回文件路径；失败时返回 None"""
+    if not is_db_available():
+        return None
+    
+    try:
+        import json
+        if path is None:
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            path = os.path.join('backups', f"{collection_name}_{timestamp}.json")
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        documents = list(_db[collection_name].find({}))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(documents, f, ensure_ascii=False, indent=2, default=str)
+        return path
+    except Exception:
+        return None
+
 def health_check():
     """健康检查"""
     try:
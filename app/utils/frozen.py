@@ -0,0 +1,35 @@
+# app/utils/frozen.py - 只读数据结构
+from typing import Any
+
+
+class FrozenDict(dict):
+    """不可修改的 dict
+
+    仍是 dict 的子类，jsonify 和 pymongo 可以直接序列化；任何修改操作都会抛出 TypeError。
+    copy() 返回可修改的普通 dict。
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict 不可修改")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __reduce__(self):
+        # 默认的 pickle / deepcopy 会逐项调用 __setitem__
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """递归地把 dict 转为 FrozenDict、把 list 转为 tuple"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
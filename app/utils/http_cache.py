@@ -0,0 +1,161 @@
+# app/utils/http_cache.py - 公开目录接口的 ETag / 条件请求 / 预序列化响应
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from flask import current_app, request
+
+try:
+    import brotli  # 见 requirements.txt；未安装时只提供 gzip
+except ImportError:
+    brotli = None
+
+# 预压缩响应提供的内容编码，按优先顺序
+PAYLOAD_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def make_etag(*parts) -> str:
+    """根据内容版本等组成部分生成强 ETag"""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def catalog_etag(*parts) -> Optional[str]:
+    """基于题库内容版本的 ETag；题库不可用时返回 None（不做缓存）"""
+    try:
+        from app.utils.database import is_db_available
+        from app.utils.catalog_cache import question_catalog
+
+        if is_db_available():
+            version = question_catalog.get_snapshot().digest
+        else:
+            # 降级模式下返回固定的示例题目
+            version = 'demo'
+        return make_etag('catalog', version, *parts)
+    except Exception as e:
+        print(f"生成题库ETag失败: {e}")
+        return None
+
+
+def learning_paths_etag(*parts) -> Optional[str]:
+    """基于学习路径定义的 ETag"""
+    try:
+        from app.services.recommendation_engine import get_learning_paths_version
+        return make_etag('learning_paths', get_learning_paths_version(), *parts)
+    except Exception as e:
+        print(f"生成学习路径ETag失败: {e}")
+        return None
+
+
+def is_not_modified(etag: Optional[str]) -> bool:
+    """客户端缓存的版本是否仍然有效（If-None-Match）"""
+    return bool(etag) and request.if_none_match.contains(etag)
+
+
+def not_modified_response(etag: str):
+    """生成 304 响应，不做任何序列化"""
+    response = current_app.response_class(status=304)
+    return apply_cache_headers(response, etag)
+
+
+def apply_cache_headers(response, etag: Optional[str]):
+    """为公开响应设置 ETag 和 Cache-Control，便于反向代理缓存"""
+    if not etag:
+        return response
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('PUBLIC_CACHE_MAX_AGE', 300)
+    # 带认证的请求会返回个性化内容，共享缓存需要区分
+    response.vary.add('Authorization')
+    return response
+
+
+def negotiated_encoding() -> Optional[str]:
+    """根据 Accept-Encoding 选择预压缩响应的内容编码；不接受压缩时返回 None"""
+    for candidate in PAYLOAD_ENCODINGS:
+        if request.accept_encodings[candidate]:
+            return candidate
+    return None
+
+
+def payload_etag(etag: Optional[str]) -> Optional[str]:
+    """预压缩响应实际使用的 ETag
+
+    不同内容编码的响应体字节不同，强 ETag 也必须不同（RFC 7232），
+    因此压缩版本在 ETag 后加上编码后缀，未压缩版本使用原 ETag。
+    """
+    encoding = negotiated_encoding()
+    if not etag or not encoding:
+        return etag
+    return f"{etag}-{encoding}"
+
+
+class CachedPayload:
+    """预先序列化并压缩好的 JSON 响应体"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.encoded: Dict[str, bytes] = {
+            # mtime=0 保证相同内容得到相同的压缩结果
+            'gzip': gzip.compress(body, compresslevel=6, mtime=0)
+        }
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(body)
+
+
+class PayloadCache:
+    """按缓存键保存预序列化的公开响应
+
+    每个键只保留与当前 ETag 对应的一份数据，ETag 变化（即底层数据变化）后重新生成。
+    键的数量有上限，超出时淘汰最久未使用的键。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, etag: Optional[str]) -> Optional[CachedPayload]:
+        """获取与 etag 匹配的缓存数据"""
+        if not etag:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, etag: str, data) -> CachedPayload:
+        """序列化、压缩并缓存响应数据"""
+        # 与 jsonify 使用同一个 JSON provider，保证输出字节完全一致
+        body = current_app.json.response(data).get_data()
+        payload = CachedPayload(body)
+        with self._lock:
+            self._entries[key] = (etag, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局公开响应缓存
+public_payloads = PayloadCache()
+
+
+def payload_response(payload: CachedPayload, etag: str):
+    """根据 Accept-Encoding 返回预压缩的响应，ETag 按内容编码区分（见 payload_etag）"""
+    encoding = negotiated_encoding()
+    body = payload.encoded[encoding] if encoding else payload.body
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    return apply_cache_headers(response, payload_etag(etag))
@@ -0,0 +1,125 @@
+# app/utils/password_hasher.py - 在进程池中计算密码哈希
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """等待计算的密码哈希过多或超时，接口应返回 503"""
+
+
+class PasswordHasher:
+    """密码哈希计算器
+
+    PBKDF2 / scrypt 计算会长时间占用 CPU，这里把计算放到有界的进程池中执行，
+    避免阻塞同一进程中的其他请求。同时等待的计算超过 max_pending 个时直接抛出
+    PasswordHasherBusy，而不是让请求无限排队。workers 为 0 时在当前线程中计算。
+    """
+
+    def __init__(self, method: str = 'pbkdf2:sha256:600000', workers: int = 2,
+                 max_pending: int = 4, timeout: float = 10):
+        self._lock = threading.Lock()
+        self._executor = None
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method: str, workers: int, max_pending: int, timeout: float):
+        """设置哈希算法参数、进程数、排队上限和等待超时（秒）"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.method = method
+            self.workers = workers
+            self.max_pending = max_pending
+            self.timeout = timeout
+            self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+            # 带完整参数的算法（如 pbkdf2:sha256:600000）可直接比较，简写形式在首次计算后确定
+            self._method_prefix = method if ':' in method else None
+
+    def hash(self, password: str) -> str:
+        """按当前配置生成密码哈希；超时抛出 PasswordHasherBusy
+
+        计算一旦提交就无法撤回，调用方应在完成其他校验之后再调用。
+        """
+        method = self.method
+        pwhash = self._wait(self._submit(generate_password_hash, password, method), generate_password_hash, password, method)
+        self._method_prefix = pwhash.split('$', 1)[0]
+        return pwhash
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """校验密码"""
+        return self._wait(self._submit(check_password_hash, pwhash, password), check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """哈希是否使用了与当前配置不同的算法或参数"""
+        if self._method_prefix is None:
+            self.hash('')
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def _submit(self, func, *args) -> Future:
+        if not self.workers:
+            return self._run_inline(func, *args)
+
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy('等待计算的密码哈希过多')
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            slots.release()
+            self._reset_executor()
+            return self._run_inline(func, *args)
+        except Exception:
+            slots.release()
+            raise
+        # 计算结束（或被取消）时释放排队名额
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def _wait(self, future: Future, func, *args):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy('密码哈希计算超时')
+        except BrokenProcessPool:
+            # 工作进程异常退出：重建进程池，本次在当前线程中计算
+            self._reset_executor()
+            return func(*args)
+
+    @staticmethod
+    def _run_inline(func, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # 首次使用时创建，保证在 gunicorn 等预先 fork 的工作进程中创建进程池
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# 全局密码哈希计算器
+password_hasher = PasswordHasher()
+
+
+def init_password_hasher(app):
+    """根据配置初始化密码哈希计算器"""
+    password_hasher.configure(
+        app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+        app.config.get('PASSWORD_HASH_WORKERS', 2),
+        app.config.get('PASSWORD_HASH_MAX_PENDING', 4),
+        app.config.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10)
+    )
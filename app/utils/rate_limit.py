@@ -0,0 +1,157 @@
+# app/utils/rate_limit.py - 令牌桶限流
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Tuple
+
+from flask import request
+
+from app.utils.settings import get_setting
+
+
+class BucketStore(ABC):
+    """令牌桶存储接口
+
+    take 原子地为 key 对应的桶补充令牌并尝试取走一个，返回 (是否允许, 需等待的秒数)；
+    refund 退还一个已取走的令牌（不超过容量）。
+    多进程部署需要共享限流状态时，实现该接口（如基于 Redis）并通过 login_limiter.use_store 替换。
+    """
+
+    @abstractmethod
+    def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        ...
+
+    @abstractmethod
+    def refund(self, key: str, capacity: float):
+        ...
+
+    @abstractmethod
+    def reset(self, key: str):
+        ...
+
+
+class MemoryBucketStore(BucketStore):
+    """进程内令牌桶，超过 max_keys 个桶时淘汰最久未使用的桶"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+            if tokens >= 1:
+                allowed, retry_after = True, 0.0
+                tokens -= 1
+            else:
+                allowed = False
+                retry_after = (1 - tokens) / refill_per_second if refill_per_second > 0 else float('inf')
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed, retry_after
+
+    def refund(self, key: str, capacity: float):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                tokens, updated_at = bucket
+                self._buckets[key] = (min(capacity, tokens + 1), updated_at)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class LoginRateLimiter:
+    """登录限流：同时按登录标识（用户名/邮箱）和客户端 IP 各维护一个令牌桶
+
+    在校验密码之前调用，被拒绝的请求不查询数据库也不计算密码哈希。
+    容量为 0 的维度不限流。
+    """
+
+    def __init__(self, store: BucketStore = None):
+        self.store = store or MemoryBucketStore()
+        self.identity_burst = 5
+        self.identity_per_minute = 5
+        self.ip_burst = 20
+        self.ip_per_minute = 30
+
+    def configure(self, identity_burst: int, identity_per_minute: float,
+                  ip_burst: int, ip_per_minute: float):
+        self.identity_burst = identity_burst
+        self.identity_per_minute = identity_per_minute
+        self.ip_burst = ip_burst
+        self.ip_per_minute = ip_per_minute
+
+    def use_store(self, store: BucketStore):
+        """替换令牌桶存储（如换成多进程共享的存储）"""
+        self.store = store
+
+    def check(self, identity: str, client_ip: str) -> Tuple[bool, int]:
+        """尝试放行一次登录，返回 (是否允许, Retry-After 秒数)
+
+        按登录标识被拒绝时退还已取走的 IP 令牌，针对某个被限流账户的重试不会耗尽
+        同一 IP（可能是共用出口的多个用户）的额度。
+        """
+        ip_key = f"login:ip:{client_ip}" if self.ip_burst and client_ip else None
+        if ip_key:
+            allowed, retry_after = self.store.take(ip_key, self.ip_burst, self.ip_per_minute / 60.0)
+            if not allowed:
+                return False, self._retry_after_seconds(retry_after)
+
+        if self.identity_burst and identity:
+            allowed, retry_after = self.store.take(
+                f"login:id:{identity.strip().lower()}", self.identity_burst, self.identity_per_minute / 60.0
+            )
+            if not allowed:
+                if ip_key:
+                    self.store.refund(ip_key, self.ip_burst)
+                return False, self._retry_after_seconds(retry_after)
+
+        return True, 0
+
+    def record_success(self, identity: str):
+        """登录成功后清空该标识的桶，限流只针对连续失败的尝试"""
+        if identity:
+            self.store.reset(f"login:id:{identity.strip().lower()}")
+
+    @staticmethod
+    def _retry_after_seconds(retry_after: float) -> int:
+        if math.isinf(retry_after):
+            return 60
+        return max(1, math.ceil(retry_after))
+
+
+def client_ip() -> str:
+    """当前请求可信的客户端 IP，无法确定时返回空字符串
+
+    TRUSTED_PROXY_COUNT 大于 0 时，create_app 用 ProxyFix 按该层数从 X-Forwarded-For
+    还原出 remote_addr。为 0 时 remote_addr 可能是代理地址（所有客户端共用同一个 IP 桶），
+    而请求头又可能被伪造，因此不按 IP 限流，只依赖按登录标识的令牌桶。
+    """
+    if not get_setting('TRUSTED_PROXY_COUNT', 0):
+        return ''
+    return request.remote_addr or ''
+
+
+# 全局登录限流器
+login_limiter = LoginRateLimiter()
+
+
+def init_rate_limit(app):
+    """根据配置初始化登录限流"""
+    login_limiter.configure(
+        app.config.get('LOGIN_IDENTITY_BURST', 5),
+        app.config.get('LOGIN_IDENTITY_PER_MINUTE', 5),
+        app.config.get('LOGIN_IP_BURST', 20),
+        app.config.get('LOGIN_IP_PER_MINUTE', 30)
+    )
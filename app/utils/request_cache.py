@@ -0,0 +1,45 @@
+# app/utils/request_cache.py - 请求级缓存
+from typing import Callable, Optional
+
+from flask import g, has_request_context
+
+
+def _store() -> Optional[dict]:
+    # 只在 HTTP 请求内缓存；脚本里长期存在的应用上下文不缓存，避免读到旧数据
+    if not has_request_context():
+        return None
+    store = g.get('_request_cache')
+    if store is None:
+        store = {}
+        g._request_cache = store
+    return store
+
+
+def memoize(key: tuple, loader: Callable):
+    """在当前请求内缓存 loader() 的结果，同一请求中每个 key 最多加载一次
+
+    缓存的值在请求内共享，调用方只能读取。
+    """
+    store = _store()
+    if store is None:
+        return loader()
+    if key not in store:
+        store[key] = loader()
+    return store[key]
+
+
+def invalidate(key: tuple):
+    """丢弃当前请求内缓存的某个值"""
+    store = _store()
+    if store is not None:
+        store.pop(key, None)
+
+
+def invalidate_user(user_id: str):
+    """用户数据写入后丢弃当前请求内该用户的全部缓存（键的第二项为 user_id）"""
+    store = _store()
+    if store is None:
+        return
+    user_id = str(user_id)
+    for key in [key for key in store if len(key) > 1 and key[1] == user_id]:
+        del store[key]
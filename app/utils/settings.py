@@ -0,0 +1,9 @@
+# app/utils/settings.py - 在模型层读取应用配置
+from flask import current_app, has_app_context
+
+
+def get_setting(name: str, default=None):
+    """读取当前应用配置；没有应用上下文时（如独立脚本）返回默认值"""
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
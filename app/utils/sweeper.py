@@ -0,0 +1,52 @@
+# app/utils/sweeper.py - 后台维护任务（清理旧轮次答案、压缩答案事件）
+import threading
+import time
+
+
+def start_attempt_sweeper(app):
+    """按 ATTEMPT_SWEEP_INTERVAL_SECONDS 周期清理旧轮次答案；间隔为 0 时不启动"""
+    interval = app.config.get('ATTEMPT_SWEEP_INTERVAL_SECONDS', 0)
+    if not interval:
+        return None
+
+    def run():
+        from app.models.response import Response
+
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    Response.sweep_superseded_attempts()
+            except Exception as e:
+                app.logger.warning(f"⚠️ 旧轮次答案清理失败: {e}")
+
+    thread = threading.Thread(target=run, name='attempt-sweeper', daemon=True)
+    thread.start()
+    app.logger.info(f"✅ 旧轮次答案清理已启动 (每 {interval} 秒)")
+    return thread
+
+
+def start_event_compactor(app):
+    """事件日志模式下按 ANSWER_EVENT_COMPACTION_INTERVAL_SECONDS 周期压缩答案事件
+
+    每个工作进程都会启动，但同一时间只有持有压缩租约的进程实际处理事件。
+    """
+    interval = app.config.get('ANSWER_EVENT_COMPACTION_INTERVAL_SECONDS', 10)
+    if app.config.get('ANSWER_WRITE_MODE') != 'event_log' or not interval:
+        return None
+
+    def run():
+        from app.models.answer_event import AnswerEvent
+
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    AnswerEvent.compact()
+            except Exception as e:
+                app.logger.warning(f"⚠️ 答案事件压缩失败: {e}")
+
+    thread = threading.Thread(target=run, name='answer-event-compactor', daemon=True)
+    thread.start()
+    app.logger.info(f"✅ 答案事件压缩已启动 (每 {interval} 秒)")
+    return thread
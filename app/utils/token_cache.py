@@ -0,0 +1,91 @@
+# app/utils/token_cache.py - 已验证 JWT 的进程内缓存
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class VerifiedTokenCache:
+    """最近验证通过的令牌
+
+    以 (密钥, 令牌) 的 SHA-256 摘要为键，保存 user_id 和 exp，命中时无需重新解码和校验签名。
+    条目在令牌的 exp 时刻（与 PyJWT 的 exp <= now 判定一致）或缓存 ttl 秒后失效，以先到者为准，
+    容量满时淘汰最久未使用的条目。revoke_token / revoke_user 使本进程的缓存立即失效，
+    其他进程的缓存最多在 ttl 秒后重新校验。
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, max_entries: int, ttl: float = 60):
+        """设置缓存容量（0 表示不缓存）和条目最长保留时间（秒）"""
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl
+            while len(self._entries) > max(max_entries, 0):
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _key(token: str, secret_key: str) -> str:
+        # 密钥参与摘要，更换密钥后旧条目自然失效；缓存中不保存令牌原文
+        return hashlib.sha256(f"{secret_key}\0{token}".encode('utf-8')).hexdigest()
+
+    def get(self, token: str, secret_key: str) -> Optional[str]:
+        """返回缓存的 user_id；未命中或已过期时返回 None"""
+        if not self.max_entries:
+            return None
+        key = self._key(token, secret_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def put(self, token: str, secret_key: str, user_id: str, exp):
+        """缓存验证通过的令牌；没有 exp 的令牌不缓存"""
+        if not self.max_entries or exp is None:
+            return
+        key = self._key(token, secret_key)
+        expires_at = min(int(exp), time.time() + self.ttl)
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def revoke_token(self, token: str, secret_key: str):
+        """吊销单个令牌"""
+        with self._lock:
+            self._entries.pop(self._key(token, secret_key), None)
+
+    def revoke_user(self, user_id: str):
+        """吊销某个用户的全部令牌"""
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局令牌缓存
+verified_tokens = VerifiedTokenCache()
+
+
+def init_token_cache(app):
+    """根据配置初始化令牌缓存"""
+    verified_tokens.configure(
+        app.config.get('TOKEN_CACHE_SIZE', 10000),
+        app.config.get('TOKEN_CACHE_SECONDS', 60)
+    )
@@ -0,0 +1,68 @@
+# app/utils/user_cache.py - 用户文档的短期进程内缓存
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class UserCache:
+    """按 user_id 缓存用户文档（不含密码哈希），条目在 ttl 秒后失效
+
+    本进程内修改用户文档的操作会立即使对应条目失效；其他进程的修改最多延迟 ttl 秒可见。
+    答题计数等需要实时的数据不要从这里读取。
+    """
+
+    def __init__(self, ttl: float = 10, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, ttl: float, max_entries: int = None):
+        """设置缓存有效期（秒，0 表示不缓存）和容量"""
+        with self._lock:
+            self.ttl = ttl
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self._entries.clear()
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """返回缓存的用户文档副本；未命中或已过期时返回 None"""
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._entries.get(str(user_id))
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[str(user_id)]
+                return None
+            self._entries.move_to_end(str(user_id))
+            return dict(user)
+
+    def put(self, user_id: str, user: Dict):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[str(user_id)] = (dict(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(str(user_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局用户缓存
+user_cache = UserCache()
+
+
+def init_user_cache(app):
+    """根据配置初始化用户缓存"""
+    user_cache.configure(app.config.get('USER_CACHE_TTL_SECONDS', 10))
@@ -26,6 +26,77 @@ class Config:
     # API配置
     API_VERSION = os.environ.get('API_VERSION', 'v1')
     
+    # 题库缓存配置：版本戳检查间隔（秒）
+    QUESTION_CATALOG_REFRESH_SECONDS = int(os.environ.get('QUESTION_CATALOG_REFRESH_SECONDS', 30))
+    
+    # 公开目录接口的 HTTP 缓存时间（秒）
+    PUBLIC_CACHE_MAX_AGE = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', 300))
+    
+    # 已验证 JWT 缓存的容量（0 表示不缓存）
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+    # 缓存条目的最长保留时间（秒）：吊销令牌后其他工作进程最多在这段时间后拒绝该令牌
+    TOKEN_CACHE_SECONDS = float(os.environ.get('TOKEN_CACHE_SECONDS', 60))
+    
+    # 密码哈希算法和参数（修改后旧哈希在用户下次登录时自动升级）
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    
+    # 计算密码哈希的进程数（0 表示在请求线程中计算）
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    
+    # 同时等待计算的密码哈希上限（每个 gunicorn 工作进程），超出时返回 503
+    # 应小于每个工作进程的线程数（railway.json 中为 8），其余线程继续处理其他请求
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 4))
+    
+    # 等待单次密码哈希计算的超时（秒）
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+    
+    # 登录限流：每个用户名/邮箱的突发上限和每分钟补充次数（0 表示不限）
+    LOGIN_IDENTITY_BURST = int(os.environ.get('LOGIN_IDENTITY_BURST', 5))
+    LOGIN_IDENTITY_PER_MINUTE = float(os.environ.get('LOGIN_IDENTITY_PER_MINUTE', 5))
+    
+    # 登录限流：每个客户端 IP 的突发上限和每分钟补充次数（0 表示不限）
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 20))
+    LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', 30))
+    
+    # 应用前面可信反向代理的层数，用于从 X-Forwarded-For 中取客户端 IP
+    # Railway 部署在一层代理之后，默认信任 1 层；为 0 时不按 IP 限流登录
+    TRUSTED_PROXY_COUNT = int(os.environ.get(
+        'TRUSTED_PROXY_COUNT', 1 if os.environ.get('RAILWAY_ENVIRONMENT') else 0
+    ))
+    
+    # 用户资料进程内缓存的有效期（秒，0 表示不缓存）
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', 10))
+    
+    # 学习路径数据文件（默认 data/learning_paths.json）和文件变化检查间隔（秒）
+    LEARNING_PATHS_FILE = os.environ.get('LEARNING_PATHS_FILE')
+    LEARNING_PATHS_CHECK_SECONDS = int(os.environ.get('LEARNING_PATHS_CHECK_SECONDS', 5))
+    
+    # 推荐结果缓存：进程内容量（0 表示不在进程内缓存）和有效期（秒，0 表示不缓存）
+    RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 5000))
+    RECOMMENDATION_CACHE_TTL_SECONDS = int(os.environ.get('RECOMMENDATION_CACHE_TTL_SECONDS', 3600))
+    
+    # 推荐结果的共享缓存层：none 或 mongo（多个进程共用 recommendation_cache 集合）
+    RECOMMENDATION_CACHE_SHARED = os.environ.get('RECOMMENDATION_CACHE_SHARED', 'none')
+    
+    # 推荐输入来源：materialized（物化画像）、aggregate（服务端聚合）或 documents（逐条读取答案）
+    RECOMMENDATION_INPUT_MODE = os.environ.get('RECOMMENDATION_INPUT_MODE', 'materialized')
+    
+    # 答案存储格式：full（冗余保存选项映射）或 compact（只保存答案值，读取时从题库补全）
+    # aggregate 推荐输入依赖冗余字段，compact 模式下（或当前轮次有 compact 答案时）自动改为逐条读取答案
+    RESPONSE_STORAGE_MODE = os.environ.get('RESPONSE_STORAGE_MODE', 'full')
+    
+    # 答案写入方式：direct（直接写入当前状态）或 event_log（只追加事件，由后台压缩写入当前状态）
+    ANSWER_WRITE_MODE = os.environ.get('ANSWER_WRITE_MODE', 'direct')
+    # 事件压缩间隔（秒），以及只压缩早于多少秒的事件
+    ANSWER_EVENT_COMPACTION_INTERVAL_SECONDS = int(os.environ.get('ANSWER_EVENT_COMPACTION_INTERVAL_SECONDS', 10))
+    ANSWER_EVENT_COMPACTION_LAG_SECONDS = int(os.environ.get('ANSWER_EVENT_COMPACTION_LAG_SECONDS', 5))
+    # 压缩租约有效期（秒）：同一时间只有持有租约的进程压缩事件
+    ANSWER_EVENT_COMPACTION_LEASE_SECONDS = int(os.environ.get('ANSWER_EVENT_COMPACTION_LEASE_SECONDS', 60))
+    
+    # 重置问卷后旧轮次答案的保留天数，以及后台清理间隔（秒，0 表示不启动后台清理）
+    ATTEMPT_RETENTION_DAYS = int(os.environ.get('ATTEMPT_RETENTION_DAYS', 30))
+    ATTEMPT_SWEEP_INTERVAL_SECONDS = int(os.environ.get('ATTEMPT_SWEEP_INTERVAL_SECONDS', 0))
+    
     # CORS配置
     CORS_ORIGINS = ['*']  # 生产环境应该设置具体域名
     
@@ -9,9 +9,14 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     from app import create_app
-    from app.utils.database import mongo, get_db_stats, cleanup_expired_data, backup_collection, health_check
+    from app.utils.database import (
+        mongo, get_db_stats, cleanup_expired_data, backup_collection, health_check,
+        REQUIRED_UNIQUE_INDEXES, check_unique_indexes, _create_indexes
+    )
     from app.models.question import Question
     from app.models.user import User
+    from app.models.response import Response
+    from app.models.answer_event import AnswerEvent
 except ImportError as e:
     print(f"❌ 导入错误: {e}")
     print("请确保在项目根目录下运行此脚本")
@@ -83,6 +88,145 @@ def backup(collection_name, path):
         else:
             click.echo("❌ 备份失败")
 
+@cli.command()
+@click.option('--batch-size', default=500, help='每批删除的文档数量')
+@click.option('--retention-days', default=None, type=int, help='旧轮次答案保留天数（默认读取配置）')
+def sweep_attempts(batch_size, retention_days):
+    """清理重置问卷后保留的旧轮次答案"""
+    with app.app_context():
+        click.echo("🧹 开始清理旧轮次答案...")
+        result = Response.sweep_superseded_attempts(batch_size, retention_days)
+        
+        click.echo(f"✅ 清理完成:")
+        click.echo(f"  旧轮次: {result['attempts']} 个")
+        click.echo(f"  删除答案: {result['deleted']} 条")
+
+@cli.command()
+@click.option('--batch-size', default=1000, help='每批处理的事件数量')
+def compact_events(batch_size):
+    """把答案事件日志压缩进当前答案"""
+    with app.app_context():
+        click.echo("🗜️ 开始压缩答案事件...")
+        result = AnswerEvent.compact(batch_size)
+        
+        click.echo(f"✅ 压缩完成:")
+        click.echo(f"  事件: {result['events']} 个")
+        click.echo(f"  写入答案: {result['applied']} 个")
+        click.echo(f"  丢弃: {result['dropped']} 个")
+
+@cli.command()
+@click.argument('user_id')
+@click.option('--until', default=None, help='回放截止时间（ISO 格式，UTC）')
+def replay_events(user_id, until):
+    """回放用户答题历史并生成当时的推荐"""
+    from datetime import datetime
+    from app.services.recommendation_engine import get_recommendation_engine
+    
+    with app.app_context():
+        user_data = AnswerEvent.replay(user_id, datetime.fromisoformat(until) if until else None)
+        if not user_data:
+            click.echo("❌ 没有找到答案事件")
+            return
+        
+        recommendation = get_recommendation_engine().generate_recommendation(user_data)
+        click.echo(json.dumps({
+            "input": user_data,
+            "recommendation": recommendation
+        }, ensure_ascii=False, indent=2, default=str))
+
+@cli.command()
+@click.option('--batch-size', default=500, help='每批处理的文档数量')
+def compact_responses(batch_size):
+    """把答案文档转换为 compact 存储格式"""
+    with app.app_context():
+        click.echo("🗜️ 开始转换答案文档...")
+        result = Response.compact_stored_responses(batch_size)
+        
+        click.echo(f"✅ 转换完成:")
+        click.echo(f"  扫描: {result['scanned']} 个文档")
+        click.echo(f"  转换: {result['compacted']} 个文档")
+        click.echo(f"  跳过: {result['skipped']} 个文档（选项已不在题库中或问题已被修改）")
+        if app.config.get('RESPONSE_STORAGE_MODE') != 'compact':
+            click.echo("⚠️ 请设置 RESPONSE_STORAGE_MODE=compact，否则新答案仍以 full 格式保存")
+
+@cli.command()
+@click.option('--batch-size', default=500, help='每批处理的用户数量')
+def backfill_answer_counts(batch_size):
+    """为尚未建立答题计数的老用户统计并写入计数（一次性迁移）"""
+    with app.app_context():
+        click.echo("🔢 开始建立答题计数...")
+        result = Response.recount_all_answer_counts(batch_size, only_missing=True)
+        
+        click.echo(f"✅ 迁移完成:")
+        click.echo(f"  检查用户: {result['users']} 个")
+        click.echo(f"  建立计数: {result['fixed']} 个")
+
+@cli.command()
+@click.option('--user-id', default=None, help='只重新统计指定用户')
+@click.option('--batch-size', default=500, help='每批处理的用户数量')
+def recount_answer_counts(user_id, batch_size):
+    """按答案重新统计答题计数，修正与答案不一致的计数"""
+    with app.app_context():
+        if user_id:
+            fixed = Response.recount_answer_counts(user_id)
+            if fixed is None:
+                click.echo("⚠️ 用户不存在或统计期间计数发生变化，请稍后重试")
+            else:
+                click.echo(f"✅ {'已修正' if fixed else '计数正确'}")
+            return
+        
+        click.echo("🔢 开始重新统计答题计数...")
+        result = Response.recount_all_answer_counts(batch_size)
+        
+        click.echo(f"✅ 统计完成:")
+        click.echo(f"  检查用户: {result['users']} 个")
+        click.echo(f"  修正计数: {result['fixed']} 个")
+
+@cli.command()
+@click.option('--batch-size', default=500, help='每批删除的文档数量')
+def dedupe_responses(batch_size):
+    """删除重复答案（每个用户每轮每题保留最新的一条），然后建立答案唯一索引"""
+    with app.app_context():
+        click.echo("🧹 开始清理重复答案...")
+        result = Response.dedupe_responses(batch_size)
+        
+        click.echo(f"✅ 清理完成:")
+        click.echo(f"  重复组: {result['groups']} 组")
+        click.echo(f"  删除答案: {result['deleted']} 条")
+        
+        _create_indexes(app)
+        if any(collection == 'responses' for collection, _ in check_unique_indexes(app)):
+            click.echo("❌ 答案唯一索引仍未建立，请运行 check-indexes 查看原因")
+            sys.exit(1)
+        click.echo("✅ 答案唯一索引已建立")
+        if result['deleted']:
+            click.echo("⚠️ 请运行 recount-answer-counts 修正答题计数")
+
+@cli.command()
+def check_indexes():
+    """重新创建索引并检查写入路径依赖的唯一索引，列出阻止建立唯一索引的重复数据"""
+    with app.app_context():
+        click.echo("🔍 检查唯一索引...")
+        _create_indexes(app)
+        missing = check_unique_indexes(app)
+        if not missing:
+            click.echo("✅ 唯一索引完整")
+            return
+        
+        fields_by_index = {(collection, name): fields for collection, name, fields in REQUIRED_UNIQUE_INDEXES}
+        for collection, name in missing:
+            fields = fields_by_index[(collection, name)]
+            duplicates = list(mongo.db[collection].aggregate([
+                {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+                {"$limit": 20}
+            ]))
+            click.echo(f"❌ 缺少唯一索引 {collection}.{name}，重复数据 {len(duplicates)} 组（最多列出 20 组）:")
+            for item in duplicates:
+                click.echo(f"  {json.dumps(item['_id'], ensure_ascii=False, default=str)}: {item['count']} 条")
+        click.echo("请清理重复数据后重新运行本命令（答案的重复数据可运行 dedupe-responses 清理）")
+        sys.exit(1)
+
 @cli.command()
 def init_questions():
     """初始化示例问题数据"""
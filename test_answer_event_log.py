@@ -0,0 +1,145 @@
+# test_answer_event_log.py - 答案事件日志写入、压缩和回放测试（需要 MongoDB）
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _create_test_app():
+    from flask import Flask
+    from config import DevelopmentConfig
+    from app.utils.database import init_db, is_db_available
+
+    app = Flask(__name__)
+    app.config.from_object(DevelopmentConfig)
+    app.config['ANSWER_WRITE_MODE'] = 'event_log'
+    app.config['ANSWER_EVENT_COMPACTION_LAG_SECONDS'] = 0
+    init_db(app)
+    assert is_db_available(), "MongoDB 不可用"
+    return app
+
+
+def _create_questions(timestamp):
+    """创建三道带映射的测试问题，返回 question_id 列表"""
+    from app.models.question import Question
+
+    specs = [
+        ("skill_assessment", [
+            {"value": "low", "text": "刚入门", "skill_mapping": {"all_paths": {"level": 0.1, "foundation": 0.3}}},
+            {"value": "web", "text": "做过网页", "skill_mapping": {"frontend": {"level": 0.7, "foundation": 0.6}}}
+        ]),
+        ("interest_preference", [
+            {"value": "web", "text": "前端", "path_weights": {"frontend": 0.9, "backend": 0.3}},
+            {"value": "data", "text": "数据", "path_weights": {"data_science": 0.8, "backend": 0.4}}
+        ]),
+        ("learning_style", [
+            {"value": "practice", "text": "动手", "style_mapping": {"hands_on": 0.9, "video": 0.3}}
+        ])
+    ]
+
+    question_ids = []
+    for order, (category, options) in enumerate(specs, 1):
+        question_id = f"event_{category}_{timestamp}"
+        assert Question.create(question_id, category, "测试问题", "single_choice", options, order=order)
+        question_ids.append(question_id)
+    return question_ids
+
+
+def _compact():
+    """等事件的 _id（秒级时间戳）早于压缩上界后压缩"""
+    from app.models.answer_event import AnswerEvent
+    time.sleep(1.1)
+    return AnswerEvent.compact()
+
+
+def _answers(records):
+    return [
+        (record["question_id"], record["answer_value"], record["question_category"], record["answered_at"])
+        for record in records
+    ]
+
+
+def _recommendation_input(app, user_id, mode):
+    from app.models.response import Response
+    app.config['RECOMMENDATION_INPUT_MODE'] = mode
+    return Response.get_responses_for_recommendation(user_id)
+
+
+def test_event_log_compaction_and_replay():
+    """压缩后的答案与折叠事件一致，重置前未压缩的事件被丢弃，按事件重建的画像与物化画像一致"""
+    from app.models.user import User
+    from app.models.question import Question
+    from app.models.response import Response
+    from app.models.answer_event import AnswerEvent
+    from app.models.profile import RecommendationProfile
+
+    app = _create_test_app()
+    timestamp = str(int(time.time() * 1000))
+
+    with app.app_context():
+        skill_q, interest_q, style_q = question_ids = _create_questions(timestamp)
+        user_id = User.create(f"event_user_{timestamp}", f"event_{timestamp}@test.com", "password123")
+        assert user_id
+
+        try:
+            # 1. 提交答案只追加事件；压缩之前 /status 的计数已包含待压缩的答案
+            assert Response.save_answer(user_id, skill_q, "web")
+            assert all(Response.save_answers_bulk(user_id, [
+                {"question_id": interest_q, "answer_value": "web"},
+                {"question_id": style_q, "answer_value": "practice"}
+            ]))
+            assert Response.save_answer(user_id, interest_q, "data")
+            assert Response.get_user_responses(user_id) == []
+            assert Response.get_status_counts(user_id)["answered_count"] == len(question_ids)
+            print("✅ 压缩之前答案只写入事件")
+
+            # 2. 压缩后 responses 与折叠全部事件的结果一致
+            stats = _compact()
+            assert stats["applied"] >= len(question_ids) + 1
+            state = User.get_answer_state(user_id)
+            expected = AnswerEvent.fold(user_id, AnswerEvent.get_history(user_id), state["attempt"])
+            responses = Response.get_user_responses(user_id)
+            assert _answers(responses) == _answers(expected)
+            assert [r["answer_value"] for r in responses if r["question_id"] == interest_q] == ["data"]
+            assert Response.get_answer_counts(user_id)["answered_count"] == len(question_ids)
+            print("✅ 压缩后的答案与折叠事件一致")
+
+            # 3. 按事件重建的画像与物化画像、逐条读取答案一致
+            documents = _recommendation_input(app, user_id, 'documents')
+            assert AnswerEvent.rebuild_profile(user_id)
+            state = User.get_answer_state(user_id)
+            assert RecommendationProfile.get_entries(
+                user_id, state["attempt"], state["revision"], Question.get_question_revisions()
+            ) is not None, "按事件重建的画像应有效"
+            assert _recommendation_input(app, user_id, 'materialized') == documents
+            print("✅ 按事件重建的画像与物化画像一致")
+
+            # 4. 有未压缩事件时重置问卷：重置之前的事件被丢弃，之后的事件照常写入新一轮
+            # （MongoDB 的时间精确到毫秒，事件与重置之间留出间隔）
+            assert Response.save_answer(user_id, skill_q, "low")
+            time.sleep(0.01)
+            assert Response.reset_questionnaire(user_id)
+            time.sleep(0.01)
+            assert Response.save_answer(user_id, interest_q, "web")
+            stats = _compact()
+            assert stats["dropped"] >= 1
+            responses = Response.get_user_responses(user_id)
+            assert [(r["question_id"], r["answer_value"]) for r in responses] == [(interest_q, "web")]
+            assert Response.get_answer_counts(user_id)["answered_count"] == 1
+
+            assert AnswerEvent.rebuild_profile(user_id)
+            materialized = _recommendation_input(app, user_id, 'materialized')
+            assert materialized == _recommendation_input(app, user_id, 'documents')
+            assert materialized["response_count"] == 1
+            print("✅ 重置之前未压缩的事件被丢弃，新一轮答案与画像一致")
+        finally:
+            app.config['RECOMMENDATION_INPUT_MODE'] = 'materialized'
+            Response.delete_user_responses(user_id)
+            User.deactivate(user_id)
+            for question_id in question_ids:
+                Question.deactivate(question_id)
+
+
+if __name__ == "__main__":
+    test_event_log_compaction_and_replay()
+    print("\n🎉 答案事件日志测试通过！")
@@ -0,0 +1,51 @@
+# test_http_cache.py - 预压缩公开响应的内容协商和 ETag 测试
+import sys
+import os
+import gzip
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_encoded_payload_etags():
+    """br、gzip 和未压缩的响应各有自己的 ETag，解压后内容相同，条件请求按编码匹配"""
+    import brotli
+    from app import create_app
+    from app.utils import http_cache
+
+    assert http_cache.PAYLOAD_ENCODINGS == ('br', 'gzip'), "未安装 brotli（见 requirements.txt）"
+
+    app = create_app()
+    client = app.test_client()
+    url = '/api/v1/recommendations/learning-paths'
+
+    # 1. 按 Accept-Encoding 选择编码，ETag 带编码后缀
+    identity = client.get(url, headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    brotlied = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+    assert identity.status_code == gzipped.status_code == brotlied.status_code == 200
+
+    etag = identity.headers['ETag'].strip('"')
+    assert identity.headers.get('Content-Encoding') is None
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzipped.headers['ETag'].strip('"') == f"{etag}-gzip"
+    assert brotlied.headers['Content-Encoding'] == 'br'
+    assert brotlied.headers['ETag'].strip('"') == f"{etag}-br"
+
+    body = json.loads(identity.get_data())
+    assert json.loads(gzip.decompress(gzipped.get_data())) == body
+    assert json.loads(brotli.decompress(brotlied.get_data())) == body
+    print("✅ 各内容编码的 ETag 互不相同，内容一致")
+
+    # 2. 只有与所选编码一致的 ETag 返回 304
+    headers = {'Accept-Encoding': 'br', 'If-None-Match': brotlied.headers['ETag']}
+    assert client.get(url, headers=headers).status_code == 304
+    headers = {'Accept-Encoding': 'gzip', 'If-None-Match': brotlied.headers['ETag']}
+    assert client.get(url, headers=headers).status_code == 200
+    headers = {'Accept-Encoding': 'identity', 'If-None-Match': brotlied.headers['ETag']}
+    assert client.get(url, headers=headers).status_code == 200
+    print("✅ 条件请求按内容编码匹配 ETag")
+
+
+if __name__ == "__main__":
+    test_encoded_payload_etags()
+    print("\n🎉 预压缩响应测试通过！")
@@ -0,0 +1,54 @@
+# test_rate_limit.py - 登录限流测试
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _limiter(identity_burst=2, ip_burst=5):
+    from app.utils.rate_limit import LoginRateLimiter
+    limiter = LoginRateLimiter()
+    # 每分钟补充 0 个令牌：测试期间桶不会回填
+    limiter.configure(identity_burst, 0, ip_burst, 0)
+    return limiter
+
+
+def test_identity_rejection_keeps_ip_tokens():
+    """按登录标识被拒绝的尝试不消耗 IP 额度，同一 IP 的其他用户仍可登录"""
+    limiter = _limiter(identity_burst=2, ip_burst=5)
+
+    # 1. 针对同一账户的重试：前两次放行，之后按登录标识拒绝
+    assert limiter.check('alice', '10.0.0.1') == (True, 0)
+    assert limiter.check('Alice ', '10.0.0.1') == (True, 0)
+    for _ in range(10):
+        allowed, retry_after = limiter.check('alice', '10.0.0.1')
+        assert not allowed and retry_after > 0
+    print("✅ 超出登录标识额度的尝试被拒绝")
+
+    # 2. 被拒绝的尝试退还了 IP 令牌：IP 额度只被放行的两次消耗
+    for identity in ('bob', 'carol', 'dave'):
+        assert limiter.check(identity, '10.0.0.1') == (True, 0), identity
+    allowed, _ = limiter.check('erin', '10.0.0.1')
+    assert not allowed
+    print("✅ 按登录标识被拒绝时不消耗 IP 额度")
+
+
+def test_ip_rejection_keeps_identity_tokens():
+    """按 IP 被拒绝的尝试不消耗登录标识的额度"""
+    limiter = _limiter(identity_burst=2, ip_burst=1)
+
+    assert limiter.check('alice', '10.0.0.1') == (True, 0)
+    for _ in range(5):
+        allowed, _ = limiter.check('bob', '10.0.0.1')
+        assert not allowed
+    # bob 的额度未被 IP 拒绝消耗
+    assert limiter.check('bob', '10.0.0.2') == (True, 0)
+    assert limiter.check('bob', '10.0.0.3') == (True, 0)
+    allowed, _ = limiter.check('bob', '10.0.0.4')
+    assert not allowed
+    print("✅ 按 IP 被拒绝时不消耗登录标识额度")
+
+
+if __name__ == "__main__":
+    test_identity_rejection_keeps_ip_tokens()
+    test_ip_rejection_keeps_identity_tokens()
+    print("\n🎉 登录限流测试通过！")
@@ -0,0 +1,131 @@
+# test_recommendation_cache.py - 推荐结果缓存测试
+import sys
+import os
+import json
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _user_data(user_id, frontend_interest=0.8):
+    return {
+        'user_id': user_id,
+        'skill_assessment': {'frontend': {'level': 0.4, 'foundation': 0.5}},
+        'interest_preference': {'frontend': frontend_interest, 'backend': 0.4},
+        'career_goal': {'goals': [{'timeline': 'short', 'focus': 'employment'}]},
+        'learning_style': {'styles': [{'hands_on': 0.8, 'video': 0.6}]},
+        'time_planning': {'plans': [{'hours_per_week': 12}]},
+        'response_count': 5
+    }
+
+
+def _body(recommendation):
+    """去掉用户字段后按 JSON 比较（缓存中的结果是只读结构）"""
+    from app.services.recommendation_cache import RecommendationCache
+    body = {k: v for k, v in recommendation.items() if k not in RecommendationCache.USER_FIELDS}
+    return json.dumps(body, sort_keys=True, ensure_ascii=False)
+
+
+class _NoGenerate:
+    """命中缓存时不应调用推荐引擎"""
+
+    def __enter__(self):
+        from app.services.recommendation_engine import get_recommendation_engine
+        self.engine = get_recommendation_engine()
+
+        def fail(user_data):
+            raise AssertionError("缓存命中时不应重新生成推荐")
+        self.engine.generate_recommendation = fail
+        return self
+
+    def __exit__(self, *args):
+        del self.engine.generate_recommendation
+
+
+def test_cache_hits_and_misses():
+    """内容相同的输入命中缓存，输入、学习路径版本不同或过期时不命中"""
+    from app.services.recommendation_cache import RecommendationCache
+    from app.services.recommendation_engine import get_recommendation_engine
+
+    engine = get_recommendation_engine()
+    cache = RecommendationCache(max_entries=10, ttl=60)
+
+    # 1. 首次请求未命中：生成并写入缓存
+    alice = _user_data('alice')
+    key = cache.key_for(alice)
+    assert cache.get(key) is None
+    first = cache.generate(alice)
+    assert cache.get(key) is not None
+    assert _body(first) == _body(engine.generate_recommendation(alice))
+
+    # 2. 另一个答案相同的用户命中缓存，用户字段是自己的
+    bob = _user_data('bob')
+    assert cache.key_for(bob) == key
+    with _NoGenerate():
+        second = cache.generate(bob)
+    assert second['user_id'] == 'bob'
+    assert _body(second) == _body(first)
+    print("✅ 答案相同的用户命中缓存")
+
+    # 3. 输入不同、学习路径版本不同时键不同
+    carol = _user_data('carol', frontend_interest=0.3)
+    assert cache.key_for(carol) != key
+    assert cache.get(cache.key_for(carol)) is None
+    assert _body(cache.generate(carol)) == _body(engine.generate_recommendation(carol))
+    assert cache.key_for(alice, 'other-learning-paths') != key
+    print("✅ 输入或学习路径版本不同时不命中")
+
+    # 4. 过期和 LRU 淘汰
+    short_lived = RecommendationCache(max_entries=1, ttl=0.05)
+    short_lived.generate(alice)
+    assert short_lived.get(key) is not None
+    time.sleep(0.1)
+    assert short_lived.get(key) is None
+    short_lived.generate(alice)
+    short_lived.generate(carol)
+    assert short_lived.get(key) is None
+    assert short_lived.get(short_lived.key_for(carol)) is not None
+    print("✅ 过期和超出容量的结果被丢弃")
+
+
+def test_shared_cache_round_trip():
+    """共享层（MongoDB）写入的结果可被另一个进程的缓存读出，过期的结果不返回（需要 MongoDB）"""
+    from flask import Flask
+    from config import DevelopmentConfig
+    from app.utils.database import init_db, is_db_available, mongo
+    from app.services.recommendation_cache import RecommendationCache
+
+    app = Flask(__name__)
+    app.config.from_object(DevelopmentConfig)
+    init_db(app)
+    assert is_db_available(), "MongoDB 不可用"
+
+    with app.app_context():
+        alice = _user_data(f"alice_{int(time.time() * 1000)}", frontend_interest=0.77)
+        writer = RecommendationCache(max_entries=10, ttl=60, shared='mongo')
+        key = writer.key_for(alice)
+        try:
+            first = writer.generate(alice)
+
+            # 进程内没有该结果的另一个缓存实例从共享层读出相同的结果
+            reader = RecommendationCache(max_entries=10, ttl=60, shared='mongo')
+            with _NoGenerate():
+                second = reader.generate(dict(alice, user_id='bob'))
+            assert second['user_id'] == 'bob'
+            assert _body(second) == _body(first)
+            print("✅ 共享缓存读写一致")
+
+            # 共享层中已过期（TTL 索引尚未清理）的结果不返回
+            mongo.db[RecommendationCache.COLLECTION].update_one(
+                {"_id": key}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+            )
+            assert RecommendationCache(max_entries=10, ttl=60, shared='mongo').get(key) is None
+            print("✅ 过期的共享缓存不返回")
+        finally:
+            mongo.db[RecommendationCache.COLLECTION].delete_one({"_id": key})
+
+
+if __name__ == "__main__":
+    test_cache_hits_and_misses()
+    test_shared_cache_round_trip()
+    print("\n🎉 推荐结果缓存测试通过！")
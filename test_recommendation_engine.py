@@ -0,0 +1,162 @@
+# test_recommendation_engine.py - 推荐引擎批量计算和学习计划表测试
+import sys
+import os
+import json
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = ('frontend', 'backend', 'mobile', 'data_science')
+STYLES = ('hands_on', 'theoretical', 'video', 'reading', 'interactive')
+
+
+def _random_user_data(rng, index):
+    """随机生成一份 Response.get_responses_for_recommendation() 格式的推荐输入"""
+    user_data = {'user_id': f"user_{index}", 'response_count': rng.randint(0, 30)}
+    
+    if rng.random() < 0.9:
+        user_data['skill_assessment'] = {
+            path: {'level': rng.random(), 'foundation': rng.random()}
+            for path in rng.sample(PATHS, rng.randint(0, len(PATHS)))
+        }
+    if rng.random() < 0.9:
+        # 保留一位小数，制造同分的路径
+        user_data['interest_preference'] = {path: round(rng.random(), 1) for path in PATHS}
+    user_data['career_goal'] = {
+        'goals': [{'timeline': 'short', 'focus': 'employment'}] * rng.randint(0, 2)
+    }
+    user_data['learning_style'] = {
+        'styles': [
+            {style: rng.random() for style in rng.sample(STYLES, rng.randint(1, len(STYLES)))}
+            for _ in range(rng.randint(0, 3))
+        ]
+    }
+    user_data['time_planning'] = {
+        'plans': [{'hours_per_week': rng.choice([5, 10, 12, 15, 18, 20, 30])} for _ in range(rng.randint(0, 2))]
+    }
+    return user_data
+
+
+def _without_timestamp(recommendation):
+    recommendation = dict(recommendation)
+    recommendation.pop('generated_at', None)
+    return recommendation
+
+
+def test_generate_batch_matches_scalar():
+    """generate_batch 与逐个调用 generate_recommendation 的结果逐位一致（generated_at 除外）"""
+    from app.services import recommendation_engine
+    from app.services.recommendation_engine import RecommendationEngine
+    
+    assert recommendation_engine.np is not None, "未安装 numpy，generate_batch 不会走批量计算"
+    
+    rng = random.Random(20241016)
+    user_data_list = [_random_user_data(rng, index) for index in range(500)]
+    # 含非数值的画像退回逐个计算
+    user_data_list.append({'user_id': 'bad_user', 'interest_preference': {'frontend': 'high'}})
+    user_data_list.append({})
+    
+    engine = RecommendationEngine()
+    batch = engine.generate_batch(user_data_list)
+    
+    assert len(batch) == len(user_data_list)
+    for user_data, result in zip(user_data_list, batch):
+        expected = engine.generate_recommendation(user_data)
+        assert _without_timestamp(result) == _without_timestamp(expected), user_data.get('user_id')
+    
+    print(f"✅ {len(user_data_list)} 个用户的批量推荐与逐个计算一致")
+
+
+def test_precomputed_learning_plans_match_live():
+    """预先生成的学习计划与按用户画像现场生成的计划一致"""
+    from app.services.recommendation_engine import RecommendationEngine
+    
+    engine = RecommendationEngine()
+    expected_keys = {
+        (path_name, experience_level, multiplier)
+        for path_name in engine.learning_paths
+        for experience_level in engine.EXPERIENCE_LEVELS
+        for multiplier in engine.TIMELINE_MULTIPLIERS
+    }
+    assert set(engine.learning_plans) == expected_keys
+    
+    # 1. 计划表中的每一项与现场生成的计划相同
+    for (path_name, experience_level, multiplier), plan in engine.learning_plans.items():
+        live = engine._build_learning_plan(
+            path_name, engine.learning_paths[path_name], experience_level, multiplier
+        )
+        assert json.dumps(plan, sort_keys=True) == json.dumps(live, sort_keys=True), (path_name, experience_level, multiplier)
+    
+    # 2. 推荐结果中取出的计划与按该用户的经验水平和时间线现场生成的计划相同
+    rng = random.Random(20241017)
+    for index in range(300):
+        user_data = _random_user_data(rng, index)
+        user_profile = engine._analyze_user_profile(user_data)
+        primary_path = engine._select_primary_path(engine._calculate_path_scores(user_profile), user_profile)
+        live = engine._build_learning_plan(
+            primary_path['path_name'], primary_path, user_profile['experience_level'],
+            engine._get_timeline_multiplier(user_profile['time_availability'])
+        )
+        plan = engine.generate_recommendation(user_data)['learning_plan']
+        assert json.dumps(plan, sort_keys=True) == json.dumps(live, sort_keys=True), user_data['user_id']
+    
+    print(f"✅ {len(expected_keys)} 个预生成的学习计划与现场生成的计划一致")
+
+
+def test_paths_follow_snapshot():
+    """参与评分的路径、学习方式偏好和补充技能来自学习路径数据，数据不合法时拒绝加载"""
+    import copy
+    from app.services.learning_paths import DEFAULT_LEARNING_PATHS_FILE, LearningPathSnapshot
+    from app.services.recommendation_engine import RecommendationEngine
+    
+    with open(DEFAULT_LEARNING_PATHS_FILE, encoding='utf-8') as f:
+        data = json.load(f)
+    
+    # 1. 数据文件中新增的路径参与评分，学习方式偏好和补充技能取自数据文件
+    devops = copy.deepcopy(data['paths']['backend'])
+    devops.update({
+        'name': '运维开发',
+        'learning_preferences': {'hands_on': 1.0},
+        'supplementary_skills': [
+            {'name': '后端框架', 'priority': 'high', 'reason': '理解所运维的服务', 'skill': '框架开发'}
+        ]
+    })
+    data['paths']['devops'] = devops
+    engine = RecommendationEngine(LearningPathSnapshot(data))
+    assert engine.path_names == PATHS + ('devops',)
+    
+    recommendation = engine.generate_recommendation({
+        'user_id': 'devops_user',
+        'interest_preference': {'devops': 1.0, 'backend': 0.2},
+        'learning_style': {'styles': [{'hands_on': 1.0}]},
+        'response_count': 10
+    })
+    assert recommendation['primary_path']['path_name'] == 'devops'
+    # 兴趣 1.0 × 0.4 + 默认目标匹配 0.5 × 0.2 + 学习方式匹配 1.0 × 0.1
+    assert abs(recommendation['path_scores']['devops'] - 0.6) < 1e-9
+    supplement, = recommendation['supplementary_skills']
+    assert supplement['name'] == '后端框架'
+    assert [location['path_name'] for location in supplement['learn_in']] == ['backend']
+    assert engine.generate_batch([{'interest_preference': {'devops': 1.0}}])[0]['primary_path']['path_name'] == 'devops'
+    print("✅ 新增的路径按数据文件中的权重参与评分")
+    
+    # 2. 学习方式权重、补充技能不合法时拒绝加载
+    for path_info in (
+        dict(devops, learning_preferences={'hands_on': 1.5}),
+        dict(devops, learning_preferences={'sleeping': 0.5}),
+        dict(devops, learning_preferences={}),
+        dict(devops, supplementary_skills=[{'name': 'x', 'priority': 'urgent', 'reason': 'y'}]),
+        dict(devops, supplementary_skills=[{'name': 'x', 'priority': 'low', 'reason': 'y', 'skill': '不存在的技能'}])
+    ):
+        data['paths']['devops'] = path_info
+        try:
+            LearningPathSnapshot(data)
+        except ValueError:
+            continue
+        raise AssertionError(f"不合法的路径数据应被拒绝: {path_info['learning_preferences']}")
+    print("✅ 不合法的学习方式权重和补充技能被拒绝")
+
+
+if __name__ == "__main__":
+    test_generate_batch_matches_scalar()
+    test_precomputed_learning_plans_match_live()
+    test_paths_follow_snapshot()
@@ -0,0 +1,153 @@
+# test_recommendation_profile.py - 物化推荐画像测试（需要 MongoDB）
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _create_test_app():
+    from flask import Flask
+    from config import DevelopmentConfig
+    from app.utils.database import init_db, is_db_available
+
+    app = Flask(__name__)
+    app.config.from_object(DevelopmentConfig)
+    init_db(app)
+    assert is_db_available(), "MongoDB 不可用"
+    return app
+
+
+def _create_questions(timestamp):
+    """每个类别创建一道带映射的测试问题，返回 question_id 列表"""
+    from app.models.question import Question
+
+    specs = [
+        ("skill_assessment", [
+            {"value": "low", "text": "刚入门", "skill_mapping": {"all_paths": {"level": 0.1, "foundation": 0.3}}},
+            {"value": "web", "text": "做过网页", "skill_mapping": {"frontend": {"level": 0.7, "foundation": 0.6},
+                                                                  "backend": {"level": 0.2}}}
+        ]),
+        ("interest_preference", [
+            {"value": "web", "text": "前端", "path_weights": {"frontend": 0.9, "backend": 0.3, "mobile": 0.1}},
+            {"value": "data", "text": "数据", "path_weights": {"data_science": 0.8, "backend": 0.4}}
+        ]),
+        ("career_goal", [
+            {"value": "job", "text": "找工作", "goal_mapping": {"timeline": "short", "focus": "employment"}}
+        ]),
+        ("learning_style", [
+            {"value": "practice", "text": "动手", "style_mapping": {"hands_on": 0.9, "video": 0.3}}
+        ]),
+        ("time_planning", [
+            {"value": "part_time", "text": "每周15小时", "time_mapping": {"hours_per_week": 15, "intensity": "medium"}}
+        ])
+    ]
+
+    question_ids = []
+    for order, (category, options) in enumerate(specs, 1):
+        question_id = f"profile_{category}_{timestamp}"
+        assert Question.create(question_id, category, "测试问题", "single_choice", options, order=order)
+        question_ids.append(question_id)
+    return question_ids
+
+
+def _recommendation_input(app, user_id, mode):
+    from app.models.response import Response
+    app.config['RECOMMENDATION_INPUT_MODE'] = mode
+    return Response.get_responses_for_recommendation(user_id)
+
+
+def test_materialized_profile_matches_rebuild():
+    """增量维护的画像、重建的画像和逐条读取答案得到的推荐输入完全一致"""
+    from app.models.user import User
+    from app.models.question import Question
+    from app.models.response import Response
+    from app.models.profile import RecommendationProfile
+
+    app = _create_test_app()
+    timestamp = str(int(time.time() * 1000))
+
+    with app.app_context():
+        skill_q, interest_q, goal_q, style_q, time_q = question_ids = _create_questions(timestamp)
+        user_id = User.create(f"profile_user_{timestamp}", f"profile_{timestamp}@test.com", "password123")
+        assert user_id
+
+        try:
+            app.config['RECOMMENDATION_INPUT_MODE'] = 'materialized'
+            assert Response.save_answer(user_id, skill_q, "web")
+            # 首次读取时建立画像，之后的写入增量更新画像
+            _recommendation_input(app, user_id, 'materialized')
+            assert all(Response.save_answers_bulk(user_id, [
+                {"question_id": interest_q, "answer_value": "web"},
+                {"question_id": goal_q, "answer_value": "job"},
+                {"question_id": style_q, "answer_value": "practice"},
+                {"question_id": time_q, "answer_value": "part_time"}
+            ]))
+            # 修改答案：画像中替换该问题的贡献
+            assert Response.save_answer(user_id, interest_q, "data")
+
+            # 1. 增量维护的画像仍然有效，与逐条读取答案的结果一致
+            state = User.get_answer_state(user_id)
+            assert RecommendationProfile.get_entries(
+                user_id, state["attempt"], state["revision"], Question.get_question_revisions()
+            ) is not None, "增量更新后画像不应失效"
+            materialized = _recommendation_input(app, user_id, 'materialized')
+            documents = _recommendation_input(app, user_id, 'documents')
+            assert materialized == documents
+            assert materialized["response_count"] == len(question_ids)
+            print("✅ 增量维护的画像与逐条读取答案一致")
+
+            # 2. 删除画像后按答案重建，结果不变
+            from app.utils.database import mongo
+            mongo.db[RecommendationProfile.COLLECTION].delete_one({"_id": user_id})
+            assert _recommendation_input(app, user_id, 'materialized') == documents
+            assert RecommendationProfile.get_entries(
+                user_id, state["attempt"], state["revision"], Question.get_question_revisions()
+            ) is not None, "读取时应已重建画像"
+            assert _recommendation_input(app, user_id, 'materialized') == documents
+            print("✅ 重建的画像与逐条读取答案一致")
+
+            # 3. full 格式的答案保存答题时的映射，修改问题后推荐输入不变
+            from app.utils.catalog_cache import question_catalog
+
+            def edit_data_option(path_weights):
+                mongo.db.questions.update_one(
+                    {"question_id": interest_q, "options.value": "data"},
+                    {"$set": {"options.$.path_weights": path_weights}}
+                )
+                question_catalog.bump_version()
+
+            edit_data_option({"data_science": 0.5, "mobile": 0.6})
+            assert _recommendation_input(app, user_id, 'documents') == documents
+            assert _recommendation_input(app, user_id, 'materialized') == documents
+            print("✅ 问题修改后 full 格式的答案保持不变")
+
+            # 4. compact 格式的答案按题库中的当前映射补全，画像随之重建
+            app.config['RESPONSE_STORAGE_MODE'] = 'compact'
+            assert Response.save_answer(user_id, interest_q, "data")
+            edit_data_option({"data_science": 0.4, "mobile": 0.7})
+            documents = _recommendation_input(app, user_id, 'documents')
+            assert documents["interest_preference"]["mobile"] == 0.7
+            assert _recommendation_input(app, user_id, 'materialized') == documents
+            print("✅ 问题修改后 compact 格式的答案与画像一致")
+
+            # 5. 重置问卷后旧画像失效，新一轮答案同样一致
+            assert Response.reset_questionnaire(user_id)
+            app.config['RECOMMENDATION_INPUT_MODE'] = 'materialized'
+            assert Response.save_answer(user_id, skill_q, "low")
+            assert Response.save_answer(user_id, interest_q, "web")
+            materialized = _recommendation_input(app, user_id, 'materialized')
+            assert materialized == _recommendation_input(app, user_id, 'documents')
+            assert materialized["response_count"] == 2
+            print("✅ 重置问卷后的画像与逐条读取答案一致")
+        finally:
+            app.config['RECOMMENDATION_INPUT_MODE'] = 'materialized'
+            app.config['RESPONSE_STORAGE_MODE'] = 'full'
+            Response.delete_user_responses(user_id)
+            User.deactivate(user_id)
+            for question_id in question_ids:
+                Question.deactivate(question_id)
+
+
+if __name__ == "__main__":
+    test_materialized_profile_matches_rebuild()
+    print("\n🎉 物化推荐画像测试通过！")
@@ -146,8 +146,46 @@ def test_user_model():
         traceback.print_exc()
         return False
 
+def test_token_revocation():
+    """修改密码后旧令牌失效、停用账户后令牌失效，已缓存的令牌同样被拒绝（需要 MongoDB）"""
+    import time
+    from flask import Flask
+    from config import DevelopmentConfig
+    from app.utils.database import init_db, is_db_available
+    from app.models.user import User
+    
+    app = Flask(__name__)
+    app.config.from_object(DevelopmentConfig)
+    init_db(app)
+    assert is_db_available(), "MongoDB 不可用"
+    
+    with app.app_context():
+        timestamp = str(int(time.time() * 1000))
+        secret_key = app.config['SECRET_KEY']
+        user_id = User.create(f"revoke_{timestamp}", f"revoke_{timestamp}@test.com", "password123")
+        assert user_id
+        
+        try:
+            # 1. 验证一次令牌，使其进入缓存；修改密码后旧令牌被拒绝，新令牌有效
+            old_token = User.generate_token(user_id, secret_key)
+            assert User.verify_token(old_token, secret_key) == user_id
+            assert User.change_password(user_id, "password123", "newpassword123")
+            assert User.verify_token(old_token, secret_key) is None
+            new_token = User.generate_token(user_id, secret_key)
+            assert User.verify_token(new_token, secret_key) == user_id
+            print("✅ 修改密码后旧令牌被拒绝")
+            
+            # 2. 停用账户后令牌被拒绝
+            assert User.deactivate(user_id)
+            assert User.verify_token(new_token, secret_key) is None
+            print("✅ 停用账户后令牌被拒绝")
+        finally:
+            User.deactivate(user_id)
+
+
 if __name__ == "__main__":
     success = test_user_model()
+    test_token_revocation()
     if success:
         print("\n✅ 所有测试通过，User模型工作正常！")
         print("📋 下一步可以开始设计Question模型")